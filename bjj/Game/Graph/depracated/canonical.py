@@ -0,0 +1,119 @@
+"""
+Canonical forms of positions, so that equivalent positions can be looked up through a hash instead of being compared
+against every node in the graph
+"""
+import numpy as np
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Tuple
+from Graph.depracated.position import Position, Joint, head2head, orientation_variants, positions_are_equivalent
+
+
+def reorientation_variants(pos) -> np.ndarray:
+    """
+    returns a (4, ..., 2, JOINT_COUNT, 3) array with the position as is, with swapped players, mirrored, and both
+    mirrored and with swapped players. Equivalent positions can differ by any of these. pos can be a Position or a
+    stack of position arrays
+    """
+    return orientation_variants(np.asarray(pos.array if isinstance(pos, Position) else pos, dtype=np.float64))
+
+
+def normalize_orientation(arrays: np.ndarray) -> np.ndarray:
+    """
+    translates and rotates a stack of (..., 2, JOINT_COUNT, 3) positions so that each is centered on the mean of its
+    joints and the vector from player 0's head to player 1's head points along +x. Rotations are only done around the
+    vertical (y) axis, as gravity makes the other axes meaningful
+    """
+    centered = arrays - arrays.mean(axis=(-3, -2), keepdims=True)
+    head2head_vector = centered[..., 1, Joint.Head.value, :] - centered[..., 0, Joint.Head.value, :]
+    angle = np.arctan2(head2head_vector[..., 2], head2head_vector[..., 0])
+    cos, sin = np.cos(angle)[..., None, None], np.sin(angle)[..., None, None]
+    x, y, z = centered[..., 0], centered[..., 1], centered[..., 2]
+    return np.stack([cos * x + sin * z, y, cos * z - sin * x], axis=-1)
+
+
+def canonical_form(pos: Position, resolution: float = 0.05) -> Tuple[np.ndarray, bytes]:
+    """
+    Maps a position to a translation-, rotation-, mirror- and swap-normalized form
+
+    Inputs:
+        pos (Position): position to normalize
+        resolution (float): grid size the normalized coordinates are quantized to for the hash key
+    Returns:
+        np.ndarray: (2, JOINT_COUNT, 3) normalized coordinates. Of the 4 mirror/swap variants, the one with the
+                    smallest quantized coordinates (compared lexicographically) is picked, so the choice doesn't
+                    depend on how the input was oriented
+        bytes: hash key of the quantized coordinates. Reoriented copies of a position share a key, unless the encoding
+               noise pushes a coordinate over a grid line
+    """
+    variants = normalize_orientation(reorientation_variants(pos))
+    quantized = np.round(variants / resolution).astype(np.int32).reshape(len(variants), -1)
+    best = min(range(len(variants)), key=lambda i: tuple(quantized[i]))
+    return variants[best], quantized[best].tobytes()
+
+
+def canonical_key(pos: Position, resolution: float = 0.05) -> bytes:
+    return canonical_form(pos, resolution)[1]
+
+
+class CanonicalIndex:
+    """
+    Bucketed index of positions for near O(1) equivalence lookups
+
+    A lookup first checks the positions that share its canonical key. Failing that, it checks the positions in the
+    same or neighbouring head2head buckets. is_reoriented rejects every pair whose head2head values differ by more
+    than its tolerance, so no equivalent position can be in any other bucket. The exact equivalence check only runs
+    on these few candidates, and find returns the earliest added equivalent position, as a scan over every position
+    in the order they were added would
+    """
+    def __init__(self, tolerance: float = 0.05, resolution: float = 0.05, equivalent=positions_are_equivalent):
+        self.tolerance = tolerance
+        self.resolution = resolution
+        self.equivalent = equivalent
+        self.positions: Dict[Hashable, Position] = {}
+        self.order: Dict[Hashable, int] = {}
+        self.by_canonical_key: Dict[bytes, List[Hashable]] = defaultdict(list)
+        self.by_head2head: Dict[int, List[Hashable]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.positions
+
+    def _head2head_bucket(self, pos: Position) -> int:
+        return int(np.floor(head2head(pos) / self.tolerance))
+
+    def add(self, key: Hashable, pos: Position):
+        """indexes pos under key, e.g. the node it belongs to"""
+        if key in self.positions:
+            raise KeyError(f"{key} is already indexed")
+        self.positions[key] = pos
+        self.order[key] = len(self.order)
+        self.by_canonical_key[canonical_key(pos, self.resolution)].append(key)
+        self.by_head2head[self._head2head_bucket(pos)].append(key)
+
+    def candidates(self, pos: Position) -> List[Hashable]:
+        """keys of every indexed position that could be equivalent to pos, in the order they were added"""
+        bucket = self._head2head_bucket(pos)
+        keys = [key for b in (bucket - 1, bucket, bucket + 1) for key in self.by_head2head.get(b, [])]
+        return sorted(keys, key=self.order.__getitem__)
+
+    def find(self, pos: Position) -> Optional[Hashable]:
+        """
+        returns the key of the earliest added position equivalent to pos, or None if there isn't one. A match among the
+        positions sharing pos's canonical key is usually found first, after which only the candidates added before it
+        still need checking
+        """
+        checked = set()
+        found = None
+        for key in self.by_canonical_key.get(canonical_key(pos, self.resolution), []):
+            checked.add(key)
+            if self.equivalent(pos, self.positions[key]) is True:
+                found = key
+                break
+        for key in self.candidates(pos):
+            if found is not None and self.order[key] >= self.order[found]:
+                break
+            if key not in checked and self.equivalent(pos, self.positions[key]) is True:
+                return key
+        return found
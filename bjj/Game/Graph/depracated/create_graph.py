@@ -1,16 +1,19 @@
 import pandas as pd
 import networkx as nx
 from tqdm import tqdm
-from Graph.depracated.position import positions_are_equivalent, Position
+from Graph.depracated.position import Position
+from Graph.depracated.canonical import CanonicalIndex
+from Graph.grapplemap_reader import PositionRecord, read_grapplemap
 
-def find_or_add_node(pos: Position,row,G):
+def find_or_add_node(pos: Position,row,G,index: CanonicalIndex):
     # note: doesn't need row
-    #check if node exists
-    for node in G.nodes():
-        if positions_are_equivalent(pos,Position(node)):
-            return node
+    #check if node exists. The index only compares pos against nodes in its canonical buckets instead of every node
+    node = index.find(pos)
+    if node is not None:
+        return node
     #makes new node if it doesn't exist
     G.add_node(pos.codeblock,description='Unknown', tags='Unknown', is_explicit_position=False, from_transition=row['description'])
+    index.add(pos.codeblock, pos)
     return pos.codeblock
 
 
@@ -37,6 +40,29 @@ def save_graph_to_csv(G: nx.classes.digraph.DiGraph, nodes_file='files/nodes.csv
     edges_df.to_csv(edges_file, index=False)
     print(f"Edges saved to {edges_file}")
 
+def graph_from_grapplemap_txt(path=None) -> nx.classes.digraph.DiGraph:
+    """
+    builds the same graph as main() in a single streaming pass over GrappleMap.txt instead of grapplemap_df.csv.
+    Only the first and last frame of each transition are kept in memory. Assumes positions come before the transitions
+    that start or end in them, as they do in GrappleMap.txt
+    """
+    G = nx.DiGraph()
+    index = CanonicalIndex()
+    for record in tqdm(read_grapplemap(path, keep_frames=False), desc="Processing GrappleMap.txt"):
+        tags, properties = ' '.join(record.tags), ' '.join(record.properties)
+        if isinstance(record, PositionRecord):
+            G.add_node(record.code, description=record.description, tags=tags, properties=properties, is_explicit_position=True)
+            if record.code not in index:
+                index.add(record.code, Position(record.code))
+            continue
+        row = {'description': record.description}
+        start_node = find_or_add_node(Position(record.start_code), row, G, index)
+        end_node = find_or_add_node(Position(record.end_code), row, G, index)
+        G.add_edge(start_node, end_node, description=record.description, tags=tags, properties=properties)
+        if record.bidirectional:
+            G.add_edge(end_node, start_node, description=record.description, tags=tags, properties=properties)
+    return G
+
 def main():
     grapplemap = pd.read_csv('files/grapplemap_df.csv',
                              dtype={'trans_start_node': 'string', 'trans_end_node': 'string'})
@@ -44,19 +70,22 @@ def main():
     transitions = grapplemap[grapplemap['is_position'] == 0]
     # Create Directed Graph
     G = nx.DiGraph()
+    index = CanonicalIndex()
     # Add nodes (positions)
     for _, row in positions.iterrows():
         G.add_node(row['code'], description=row['description'], tags=row['tags'], properties=row['properties'], is_explicit_position=True)
+        if row['code'] not in index:
+            index.add(row['code'], Position(row['code']))
 
     for idx, row in tqdm(transitions.iterrows(), total=len(transitions), desc="Processing transitions"):
         start_pos = Position(row['start_position'])
         end_pos = Position(row['end_position'])
 
         # find or add start node then update df with result
-        start_node = find_or_add_node(start_pos, row, G)
+        start_node = find_or_add_node(start_pos, row, G, index)
         transitions.loc[idx, 'trans_start_node'] = start_node
         # find or add end node then update df with result
-        end_node = find_or_add_node(end_pos, row, G)
+        end_node = find_or_add_node(end_pos, row, G, index)
         transitions.loc[idx, 'trans_end_node'] = end_node
 
         # Add the edge (transition)
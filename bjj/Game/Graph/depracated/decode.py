@@ -1,17 +1,9 @@
-import string
 from enum import Enum
 import numpy as np
-
-BASE62_DIGITS = string.ascii_lowercase + string.ascii_uppercase + string.digits
-
-def from_base62(c):
-    if 'a' <= c <= 'z':
-        return ord(c) - ord('a')
-    if 'A' <= c <= 'Z':
-        return ord(c) - ord('A') + 26
-    if '0' <= c <= '9':
-        return ord(c) - ord('0') + 52
-    raise ValueError(f"Not a base 62 digit: {c}")
+try:
+    from Graph.depracated.base62 import base62_coordinates
+except ImportError:  # run as a script from this directory
+    from base62 import base62_coordinates
 
 
 class Joint(Enum):
@@ -69,33 +61,26 @@ def make_player_joints():
 PLAYER_JOINTS = make_player_joints()
 
 
+def grapplemap_coordinates(codes) -> np.ndarray:
+    """
+    decodes N position codes at once through base62_coordinates into GrappleMap's own coordinates, in metres with x
+    and z shifted by -2, as a float32 array of shape (N, 2, JOINT_COUNT, 3). Not the space of base62.decode_positions
+    (position.Position), which is 4 times larger and shifted to the range -2 to 2 on every axis
+    """
+    d = base62_coordinates(codes)
+    d[..., 0] -= 2
+    d[..., 2] -= 2
+    return d.astype(np.float32)
+
+
 def decode_position(s):
     if len(s) != ENCODED_POS_SIZE:
         raise ValueError(f"Expected string of length {ENCODED_POS_SIZE}, got {len(s)}")
 
-    offset = 0
-
-    def next_digit():
-        nonlocal offset
-        while offset < len(s) and s[offset].isspace():
-            offset += 1
-        if offset >= len(s):
-            raise ValueError("Unexpected end of string")
-        digit = from_base62(s[offset])
-        offset += 1
-        return digit
-
-    def g():
-        d0 = next_digit() * 62
-        d = (d0 + next_digit()) / 1000
-        return d
-
+    decoded = grapplemap_coordinates([s])[0]
     p = Position()
     for j in PLAYER_JOINTS:
-        x = g() - 2
-        y = g()
-        z = g() - 2
-        p[j] = np.array([x, y, z])
+        p[j] = decoded[j.player, j.joint.value]
 
     return p
 
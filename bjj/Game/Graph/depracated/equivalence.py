@@ -0,0 +1,101 @@
+"""
+Equivalence of whole sets of positions at once, with is_reoriented's checks done on arrays
+
+is_reoriented compares one pair at a time. Here the head2head filter finds the candidate pairs of a whole stack by
+sorting, the limb distance check and the signature cascade run on all of them at once, and the remaining pairs get
+procrustes_disparities for all four orientation variants in batched SVDs, a block of pairs at a time
+"""
+from typing import Iterator, Tuple
+import numpy as np
+from Graph.depracated.position import (CASCADE_COUNTS, CASCADE_LEVELS, count_rejections, decode_positions,
+                                       distance_from_head_batch, head2head_batch, orientation_variants,
+                                       position_signatures, procrustes_disparities, signature_rejections,
+                                       standardize_positions)
+
+HEAD2HEAD_TOLERANCE = 0.05  # is_reoriented's quick filter
+LIMB_TOLERANCE = 0.05  # same_limb_distances' tolerance
+DISPARITY_TOLERANCE = 0.05  # procrustes_analysis' tolerance
+
+
+def as_arrays(positions) -> np.ndarray:
+    """(N, 2, JOINT_COUNT, 3) stack of position codes, or the array itself"""
+    if isinstance(positions, np.ndarray):
+        return positions
+    return decode_positions(list(positions))
+
+
+def _candidate_pairs(head2head: np.ndarray, block_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    (i, j) index pairs with i < j whose head2head values are within HEAD2HEAD_TOLERANCE, about block_size pairs at a
+    time. Only these pairs can be equivalent
+    """
+    order = np.argsort(head2head, kind='stable')
+    values = head2head[order]
+    # the positions after each one in head2head order that are close enough to it
+    ends = np.searchsorted(values, values + HEAD2HEAD_TOLERANCE, side='right')
+    counts = ends - np.arange(len(values)) - 1
+    cumulative = np.cumsum(counts)
+    start = 0
+    while start < len(values):
+        base = cumulative[start - 1] if start else 0
+        stop = min(max(int(np.searchsorted(cumulative, base + block_size, side='right')), start + 1), len(values))
+        firsts = np.repeat(np.arange(start, stop), counts[start:stop])
+        within = np.arange(len(firsts)) - np.repeat(np.cumsum(counts[start:stop]) - counts[start:stop],
+                                                   counts[start:stop])
+        seconds = firsts + 1 + within
+        i, j = order[firsts], order[seconds]
+        yield np.minimum(i, j), np.maximum(i, j)
+        start = stop
+
+
+def equivalent_pairs(positions, block_size: int = 8192, levels=CASCADE_LEVELS) -> np.ndarray:
+    """
+    (num_pairs, 2) index pairs (i, j), i < j and in ascending order, of the positions is_reoriented considers
+    equivalent. positions is a (N, 2, JOINT_COUNT, 3) array or a sequence of position codes. levels are the
+    signature levels checked before procrustes
+    """
+    arrays = as_arrays(positions)
+    head2head = head2head_batch(arrays.astype(np.float64))
+    limb_distances = distance_from_head_batch(arrays).reshape(len(arrays), -1)
+    standardized = np.moveaxis(standardize_positions(orientation_variants(arrays)), 0, 1)
+    signatures = position_signatures(arrays, levels)
+    pairs = []
+    candidates = 0
+    for i, j in _candidate_pairs(head2head, block_size):
+        candidates += len(i)
+        # np.allclose(a, b, atol) of same_limb_distances, row by row
+        difference = np.abs(limb_distances[i] - limb_distances[j])
+        equivalent = np.all(difference <= LIMB_TOLERANCE + 1e-5 * np.abs(limb_distances[j]), axis=1)
+        CASCADE_COUNTS['limb_distances_match'] += int(equivalent.sum())
+        rest = np.flatnonzero(~equivalent)
+        rejections = signature_rejections(signatures, i[rest], j[rest], DISPARITY_TOLERANCE, levels)
+        count_rejections(rejections)
+        rest = rest[rejections < 0]
+        disparities = procrustes_disparities(standardized[i[rest], :1], standardized[j[rest]])
+        equivalent[rest] = np.any(disparities < DISPARITY_TOLERANCE, axis=1)
+        CASCADE_COUNTS['procrustes_match'] += int(equivalent[rest].sum())
+        CASCADE_COUNTS['procrustes_reject'] += int(len(rest) - equivalent[rest].sum())
+        pairs.append(np.stack([i[equivalent], j[equivalent]], axis=1))
+    CASCADE_COUNTS['head2head_reject'] += len(arrays) * (len(arrays) - 1) // 2 - candidates
+    pairs = np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=np.intp)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def deduplicate(positions, block_size: int = 8192) -> np.ndarray:
+    """
+    representative of every position: the index of the first earlier representative it is equivalent to, or its
+    own index. Like adding the positions to a CanonicalIndex in order, without a Python-level comparison per pair
+    """
+    arrays = as_arrays(positions)
+    pairs = equivalent_pairs(arrays, block_size)
+    # for each position, its equivalent earlier positions in ascending order
+    pairs = pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]
+    starts = np.searchsorted(pairs[:, 1], np.arange(len(arrays) + 1))
+    earlier = pairs[:, 0].tolist()
+    representative = list(range(len(arrays)))
+    for position in range(len(arrays)):
+        for other in earlier[starts[position]:starts[position + 1]]:
+            if representative[other] == other:
+                representative[position] = other
+                break
+    return np.array(representative, dtype=np.intp)
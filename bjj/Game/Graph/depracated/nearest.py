@@ -0,0 +1,181 @@
+"""
+Nearest-neighbour search over GrappleMap positions, e.g. "give me the k positions most similar to this pose"
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+from typing import TYPE_CHECKING, Hashable, Iterable, List, Sequence, Tuple
+from Graph.depracated.position import Position, decode_positions
+from Graph.depracated.canonical import normalize_orientation, reorientation_variants
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+VARIANT_COUNT = 4  # as is, swapped, mirrored, mirrored and swapped
+
+
+def as_position_arrays(positions) -> np.ndarray:
+    """stacks Positions, position codes or (2, JOINT_COUNT, 3) arrays into one (N, 2, JOINT_COUNT, 3) array"""
+    if isinstance(positions, (str, Position)) or (isinstance(positions, np.ndarray) and positions.ndim == 3):
+        positions = [positions]
+    if isinstance(positions, np.ndarray):
+        return positions
+    positions = list(positions)
+    if positions and all(isinstance(p, str) for p in positions):
+        return decode_positions(positions)
+    return np.stack([p.array if isinstance(p, Position) else Position(p).array for p in positions])
+
+
+def position_vectors(arrays: np.ndarray) -> np.ndarray:
+    """
+    flattens a (N, 2, JOINT_COUNT, 3) stack of positions into (N, VARIANT_COUNT, 2 * JOINT_COUNT * 3) vectors, one per
+    mirror/swap variant, each translated and rotated with normalize_orientation
+    """
+    variants = normalize_orientation(reorientation_variants(arrays))
+    return np.moveaxis(variants, 0, 1).reshape(len(arrays), VARIANT_COUNT, -1)
+
+
+def query_vectors(positions) -> np.ndarray:
+    """(N, 2 * JOINT_COUNT * 3) vectors of the query positions as is. Only the indexed positions need every variant"""
+    arrays = as_position_arrays(positions).astype(np.float64)
+    return normalize_orientation(arrays).reshape(len(arrays), -1)
+
+
+class PositionTree:
+    """
+    KD-tree over the canonicalized coordinates of every indexed position
+
+    Every position is indexed under each of its mirror/swap variants, and queried as is. Distances are therefore
+    invariant to translation, rotation around the vertical axis, mirroring and swapping players, without relying on
+    a canonical variant being picked consistently for noisy near-duplicates.
+
+    Positions that are appended after the tree was built are searched by brute force until rebuild_threshold of them
+    have piled up, at which point the tree is rebuilt
+    """
+    def __init__(self, keys: Sequence[Hashable] = (), positions=(), rebuild_threshold: int = 256, leafsize: int = 64):
+        self.rebuild_threshold = rebuild_threshold
+        self.leafsize = leafsize
+        self.keys: List[Hashable] = []
+        self._vectors = np.empty((0, VARIANT_COUNT, 0))
+        self._tree = None
+        self._tree_size = 0  # number of keys covered by the tree. The rest are pending
+        if len(keys):
+            self.append(keys, positions)
+        self.rebuild()
+
+    @classmethod
+    def from_codes(cls, codes: Iterable[str], **kwargs) -> 'PositionTree':
+        """indexes each unique position code under itself"""
+        codes = list(dict.fromkeys(codes))
+        return cls(codes, decode_positions(codes), **kwargs)
+
+    @classmethod
+    def from_dataframe(cls, grapplemap: 'pd.DataFrame', **kwargs) -> 'PositionTree':
+        """indexes every position in grapplemap_df.csv, as well as the start and end positions of every transition"""
+        codes = list(grapplemap.loc[grapplemap['is_position'] == 1, 'code'])
+        transitions = grapplemap[grapplemap['is_transition'] == 1]
+        codes += list(transitions['start_position']) + list(transitions['end_position'])
+        return cls.from_codes(codes, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def append(self, keys: Sequence[Hashable], positions):
+        """adds positions under keys. The tree is only rebuilt once enough positions are pending"""
+        arrays = as_position_arrays(positions)
+        keys = list(keys)
+        if len(keys) != len(arrays):
+            raise ValueError(f"got {len(keys)} keys for {len(arrays)} positions")
+        vectors = position_vectors(arrays)
+        self._vectors = np.concatenate([self._vectors, vectors]) if len(self._vectors) else vectors
+        self.keys.extend(keys)
+        if len(self.keys) - self._tree_size >= self.rebuild_threshold:
+            self.rebuild()
+
+    def rebuild(self):
+        """rebuilds the KD-tree over every indexed position"""
+        self._tree_size = len(self.keys)
+        if self._tree_size:
+            vectors = np.ascontiguousarray(self._vectors.reshape(self._tree_size * VARIANT_COUNT, -1))
+            self._tree = cKDTree(vectors, leafsize=self.leafsize)
+
+    def _pending_vectors(self) -> np.ndarray:
+        return self._vectors[self._tree_size:].reshape(-1, self._vectors.shape[-1])
+
+    def _candidates(self, queries: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """distances and key indices of the nearest count variant vectors to each query, nearest first"""
+        distances = np.full((len(queries), 0), np.inf)
+        indices = np.zeros((len(queries), 0), dtype=int)
+        if self._tree is not None and self._tree_size:
+            count_in_tree = min(count, self._tree_size * VARIANT_COUNT)
+            distances, rows = self._tree.query(queries, k=count_in_tree, workers=-1)
+            distances, rows = distances.reshape(len(queries), -1), rows.reshape(len(queries), -1)
+            indices = rows // VARIANT_COUNT
+        pending = self._pending_vectors()
+        if len(pending):
+            pending_distances = np.linalg.norm(queries[:, None] - pending[None], axis=-1)
+            pending_indices = self._tree_size + np.arange(len(pending)) // VARIANT_COUNT
+            distances = np.concatenate([distances, pending_distances], axis=1)
+            indices = np.concatenate([indices, np.broadcast_to(pending_indices, pending_distances.shape)], axis=1)
+            order = np.argsort(distances, axis=1)[:, :count]
+            distances = np.take_along_axis(distances, order, axis=1)
+            indices = np.take_along_axis(indices, order, axis=1)
+        return distances, indices
+
+    def query(self, positions, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k most similar indexed positions to each of the M query positions
+
+        Inputs:
+            positions: a Position, position code or (2, JOINT_COUNT, 3) array, or a batch of them
+            k (int): number of neighbours to return per query
+        Returns:
+            np.ndarray: (M, k) distances, nearest first. Padded with np.inf if fewer than k positions are indexed
+            np.ndarray: (M, k) object array of the neighbours' keys. Padded with None
+        """
+        queries = query_vectors(positions)
+        # each key is indexed VARIANT_COUNT times, so this many variants always cover k distinct keys
+        distances, indices = self._candidates(queries, k * VARIANT_COUNT)
+        out_distances = np.full((len(queries), k), np.inf)
+        out_keys = np.full((len(queries), k), None, dtype=object)
+        for q in range(len(queries)):
+            seen = set()
+            for distance, index in zip(distances[q], indices[q]):
+                if index in seen or not np.isfinite(distance):
+                    continue
+                out_distances[q, len(seen)] = distance
+                out_keys[q, len(seen)] = self.keys[index]
+                seen.add(index)
+                if len(seen) == k:
+                    break
+        return out_distances, out_keys
+
+    def query_radius(self, positions, r: float) -> List[List[Tuple[Hashable, float]]]:
+        """returns, for each query position, the (key, distance) of every indexed position within r, nearest first"""
+        queries = query_vectors(positions)
+        vectors = self._vectors.reshape(-1, self._vectors.shape[-1])
+        results = []
+        for query in queries:
+            nearest = {}
+            rows = self._tree.query_ball_point(query, r) if self._tree is not None and self._tree_size else []
+            rows = np.concatenate([np.asarray(rows, dtype=int), self._tree_size * VARIANT_COUNT +
+                                   np.arange(len(self._pending_vectors()))])
+            for row, distance in zip(rows, np.linalg.norm(vectors[rows] - query, axis=-1)):
+                index = row // VARIANT_COUNT
+                if distance <= r and distance < nearest.get(index, np.inf):
+                    nearest[index] = distance
+            results.append(sorted(((self.keys[i], d) for i, d in nearest.items()), key=lambda item: item[1]))
+        return results
+
+    def save(self, path: str):
+        """saves the indexed vectors and keys to an .npz file. Keys are stored as strings"""
+        np.savez(path, vectors=self._vectors, keys=np.array([str(key) for key in self.keys]),
+                 rebuild_threshold=self.rebuild_threshold, leafsize=self.leafsize)
+
+    @classmethod
+    def load(cls, path: str) -> 'PositionTree':
+        with np.load(path) as data:
+            tree = cls(rebuild_threshold=int(data['rebuild_threshold']), leafsize=int(data['leafsize']))
+            tree._vectors = data['vectors']
+            tree.keys = [str(key) for key in data['keys']]
+        tree.rebuild()
+        return tree
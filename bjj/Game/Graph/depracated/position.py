@@ -1,13 +1,49 @@
+import math
+import os
+from collections import Counter
 import numpy as np
 from enum import Enum
 from dataclasses import dataclass
-from typing import Dict, Tuple, Optional
-import pandas as pd
-from scipy.spatial import procrustes
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple, Optional
+try:
+    from Graph.depracated.base62 import decode_positions
+except ImportError:  # imported as a top-level module, e.g. by plot_3d or from the notebooks
+    from base62 import decode_positions
 
-grapplemap = pd.read_csv('files/grapplemap_df.csv', dtype={'trans_start_node': 'string', 'trans_end_node': 'string'})
-positions = grapplemap[grapplemap['is_position'] == 1]
-transitions = grapplemap[grapplemap['is_transition'] == 1]
+GRAPPLEMAP_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'files/grapplemap_df.csv')
+
+
+@lru_cache(maxsize=None)
+def load_grapplemap(path: str = GRAPPLEMAP_CSV):
+    """
+    grapplemap_df.csv as a DataFrame, read on first use and cached per path. pandas is only imported here, so using
+    Joint or Position doesn't pay for it
+    """
+    import pandas as pd
+    return pd.read_csv(path, dtype={'trans_start_node': 'string', 'trans_end_node': 'string'})
+
+
+@lru_cache(maxsize=None)
+def load_positions(path: str = GRAPPLEMAP_CSV):
+    grapplemap = load_grapplemap(path)
+    return grapplemap[grapplemap['is_position'] == 1]
+
+
+@lru_cache(maxsize=None)
+def load_transitions(path: str = GRAPPLEMAP_CSV):
+    grapplemap = load_grapplemap(path)
+    return grapplemap[grapplemap['is_transition'] == 1]
+
+
+# module attributes that are only loaded when they are first accessed, from GRAPPLEMAP_CSV
+DATASETS = {'grapplemap': load_grapplemap, 'positions': load_positions, 'transitions': load_transitions}
+
+
+def __getattr__(name: str):
+    if name in DATASETS:
+        return DATASETS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Joint(Enum):
     LeftToe = 0
@@ -55,125 +91,292 @@ MIRROR_JOINTS = {
 MIRROR_JOINTS.update({v: k for k, v in MIRROR_JOINTS.items()})
 
 class Position:
+    """
+    A pair of players' joint coordinates, stored in a single contiguous (2, JOINT_COUNT, 3) array so that whole
+    position transforms are array operations. Individual joints are still indexed with (player, joint) keys
+    """
+    __slots__ = ('array', 'player0', 'player1', 'codeblock', '_variants', '_limb_distances', '_standardized',
+                 '_signature')
+
     def __init__(self, input_data):
+        self.codeblock = None
+        # derived arrays, computed on first use so that comparing a position against many others computes them once
+        self._variants = None
+        self._limb_distances = None
+        self._standardized = None
+        self._signature = None
         if isinstance(input_data, str) and len(input_data) == 276:
-            self.coords = self.decode_position(input_data)
+            array = decode_positions([input_data])[0]
             self.codeblock = input_data
+        elif isinstance(input_data, np.ndarray) and input_data.shape == (2, JOINT_COUNT, 3):
+            # e.g. a row of decode_positions(). The array is wrapped as is, so nothing is copied
+            array = input_data
         elif isinstance(input_data, dict) and len(input_data) == 46:
-            self.coords = input_data
+            array = np.array([input_data[(player, joint.value)] for player in range(2) for joint in Joint])
         elif isinstance(input_data, list) and np.shape(input_data) == (46, 3):
             #Assuming this list was generated from a Position.coords dict, and thus the ordering is perserved. If not, then the generated position will be entirely wrong
-            coords = {}
-            for player in range(2):
-                for joint in Joint:
-                    coords[(player, joint.value)] = input_data.pop(0)
-            self.coords = coords
+            array = np.array(input_data)
         else:
-            raise ValueError("Input must be either a string, a dictionary, or a list")
-        if self.coords:
-            self.player0 = {k: v for k, v in self.coords.items() if k[0] == 0}
-            self.player1 = {k: v for k, v in self.coords.items() if k[0] == 1}
-    def decode_position(self, s):
-        if len(s) != ENCODED_POS_SIZE:
-            raise ValueError(f"Expected string of length {ENCODED_POS_SIZE}, got {len(s)}")
-
-        def from_base62(c):
-            if 'a' <= c <= 'z':
-                return ord(c) - ord('a')
-            if 'A' <= c <= 'Z':
-                return ord(c) - ord('A') + 26
-            if '0' <= c <= '9':
-                return ord(c) - ord('0') + 52
-            raise ValueError(f"Not a base 62 digit: {c}")
-
-        coords = {}
-        offset = 0
-
-        def next_digit():
-            nonlocal offset
-            while offset < len(s) and s[offset].isspace():
-                offset += 1
-            if offset >= len(s):
-                raise ValueError("Unexpected end of string")
-            digit = from_base62(s[offset])
-            offset += 1
-            return digit
-
-        def g():
-            d0 = next_digit() * 62
-            d = (d0 + next_digit()) / 1000
-            return d * 4 - 2  # Scale to range -2 to 2
+            raise ValueError("Input must be either a string, a dictionary, a list, or an array")
+        self.array = array.reshape(2, JOINT_COUNT, 3)
+        # views of each player's (JOINT_COUNT, 3) coordinates
+        self.player0 = self.array[0]
+        self.player1 = self.array[1]
 
-        for player in range(2):
-            for joint in Joint:
-                x, y, z = g(), g(), g()
-                coords[(player, joint.value)] = np.array([x, y, z])
-
-        return coords
+    @property
+    def coords(self) -> dict:
+        """(player, joint) -> coordinates dict for older callers. The values are views into the position's array"""
+        return dict(self.items())
 
     def __getitem__(self, key):
-        return self.coords[key]
+        return self.array[key]
 
     def __setitem__(self, key, value):
-        self.coords[key] = value
+        self.array[key] = value
+        self._variants = self._limb_distances = self._standardized = self._signature = None
+
+    @property
+    def variants(self) -> np.ndarray:
+        """orientation_variants of the position, cached"""
+        if self._variants is None:
+            self._variants = orientation_variants(self.array)
+        return self._variants
+
+    @property
+    def limb_distances(self) -> np.ndarray:
+        """(2, JOINT_COUNT, 3) distance_from_head of both players, cached"""
+        if self._limb_distances is None:
+            self._limb_distances = distance_from_head_batch(self.array)
+        return self._limb_distances
+
+    @property
+    def standardized_variants(self) -> np.ndarray:
+        """(4, 2 * JOINT_COUNT, 3) standardize_positions of the orientation variants, cached"""
+        if self._standardized is None:
+            self._standardized = standardize_positions(self.variants)
+        return self._standardized
+
+    @property
+    def signature(self):
+        """PositionSignature of the position, cached"""
+        if self._signature is None:
+            self._signature = position_signatures(self.array)
+        return self._signature
 
     def items(self):
-        return self.coords.items()
+        for player in range(2):
+            for joint in range(JOINT_COUNT):
+                yield (player, joint), self.array[player, joint]
 
 def mirror_joint(joint: int) -> int:
     joint_enum = Joint(joint)
     if joint_enum in MIRROR_JOINTS:
         return MIRROR_JOINTS[joint_enum].value
     return joint
+# MIRROR_INDEX[joint] is the joint on the other side of the body, e.g. LeftToe <-> RightToe
+MIRROR_INDEX = np.array([mirror_joint(joint.value) for joint in Joint])
+# flips the x-axis
+MIRROR_SIGN = np.array([-1, 1, 1])
+
+# batch transforms over (..., 2, JOINT_COUNT, 3) arrays of positions, e.g. decode_positions() output
+
+def mirror_batch(arrays: np.ndarray) -> np.ndarray:
+    """mirrors every position: left and right joints trade places and the x-axis flips"""
+    return arrays[..., MIRROR_INDEX, :] * MIRROR_SIGN.astype(arrays.dtype)
+
+def swap_players_batch(arrays: np.ndarray) -> np.ndarray:
+    """swaps the players of every position. A view of arrays"""
+    return arrays[..., ::-1, :, :]
+
+def distance_from_head_batch(arrays: np.ndarray) -> np.ndarray:
+    """vector from each joint to the head of the same player, for every position and both players"""
+    head = Joint.Head.value
+    return arrays[..., head:head + 1, :] - arrays
+
+def head2head_batch(arrays: np.ndarray) -> np.ndarray:
+    """squared distance between the players' heads, per position"""
+    head = Joint.Head.value
+    return np.sum((arrays[..., 0, head, :] - arrays[..., 1, head, :]) ** 2, axis=-1)
+
+def orientation_variants(arrays: np.ndarray) -> np.ndarray:
+    """
+    (4, ..., 2, JOINT_COUNT, 3) stack of the positions as they are, with swapped players, mirrored, and mirrored with
+    swapped players: the orientations is_reoriented tries, in its order
+    """
+    mirrored = mirror_batch(arrays)
+    return np.stack([arrays, swap_players_batch(arrays), mirrored, swap_players_batch(mirrored)])
+
 def mirror(pos: Position) -> Position:
-    mirrored = {}
-    for (player, joint), v in pos.coords.items():
-        mirrored_joint = mirror_joint(joint)
-        mirrored[(player, mirrored_joint)] = np.array([-v[0], v[1], v[2]])
-    return Position(mirrored)
+    return Position(mirror_batch(pos.array))
 
-def distance_from_head(pos: Position,player_num: int) -> list:
+def distance_from_head(pos: Position,player_num: int) -> np.ndarray:
     assert player_num in (0,1), 'player_num value should be 0 or 1, denoting which player to apply function to'
-    players_coords = {k: v for k, v in pos.coords.items() if k[0] == player_num}
-    head_coord = pos[(player_num, Joint.Head.value)]
-    distances = []
-    for coord in players_coords.values():
-        distances.append(np.subtract(head_coord, coord))
-    return distances
+    return pos.limb_distances[player_num]
 def calc_limb_distances(pos: Position) -> dict:
-    player0,player1 = distance_from_head(pos,0),distance_from_head(pos,1)
-    return {0: player0, 1: player1}
+    return {0: pos.limb_distances[0], 1: pos.limb_distances[1]}
 
 def same_limb_distances(pos1: Position,pos2: Position, tolerance=0.05) -> bool:
-    pos1_distances = calc_limb_distances(pos1)
-    pos2_distances = calc_limb_distances(pos2)
-
-    for player in (0, 1):
-        distances1 = pos1_distances[player]
-        distances2 = pos2_distances[player]
-        for dist1,dist2 in zip(distances1,distances2):
-            # print(np.sum(dist1),np.sum(dist2))
-            if not np.allclose(dist1, dist2, atol=tolerance):
-                return False
-    return True
+    return np.allclose(pos1.limb_distances, pos2.limb_distances, atol=tolerance)
 def pos_to_list(pos: Position) -> list:
     """returns a list of a positions coordinates"""
     if isinstance(pos,str): pos = Position(pos)
-    return list(pos.coords.values())
+    return list(np.asarray(getattr(pos, 'array', pos)).reshape(-1, 3))
+def standardize_positions(arrays: np.ndarray) -> np.ndarray:
+    """
+    (..., 2 * JOINT_COUNT, 3) float64 joints of a stack of (..., 2, JOINT_COUNT, 3) positions, centered on their mean
+    and scaled to unit Frobenius norm, as scipy.spatial.procrustes does before fitting
+    """
+    points = np.asarray(arrays, dtype=np.float64).reshape(*np.shape(arrays)[:-3], -1, 3)
+    points = points - points.mean(axis=-2, keepdims=True)
+    norm = np.sqrt(np.sum(points ** 2, axis=(-2, -1), keepdims=True))
+    return points / np.where(norm > 0, norm, 1)
+
+def procrustes_disparities(standardized1: np.ndarray, standardized2: np.ndarray) -> np.ndarray:
+    """
+    scipy.spatial.procrustes disparities between standardize_positions outputs, broadcast over their leading axes.
+    The optimal rotation and scaling of two standardized point sets leaves a disparity of 1 - (sum of the singular
+    values of their cross-covariance)^2, so one batched SVD of 3x3 matrices does every pair at once
+    """
+    covariance = np.einsum('...pi,...pj->...ij', standardized2, standardized1)
+    singular_values = np.linalg.svd(covariance, compute_uv=False)
+    return np.maximum(1 - singular_values.sum(axis=-1) ** 2, 0)
+
 def procrustes_analysis(pos1: Position, pos2: Position,tolerance=0.05) -> bool:
     """ performs orthogonal procrustes analysis to see if one position can be rotated and reflected into another """
-    _,_,disparity = procrustes(pos_to_list(pos1),pos_to_list(pos2))
+    disparity = procrustes_disparities(standardize_positions(getattr(pos1, 'array', pos1)),
+                                       standardize_positions(getattr(pos2, 'array', pos2)))
     if disparity < tolerance:
         return True
     else:
         return False
+
+
+# Rotation invariant signatures of positions, to reject pairs that can't pass procrustes_analysis before running it
+#
+# Procrustes fits one position onto another by translation, rotation, reflection and scaling, so the signatures are taken
+# from the standardized joints (see standardize_positions) and only use distances. They only reject a pair when they prove
+# that its disparity is at least the tolerance, never a pair procrustes would accept: with a standardized position A, a
+# standardized variant B and a disparity d < tolerance, the fitted A - sBR has norm sqrt(d) and scale s = sqrt(1 - d), so
+# each signature differs between A and the matching variant of B by less than signature_bound(tolerance) in L2 norm:
+#     - centroid_spread: the norm of each player's joints around the player's centroid, sorted, 2 values
+#     - joint_radii: the distance of every joint from the centroid of the position, 46 values
+#     - inter_player: the distances between the joints of one player and those of the other, 529 values
+#     - pairwise: the distances between every pair of joints, 1035 values
+# Pairwise distances are divided by the square root of the number of joints, which is their norm for a standardized
+# position. Except for the centroid spreads, signatures keep track of the joints they come from and are compared with
+# each of the four swap/mirror variants, a pair is rejected when no variant is close enough. The levels go from the
+# cheapest to the most selective, and each one only looks at the pairs the ones before it kept
+#
+# CASCADE_LEVELS are the levels checked by default. Among the GrappleMap positions' pairs that pass the head2head filter,
+# joint_radii rejects 84% of those procrustes would reject. inter_player and pairwise catch most of the rest, but
+# comparing 529 or 1035 values under four variants costs more than the batched procrustes fit they would save
+#
+# CASCADE_COUNTS counts the outcome of every check of is_reoriented's cascade and of equivalence.equivalent_pairs.
+# The signatures live here rather than in their own module so that position.py stays importable on its own, e.g. from
+# the notebooks
+
+DISPARITY_TOLERANCE = 0.05  # procrustes_analysis' tolerance
+LEVELS = ('centroid_spread', 'joint_radii', 'inter_player', 'pairwise')
+CASCADE_LEVELS = ('centroid_spread', 'joint_radii')
+
+# e.g. {'head2head_reject': 812, 'limb_distances_match': 3, 'joint_radii_reject': 40, 'procrustes_match': 1, ...}
+CASCADE_COUNTS: Counter = Counter()
+
+# VARIANT_JOINTS[v, k] is the joint, counted over both players, that is joint k of orientation variant v
+VARIANT_JOINTS = orientation_variants(np.repeat(np.arange(2 * JOINT_COUNT).reshape(2, JOINT_COUNT, 1), 3, axis=-1))
+VARIANT_JOINTS = VARIANT_JOINTS[..., 1].reshape(4, -1)
+PAIR_FIRST, PAIR_SECOND = np.triu_indices(2 * JOINT_COUNT, k=1)
+_pair_index = np.zeros((2 * JOINT_COUNT, 2 * JOINT_COUNT), dtype=np.intp)
+_pair_index[PAIR_FIRST, PAIR_SECOND] = _pair_index[PAIR_SECOND, PAIR_FIRST] = np.arange(len(PAIR_FIRST))
+# the same for pairs of joints
+VARIANT_PAIRS = _pair_index[VARIANT_JOINTS[:, PAIR_FIRST], VARIANT_JOINTS[:, PAIR_SECOND]]
+INTER_PLAYER = np.flatnonzero((PAIR_FIRST < JOINT_COUNT) & (PAIR_SECOND >= JOINT_COUNT))
+
+
+class PositionSignature(NamedTuple):
+    """signatures of a position, or of a stack of positions along the first axis"""
+    centroid_spread: np.ndarray  # (..., 2)
+    joint_radii: np.ndarray  # (..., 2 * JOINT_COUNT)
+    pairwise: Optional[np.ndarray]  # (..., len(PAIR_FIRST)), inter_player are its INTER_PLAYER columns
+
+
+def signature_bound(tolerance: float = DISPARITY_TOLERANCE) -> float:
+    """largest difference between the signatures of two positions with a disparity under tolerance"""
+    return math.sqrt(tolerance) + 1 - math.sqrt(1 - tolerance)
+
+
+def position_signatures(arrays: np.ndarray, levels=LEVELS) -> PositionSignature:
+    """signatures of a (..., 2, JOINT_COUNT, 3) stack of positions. pairwise is None unless levels need it"""
+    points = standardize_positions(arrays)
+    players = points.reshape(*points.shape[:-2], 2, JOINT_COUNT, 3)
+    players = players - players.mean(axis=-2, keepdims=True)
+    spread = np.sort(np.sqrt(np.sum(players ** 2, axis=(-2, -1))), axis=-1)
+    radii = np.linalg.norm(points, axis=-1)
+    if 'inter_player' not in levels and 'pairwise' not in levels:
+        return PositionSignature(spread, radii, None)
+    pairwise = np.linalg.norm(points[..., PAIR_FIRST, :] - points[..., PAIR_SECOND, :], axis=-1)
+    return PositionSignature(spread, radii, pairwise / math.sqrt(2 * JOINT_COUNT))
+
+
+def _level_distances(signatures: PositionSignature, first: np.ndarray, second: np.ndarray, level: str) -> np.ndarray:
+    """
+    distance between the signatures of positions first and second of a stack at a level, for the closest variant of
+    the second position
+    """
+    if level == 'centroid_spread':
+        return np.linalg.norm(signatures.centroid_spread[first] - signatures.centroid_spread[second], axis=-1)
+    if level == 'joint_radii':
+        values, variants = signatures.joint_radii, VARIANT_JOINTS
+    else:
+        values = signatures.pairwise
+        variants = VARIANT_PAIRS[:, INTER_PLAYER] if level == 'inter_player' else VARIANT_PAIRS
+    values1, values2 = values[first][:, variants[0]], values[second]
+    distances = np.full(len(first), np.inf)
+    for columns in variants:
+        difference = values1 - values2[:, columns]
+        np.minimum(distances, np.sqrt(np.einsum('ij,ij->i', difference, difference)), out=distances)
+    return distances
+
+
+def signature_rejections(signatures: PositionSignature, first: np.ndarray, second: np.ndarray,
+                         tolerance: float = DISPARITY_TOLERANCE, levels=CASCADE_LEVELS) -> np.ndarray:
+    """
+    for the pairs (first[k], second[k]) of a stack of signatures, the index in LEVELS of the first of levels that
+    rejects each pair, -1 if none does
+    """
+    bound = signature_bound(tolerance) + 1e-9
+    rejections = np.full(len(first), -1, dtype=np.int8)
+    kept = np.arange(len(first))
+    for name in levels:
+        if not len(kept):
+            break
+        rejected = _level_distances(signatures, first[kept], second[kept], name) > bound
+        rejections[kept[rejected]] = LEVELS.index(name)
+        kept = kept[~rejected]
+    return rejections
+
+
+def signature_rejection(signature1: PositionSignature, signature2: PositionSignature,
+                        tolerance: float = DISPARITY_TOLERANCE, levels=CASCADE_LEVELS) -> Optional[str]:
+    """the first of levels that rejects a pair of positions, None if none does"""
+    signatures = PositionSignature(*(None if values[0] is None else np.stack(values)
+                                     for values in zip(signature1, signature2)))
+    level = signature_rejections(signatures, np.array([0]), np.array([1]), tolerance, levels)[0]
+    return LEVELS[level] if level >= 0 else None
+
+
+def count_rejections(rejections: np.ndarray):
+    """adds the output of signature_rejections to CASCADE_COUNTS"""
+    for level, count in enumerate(np.bincount(rejections + 1, minlength=len(LEVELS) + 1)[1:]):
+        if count:
+            CASCADE_COUNTS[f'{LEVELS[level]}_reject'] += int(count)
 # def basically_same(pos1, pos2, tolerance=0.12):
 #     return all(np.linalg.norm(np.abs(pos1[k]) - np.abs(pos2[k])) < tolerance for k in pos1.coords.keys())
 
 
 
 def head2head(p):
-    return np.sum((p[(0, Joint.Head.value)] - p[(1, Joint.Head.value)]) ** 2)
+    return head2head_batch(np.asarray(getattr(p, 'array', p)))
 
 def swap_players(pos: Position) -> Position:
     # swapped_dict = {}
@@ -181,33 +384,31 @@ def swap_players(pos: Position) -> Position:
     #     swapped_dict[key1] = value2
     #     swapped_dict[key2] = value1
     # return Position(swapped_dict)
-    keys = list(pos.coords.keys())
-    vals = list(pos.coords.values())
-    swapped_vals = vals[23:] + vals[:23]
-    swapped_dict = {key: value for key, value in zip(keys, swapped_vals)}
-    return Position(swapped_dict)
+    return Position(swap_players_batch(pos.array).copy())
 
 
 
 def is_reoriented(a, b):
     # quick way to filter out positions that are not at all similar
     if abs(head2head(a) - head2head(b)) > 0.05:
+        CASCADE_COUNTS['head2head_reject'] += 1
         return None
 
     r = same_limb_distances(a, b)
-    if r is not True:
-        # procrustes
-        r = procrustes_analysis(a,b)
-    if r is not True:
-        #swapped players
-        b_swapped = swap_players(b)
-        r = procrustes_analysis(a, b_swapped)
-    if r is not True:
-        #mirrored players
-        r = procrustes_analysis(a,mirror(b))
-    if r is not True:
-        #mirrored and swapped
-        r = procrustes_analysis(a,mirror(b_swapped))
+    if r is True:
+        CASCADE_COUNTS['limb_distances_match'] += 1
+        return r
+    # rotation invariant signatures reject most of the remaining pairs without fitting them, see PositionSignature
+    level = signature_rejection(a.signature, b.signature)
+    if level is not None:
+        CASCADE_COUNTS[f'{level}_reject'] += 1
+        return False
+    # procrustes against b, swapped players, mirrored players, mirrored and swapped, in one batched call. Signatures
+    # and standardized variants are cached on the positions, so they are only computed once however many positions
+    # they are compared to
+    disparities = procrustes_disparities(a.standardized_variants[0], b.standardized_variants)
+    r = bool(np.any(disparities < 0.05))
+    CASCADE_COUNTS['procrustes_match' if r else 'procrustes_reject'] += 1
     return r
 
 
@@ -236,3 +437,5 @@ def positions_are_equivalent(pos1, pos2):
 # example_pos = Position(example_row)
 # print('hold')
 
+# every public name, as a star import took before the datasets were loaded lazily. Star imports load the datasets
+__all__ = [name for name in list(globals()) if not name.startswith('_')] + list(DATASETS)
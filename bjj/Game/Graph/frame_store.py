@@ -0,0 +1,118 @@
+"""
+Frame store: the decoded frames of every GrappleMap transition, in one memory-mapped array
+
+add_edges drops the frames of the transitions, since keeping them on the graph's edges would weigh down every copy of
+the graph. They are stored here instead, once, as a (total_frames, 2, JOINT_COUNT, 3) float32 .npy file with an
+offsets index: the frames of transition t are frames[offsets[t]:offsets[t + 1]]. Edges find their frames through their
+transition 'id', and reads are slices of the memory map, so nothing is loaded or copied until it is used
+"""
+import hashlib
+import os
+import struct
+from typing import Dict, Optional
+import numpy as np
+from Graph.graph_cache import DEFAULT_CACHE_DIR, _atomic_write
+from Graph.grapplemap_reader import GRAPPLEMAP_TXT, TransitionRecord, read_grapplemap
+from Graph.depracated.position import JOINT_COUNT
+
+FRAMES_FILE = 'frames.npy'
+OFFSETS_FILE = 'frame_offsets.npy'
+FRAME_SHAPE = (2, JOINT_COUNT, 3)
+FRAME_DTYPE = np.dtype('<f4')
+# room for the .npy header, which is written once the number of frames is known
+HEADER_SIZE = 128
+STORE_VERSION = 2  # bump when the layout or the decoding of the stored frames changes
+
+
+def _npy_header(num_frames: int) -> bytes:
+    """a version 1.0 .npy header of exactly HEADER_SIZE bytes, for num_frames frames"""
+    header = repr({'descr': FRAME_DTYPE.str, 'fortran_order': False, 'shape': (num_frames, *FRAME_SHAPE)})
+    # magic string, version, header length, then the header padded with spaces and ended by a newline
+    prefix_size = 6 + 2 + 2
+    header = header.ljust(HEADER_SIZE - prefix_size - 1) + '\n'
+    return b'\x93NUMPY' + bytes([1, 0]) + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+def store_key(grapplemap_path: str) -> str:
+    """
+    sha256 over the contents of GrappleMap.txt and STORE_VERSION. The frames only depend on these, unlike the compiled
+    graph, so editing the code that annotates the graph doesn't rebuild them
+    """
+    digest = hashlib.sha256(f'frames {STORE_VERSION}'.encode())
+    with open(grapplemap_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FrameStore:
+    """
+    Frames of the transitions, by GrappleMap transition id
+
+    Inputs:
+        path (str): directory holding frames.npy and frame_offsets.npy, see build()
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = np.load(os.path.join(path, FRAMES_FILE), mmap_mode='r')
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE))
+        self._offsets = self.offsets.tolist()
+
+    @staticmethod
+    def build(path: str, grapplemap_path: Optional[str] = None) -> str:
+        """
+        decodes the frames of every transition of GrappleMap.txt in one streaming pass, appending them to
+        path/frames.npy as they are read. Only one transition's frames are in memory at a time
+        """
+        counts = []
+
+        def write_frames(file):
+            file.write(b'\0' * HEADER_SIZE)
+            for record in read_grapplemap(grapplemap_path, keep_frames=True):
+                if isinstance(record, TransitionRecord):
+                    file.write(record.positions().astype(FRAME_DTYPE, copy=False).tobytes())
+                    counts.append(record.num_frames)
+            file.seek(0)
+            file.write(_npy_header(sum(counts)))
+        _atomic_write(os.path.join(path, FRAMES_FILE), write_frames)
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64)
+        _atomic_write(os.path.join(path, OFFSETS_FILE), lambda file: np.save(file, offsets, allow_pickle=False))
+        return path
+
+    @classmethod
+    def open(cls, grapplemap_path: Optional[str] = None, cache_dir: Optional[str] = None) -> 'FrameStore':
+        """
+        the store of GrappleMap.txt in the compiled cache directory, under its own store_key. Built on first use and
+        again only when the file changes
+        """
+        if grapplemap_path is None:
+            grapplemap_path = GRAPPLEMAP_TXT
+        path = os.path.join(cache_dir or DEFAULT_CACHE_DIR, f'frames-{store_key(grapplemap_path)}')
+        if not os.path.exists(os.path.join(path, OFFSETS_FILE)):
+            cls.build(path, grapplemap_path)
+        return cls(path)
+
+    def __len__(self) -> int:
+        """number of transitions"""
+        return len(self.offsets) - 1
+
+    @property
+    def total_frames(self) -> int:
+        return len(self.frames)
+
+    def num_frames(self, transition_id: int) -> int:
+        return self._offsets[transition_id + 1] - self._offsets[transition_id]
+
+    def transition_frames(self, transition_id: int) -> np.ndarray:
+        """(num_frames, 2, JOINT_COUNT, 3) read-only view of the transition's frames"""
+        return self.frames[self._offsets[transition_id]:self._offsets[transition_id + 1]]
+
+    def edge_frames(self, start: int, end: int, edge_data: Dict) -> np.ndarray:
+        """
+        frames of the graph edge start -> end, in the direction of the edge. The reverse edge of a bidirectional
+        transition shares its id and plays the frames backwards, still as a view
+        """
+        frames = self.transition_frames(edge_data['id'])
+        if start == edge_data['to']['node'] and end == edge_data['from']['node'] and start != end:
+            return frames[::-1]
+        return frames
@@ -0,0 +1,94 @@
+"""
+Compiled graph cache, so that the fully annotated graph is only built from the JSON files once
+
+The cache lives in its own directory per content hash of the graph's source files (nodes.json, transitions.json and
+terminal_node_winstate.json) and of the code that annotates them. Editing any of them changes the hash, so a stale
+graph is never loaded. Array tables derived from the graph can be stored next to it with cached_array, and are
+memory-mapped when loaded
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Callable, Iterable, Optional
+import networkx as nx
+import numpy as np
+
+CACHE_VERSION = 1  # bump when the layout of the cached files changes
+DEFAULT_CACHE_DIR = os.path.join('Graph', 'files', 'compiled')
+GRAPH_FILE = 'graph.pickle'
+# the graph and its tables depend on how these modules annotate and compile it, not only on the JSON files
+ANNOTATING_MODULES = ('graph_constructor.py', 'reward.py', 'move_table.py', 'win_distances.py')
+
+
+def source_hash(paths: Iterable[str], salt: str = '') -> str:
+    """sha256 over the contents of the source files, the annotating code, CACHE_VERSION and salt"""
+    digest = hashlib.sha256(f'{CACHE_VERSION}{salt}'.encode())
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in list(paths) + [os.path.join(module_dir, name) for name in ANNOTATING_MODULES]:
+        with open(path, 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def _atomic_write(path: str, write: Callable):
+    """writes through a temporary file, so that concurrent readers never see a partially written cache"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            write(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class GraphCache:
+    """
+    Directory holding the compiled graph and its derived tables for one version of the source files
+
+    Inputs:
+        source_paths: JSON files the graph is built from
+        cache_dir (str, optional): root directory of the compiled caches
+        salt (str): anything else the graph depends on, e.g. the repr of the move rules it was annotated with
+    """
+    def __init__(self, source_paths: Iterable[str], cache_dir: Optional[str] = None, salt: str = ''):
+        self.key = source_hash(source_paths, salt)
+        self.path = os.path.join(cache_dir or DEFAULT_CACHE_DIR, self.key)
+
+    @classmethod
+    def at(cls, path: str) -> 'GraphCache':
+        """the cache stored in path, e.g. the one recorded in the 'compiled_cache' attribute of a cached graph"""
+        cache = cls.__new__(cls)
+        cache.key = os.path.basename(os.path.normpath(path))
+        cache.path = path
+        return cache
+
+    def load_graph(self, build: Callable[[], nx.DiGraph]) -> nx.DiGraph:
+        """
+        unpickles the compiled graph, building and storing it with build() on a cache miss. The cache directory is
+        recorded in G.graph['compiled_cache'], so that tables derived from G can be cached next to it
+        """
+        graph_path = os.path.join(self.path, GRAPH_FILE)
+        try:
+            with open(graph_path, 'rb') as file:
+                G = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            G = build()
+            _atomic_write(graph_path, lambda file: pickle.dump(G, file, protocol=pickle.HIGHEST_PROTOCOL))
+        G.graph['compiled_cache'] = self.path
+        return G
+
+    def cached_array(self, name: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """read-only memory map of the array stored as name, building and storing it with build() on a cache miss"""
+        array_path = os.path.join(self.path, f'{name}.npy')
+        if not os.path.exists(array_path):
+            array = np.ascontiguousarray(build())
+            _atomic_write(array_path, lambda file: np.save(file, array, allow_pickle=False))
+        try:
+            return np.load(array_path, mmap_mode='r')
+        except ValueError:
+            # empty arrays can't be memory-mapped
+            return np.load(array_path)
@@ -1,6 +1,7 @@
 import json
 import networkx as nx
-from Graph.reward import add_rewards_to_graph
+from Graph.reward import MOVE_RULES, add_rewards_to_graph
+from Graph.graph_cache import GraphCache
 from typing import List, Tuple, Dict
 import copy
 import os
@@ -102,13 +103,11 @@ def load_json(fpath):
     with open(fpath, 'r') as file:
         return json.load(file)
 
-def construct_graph(nodes_path=None, transitions_path=None) -> nx.classes.digraph.DiGraph:
-    # Use relative paths from the project root
-    if nodes_path is None:
-        nodes_path = os.path.join('Graph', 'files', 'nodes.json')
-    if transitions_path is None:
-        transitions_path = os.path.join('Graph', 'files', 'transitions.json')
-
+def build_graph(nodes_path, transitions_path, winstate_path, rules=None) -> nx.classes.digraph.DiGraph:
+    """
+    builds and annotates the graph from the JSON files, without going through the compiled cache. rules are the
+    MoveRules of the point-earning moves, MOVE_RULES by default
+    """
     nodes = load_json(nodes_path)
     transitions = load_json(transitions_path)
     #tags = load_json('files/tags.json')
@@ -118,10 +117,33 @@ def construct_graph(nodes_path=None, transitions_path=None) -> nx.classes.digrap
     G = refactor_incoming_and_outgoing(G)
 
     # add rewards signal to GrappleMap data
-    G = add_rewards_to_graph(G)
+    G = add_rewards_to_graph(G, winstate_path, rules)
 
     return G
 
+def construct_graph(nodes_path=None, transitions_path=None, winstate_path=None,
+                    use_cache=True, cache_dir=None, rules=None) -> nx.classes.digraph.DiGraph:
+    """
+    Returns the annotated GrappleMap graph. By default it is loaded from the compiled cache, which is rebuilt
+    automatically whenever one of the JSON files, the code annotating the graph or the move rules (rules, or
+    MOVE_RULES by default) change
+    """
+    rules = list(MOVE_RULES if rules is None else rules)
+    # Use relative paths from the project root
+    if nodes_path is None:
+        nodes_path = os.path.join('Graph', 'files', 'nodes.json')
+    if transitions_path is None:
+        transitions_path = os.path.join('Graph', 'files', 'transitions.json')
+    if winstate_path is None:
+        winstate_path = os.path.join('Graph', 'files', 'terminal_node_winstate.json')
+
+    def build():
+        return build_graph(nodes_path, transitions_path, winstate_path, rules)
+
+    if not use_cache:
+        return build()
+    return GraphCache([nodes_path, transitions_path, winstate_path], cache_dir, salt=repr(rules)).load_graph(build)
+
 # Only create graph if this file is run directly
 if __name__ == "__main__":
     G = construct_graph()
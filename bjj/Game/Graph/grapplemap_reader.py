@@ -0,0 +1,154 @@
+"""
+Streaming reader for GrappleMap.txt, the canonical GrappleMap database
+
+The file is a list of sequences. Each sequence starts with its description lines (the name, then optional 'tags:',
+'properties:', 'ref:' etc. lines), followed by one indented 4-line code block per frame. Sequences with a single
+frame are positions and sequences with more than one frame are transitions, numbered in the order they appear, the
+same way GrappleMap numbers its nodes and transitions
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Union
+import numpy as np
+from Graph.depracated.base62 import decode_positions
+
+GRAPPLEMAP_TXT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'depracated', 'files', 'GrappleMap.txt')
+
+LINES_PER_FRAME = 4
+
+
+def _declared_words(lines: List[str], decl: str) -> List[str]:
+    """words following decl (e.g. 'tags:') on any of the description lines"""
+    words = []
+    for line in lines:
+        if line.startswith(decl):
+            words.extend(line[len(decl):].split())
+    return words
+
+
+@dataclass
+class SequenceRecord:
+    id: int
+    lines: List[str]  # raw description lines, including the tags/properties lines
+    line_nr: int  # line number of the first description line (0 based, like GrappleMap's line_nr)
+    frames: List[str] = field(default_factory=list)  # position codes, whitespace removed. Decoded only on request
+
+    @property
+    def description(self) -> str:
+        return self.lines[0].replace('\\n', ' ') if self.lines else ''
+
+    @property
+    def tags(self) -> List[str]:
+        return _declared_words(self.lines, 'tags:')
+
+    @property
+    def properties(self) -> List[str]:
+        return _declared_words(self.lines, 'properties:')
+
+    def positions(self) -> np.ndarray:
+        """
+        decodes the frames into a float32 array of shape (num_frames, 2, JOINT_COUNT, 3), in the coordinates of
+        position.Position, so a row can be passed to Position or PositionTree as is
+        """
+        return decode_positions(self.frames)
+
+
+@dataclass
+class PositionRecord(SequenceRecord):
+    @property
+    def code(self) -> str:
+        return self.frames[0]
+
+    def position(self) -> np.ndarray:
+        return self.positions()[0]
+
+
+@dataclass
+class TransitionRecord(SequenceRecord):
+    num_frames: int = 0  # counts every frame, even when only the first and last ones are kept
+
+    @property
+    def bidirectional(self) -> bool:
+        return 'bidirectional' in self.properties
+
+    @property
+    def start_code(self) -> str:
+        return self.frames[0]
+
+    @property
+    def end_code(self) -> str:
+        return self.frames[-1]
+
+
+Record = Union[PositionRecord, TransitionRecord]
+
+
+def read_grapplemap(path: Optional[str] = None, keep_frames: bool = True) -> Iterator[Record]:
+    """
+    Lazily parses GrappleMap.txt, yielding one record per sequence as soon as its last frame has been read
+
+    Inputs:
+        path (str, optional): path to GrappleMap.txt, GRAPPLEMAP_TXT by default
+        keep_frames (bool): when False, transitions only keep their first and last frame codes. This bounds the memory
+            used per record when only the endpoints are needed, e.g. when building the graph
+    Yields:
+        PositionRecord or TransitionRecord, in file order. Frame codes are only decoded when positions() is called
+    """
+    if path is None:
+        path = GRAPPLEMAP_TXT
+
+    num_positions = num_transitions = 0
+    lines: List[str] = []
+    frames: List[str] = []
+    frame_lines: List[str] = []
+    num_frames = 0
+    start_line = 0
+
+    def finish_sequence() -> Record:
+        nonlocal num_positions, num_transitions
+        if num_frames == 1:
+            record = PositionRecord(num_positions, lines, start_line, frames)
+            num_positions += 1
+        else:
+            record = TransitionRecord(num_transitions, lines, start_line, frames, num_frames)
+            num_transitions += 1
+        return record
+
+    with open(path, 'r', encoding='utf-8') as file:
+        for line_nr, line in enumerate(file):
+            line = line.rstrip('\n')
+            if line.startswith(' '):
+                frame_lines.append(line.strip())
+                if len(frame_lines) == LINES_PER_FRAME:
+                    if keep_frames or len(frames) < 2:
+                        frames.append(''.join(frame_lines))
+                    else:
+                        # only the latest frame can still turn out to be the last one
+                        frames[-1] = ''.join(frame_lines)
+                    frame_lines = []
+                    num_frames += 1
+            elif line:
+                if num_frames:
+                    # a description line after frames starts the next sequence
+                    yield finish_sequence()
+                    lines, frames, num_frames = [], [], 0
+                if not lines:
+                    start_line = line_nr
+                lines.append(line)
+
+    if frame_lines:
+        raise ValueError(f"{path} ends in the middle of a frame")
+    if num_frames:
+        yield finish_sequence()
+
+
+def read_positions(path: Optional[str] = None) -> Iterator[PositionRecord]:
+    for record in read_grapplemap(path, keep_frames=False):
+        if isinstance(record, PositionRecord):
+            yield record
+
+
+def read_transitions(path: Optional[str] = None, keep_frames: bool = True) -> Iterator[TransitionRecord]:
+    for record in read_grapplemap(path, keep_frames):
+        if isinstance(record, TransitionRecord):
+            yield record
@@ -0,0 +1,146 @@
+"""
+Compiled move table: the graph's edges as flat arrays, so that move generation is an array slice instead of a walk over
+the node's 'outgoing' list of dicts and a networkx lookup per move
+"""
+from typing import Dict, List, Optional
+import networkx as nx
+import numpy as np
+from Graph.graph_cache import GraphCache
+from Graph.reward import rule_points
+
+# boolean edge attributes that are compiled into arrays. Missing attributes count as False
+EDGE_FLAGS = ('top', 'bottom', 'tap', 'swaps_players')
+
+
+class MoveTable:
+    """
+    Edges of the graph in CSR layout, indexed by edge index: the position of the edge in G.edges, which is also the
+    action index used by BJJEnv. Node ids are used as indices directly, so arrays indexed by node have max(node) + 1
+    entries
+
+    Attributes:
+        edge_ids, sources, targets: (E,) GrappleMap transition id, start node and end node of each edge
+        top, bottom, tap, swaps_players: (E,) bool edge attributes
+        points: (E,) points earned by the player executing each edge, summed over every maneuver it counts as
+        offsets: (num_nodes + 1,) outgoing edges of node n are edges[offsets[n]:offsets[n + 1]]
+        edges: (E,) edge indices sorted by start node
+        legal_offsets, legal_edges: same layout as offsets/edges, with one row per is_top value, holding only the moves
+            that are legal for the player on top (row 1) or on the bottom (row 0)
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray], rewards: Dict[str, int]):
+        # plain ndarray views of memory maps index faster than np.memmap
+        arrays = {name: np.asarray(array) for name, array in arrays.items()}
+        for array in arrays.values():
+            # the table is shared by every game on the board
+            array.setflags(write=False)
+        self.edge_ids = arrays['edge_ids']
+        self.sources = arrays['sources']
+        self.targets = arrays['targets']
+        for flag in EDGE_FLAGS:
+            setattr(self, flag, arrays[flag])
+        self.maneuvers = {maneuver: arrays[f'maneuver_{maneuver}'] for maneuver in rewards}
+        self.points = np.zeros(len(self.edge_ids), dtype=np.int32)
+        for maneuver, points in rewards.items():
+            self.points += points * self.maneuvers[maneuver]
+        self.points.setflags(write=False)
+        self.offsets = arrays['offsets']
+        self.edges = arrays['edges']
+        self.legal_offsets = arrays['legal_offsets']
+        self.legal_edges = arrays['legal_edges']
+        self.num_nodes = len(self.offsets) - 1
+        # python ints slice faster than numpy scalars
+        self._offsets = self.offsets.tolist()
+        self._legal_offsets = self.legal_offsets.tolist()
+        self._action_masks: Optional[np.ndarray] = None
+        self._action_mask_views: Optional[List[List[np.ndarray]]] = None
+
+    @staticmethod
+    def compile_arrays(G: nx.DiGraph, maneuvers) -> Dict[str, np.ndarray]:
+        """extracts the edge attributes from G, once, and lays them out in CSR order"""
+        num_nodes = max(G.nodes) + 1 if len(G) else 0
+        edges = list(G.edges(data=True))
+        arrays = {'edge_ids': np.array([data['id'] for _, _, data in edges], dtype=np.int64),
+                  'sources': np.array([start for start, _, _ in edges], dtype=np.int64),
+                  'targets': np.array([end for _, end, _ in edges], dtype=np.int64)}
+        for attribute in EDGE_FLAGS:
+            arrays[attribute] = np.array([bool(data.get(attribute, False)) for _, _, data in edges], dtype=bool)
+        for maneuver in maneuvers:
+            arrays[f'maneuver_{maneuver}'] = np.array([bool(data.get(maneuver, False)) for _, _, data in edges],
+                                                      dtype=bool)
+
+        def csr(legal: np.ndarray):
+            selected = np.flatnonzero(legal)
+            order = selected[np.argsort(arrays['sources'][selected], kind='stable')]
+            counts = np.bincount(arrays['sources'][order], minlength=num_nodes)
+            return np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), order.astype(np.int64)
+
+        arrays['offsets'], arrays['edges'] = csr(np.ones(len(edges), dtype=bool))
+        # the player on the bottom can't do top moves and vice versa. Untagged moves are legal for both
+        (bottom_offsets, bottom_edges), (top_offsets, top_edges) = csr(~arrays['top']), csr(~arrays['bottom'])
+        arrays['legal_offsets'] = np.stack([bottom_offsets, top_offsets])
+        # both rows share one edges array, the top row's offsets are shifted past the bottom row's edges
+        arrays['legal_offsets'][1] += len(bottom_edges)
+        arrays['legal_edges'] = np.concatenate([bottom_edges, top_edges])
+        return arrays
+
+    @classmethod
+    def from_graph(cls, G: nx.DiGraph, rewards: Optional[Dict[str, int]] = None,
+                   cache: Optional[GraphCache] = None) -> 'MoveTable':
+        """
+        compiles the move table of G. If G was loaded from the compiled graph cache (or a cache is passed), the arrays
+        are stored next to the cached graph and memory-mapped on later loads. rewards default to the points of the
+        move rules G was annotated with
+        """
+        if rewards is None:
+            rewards = rule_points(G.graph.get('move_rules'))
+        if cache is None and G.graph.get('compiled_cache'):
+            cache = GraphCache.at(G.graph['compiled_cache'])
+        if cache is None:
+            return cls(cls.compile_arrays(G, rewards), rewards)
+        compiled = {}
+
+        def build(name):
+            # every array is compiled on the first miss, the others are then stored from the same pass
+            if not compiled:
+                compiled.update(cls.compile_arrays(G, rewards))
+            return compiled[name]
+        names = ['edge_ids', 'sources', 'targets', *EDGE_FLAGS, *[f'maneuver_{maneuver}' for maneuver in rewards],
+                 'offsets', 'edges', 'legal_offsets', 'legal_edges']
+        return cls({name: cache.cached_array(f'moves_{name}', lambda name=name: build(name)) for name in names},
+                   rewards)
+
+    def __len__(self) -> int:
+        return len(self.edge_ids)
+
+    def outgoing(self, node: int) -> np.ndarray:
+        """edge indices of every move out of node"""
+        return self.edges[self._offsets[node]:self._offsets[node + 1]]
+
+    @property
+    def action_masks(self) -> np.ndarray:
+        """
+        (2, num_nodes, E) read-only boolean matrix, where action_masks[is_top, node] is the mask of the legal moves
+        out of node for the player on top (or bottom). Built on first use, then shared by every env on the board
+        """
+        if self._action_masks is None:
+            masks = np.zeros((2, self.num_nodes, len(self)), dtype=bool)
+            for is_top in (0, 1):
+                row = self.legal_offsets[is_top]
+                edges = self.legal_edges[row[0]:row[-1]]
+                masks[is_top, self.sources[edges], edges] = True
+            masks.setflags(write=False)
+            self._action_masks = masks
+        return self._action_masks
+
+    @property
+    def action_mask_views(self) -> List[List[np.ndarray]]:
+        """action_masks[is_top, node] as prebuilt views, indexed [is_top][node], so getting a mask allocates nothing"""
+        if self._action_mask_views is None:
+            masks = self.action_masks
+            self._action_mask_views = [[masks[is_top, node] for node in range(self.num_nodes)] for is_top in (0, 1)]
+        return self._action_mask_views
+
+    def legal_moves(self, node: int, is_top: bool) -> np.ndarray:
+        """edge indices of the moves out of node that the player on top (or bottom) can perform. A read-only view"""
+        row = self._legal_offsets[1 if is_top else 0]
+        return self.legal_edges[row[node]:row[node + 1]]
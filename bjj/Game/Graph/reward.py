@@ -1,5 +1,6 @@
 import json
 import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 
 def load_json(fpath):
@@ -16,38 +17,108 @@ def add_terminal_win_states(G, json_path=None):
     for node_dict in terminal_win_nodes:
         G.nodes[node_dict['node']]['winner'] = node_dict['winner']
     return G
+class MoveRule(NamedTuple):
+    """
+    Flags the moves that count as a maneuver: sets edge attribute <name> to True and earns <points>
+
+    A tag matches when pattern is a substring of it. With scope EDGE_TAGS a move matches when one of its own tags does,
+    with ENTERS_POSITION when it goes from a node without a matching tag to a node with one
+    """
+    name: str
+    pattern: str
+    scope: str
+    points: int
+
+
+EDGE_TAGS = 'edge_tags'
+ENTERS_POSITION = 'enters_position'
+
+# the point-earning moves. Add a rule here to score another maneuver, without another pass over the graph: the compiled
+# graph cache is keyed on this file and on the rules in effect, so cached graphs are annotated again. Or pass your own
+# rules to construct_graph(rules=...), which records them on the graph for Board and MoveTable to score with
+MOVE_RULES: List[MoveRule] = [
+    MoveRule('sweep', 'sweep', EDGE_TAGS, 2),
+    MoveRule('mount', 'mount', ENTERS_POSITION, 4),  # to do: 3 of the mount transitions need their top/bottom swapped
+    MoveRule('back', 'back', ENTERS_POSITION, 4),
+    # takedowns: note that both of these describe the same point earning move
+    MoveRule('throw', 'throw', EDGE_TAGS, 2),
+    MoveRule('takedown', 'takedown', EDGE_TAGS, 2),
+    MoveRule('pass', 'pass', EDGE_TAGS, 3),
+    # knee on belly
+    # to do
+]
+
+
+def rule_points(rules: Optional[Iterable[MoveRule]] = None) -> Dict[str, int]:
+    """points per maneuver name, in the format of Board.rewards"""
+    return {rule.name: rule.points for rule in (MOVE_RULES if rules is None else rules)}
+
+
+class _TagMatcher:
+    """
+    Interns the tag strings of the graph and matches each distinct one against every rule once. A list of tags then
+    maps to a bitmask over the rules, one bit per rule whose pattern is in any of the tags
+    """
+    def __init__(self, rules: List[MoveRule]):
+        self.rules = rules
+        self._tag_bits: Dict[str, int] = {}
+        self._tags_bits: Dict[Tuple[str, ...], int] = {}
+
+    def tag_bits(self, tag: str) -> int:
+        bits = self._tag_bits.get(tag)
+        if bits is None:
+            bits = sum(1 << i for i, rule in enumerate(self.rules) if rule.pattern in tag)
+            self._tag_bits[tag] = bits
+        return bits
+
+    def bits(self, tags) -> int:
+        if not tags:
+            return 0
+        tags = tuple(tags)
+        bits = self._tags_bits.get(tags)
+        if bits is None:
+            bits = 0
+            for tag in tags:
+                bits |= self.tag_bits(tag)
+            self._tags_bits[tags] = bits
+        return bits
+
+
+def annotate_moves(G, rules: Optional[Iterable[MoveRule]] = None, flag_taps: bool = True):
+    """
+    Flags every move matching one of the rules (MOVE_RULES by default) in a single pass over the edges, and with
+    flag_taps the taps as well (see add_tap_flag)
+    """
+    rules = list(MOVE_RULES if rules is None else rules)
+    matcher = _TagMatcher(rules)
+    edge_rules = sum(1 << i for i, rule in enumerate(rules) if rule.scope == EDGE_TAGS)
+    position_rules = sum(1 << i for i, rule in enumerate(rules) if rule.scope == ENTERS_POSITION)
+    node_bits = {node: matcher.bits(tags) & position_rules for node, tags in G.nodes(data='tags')}
+    names = [rule.name for rule in rules]
+
+    for start, end, data in G.edges(data=True):
+        matched = (matcher.bits(data.get('tags')) & edge_rules) | (node_bits[end] & ~node_bits[start])
+        while matched:
+            lowest = matched & -matched
+            data[names[lowest.bit_length() - 1]] = True
+            matched ^= lowest
+        # to do: 4 of the 'tap' transitions have properties that don't match the position
+        if flag_taps and data.get('description') == 'tap' and G.out_degree(start) == 1:
+            data['tap'] = True
+    return G
+
+
 def add_tap_flag(G):
     """Marks that this move is a tap, telling game engine that this player lost"""
-    # to do: 4 of the 'tap' transitions have properties that don't match the position
-
-    for node in G.nodes():
-        # Get all outgoing edges
-        out_edges = list(G.out_edges(node, data=True))
-        # Check if there's only one outgoing edge and if its description is "tap"
-        if len(out_edges) == 1 and out_edges[0][2].get('description') == 'tap':
-            # Get the edge data
-            source, target, edge_data = out_edges[0]
-            # Add a new attribute to the edge
-            G.edges[source, target]['tap'] = True
+    return annotate_moves(G, rules=[])
 
-    return G
 
-def flag_point_earning_move(G,move: str):
+def flag_point_earning_move(G, move: str):
     """
     Checks the 'tags' values of every transition in the graph for the inputted flag, then adds a new edge attribute with a boolean.
     This is meant to be used to check for transitions that should earn points for the player who executed it
     """
-    def is_move_in_tags(start,end, move=move, G=G) -> bool:
-        # checks if flag is in any of the edge's tags
-        tags = G.edges[start,end].get('tags')
-        if tags:
-            return any([move in tag for tag in tags])
-        return False
-
-    for u, v in G.edges():
-        if is_move_in_tags(u,v):
-            G.edges[u, v][move] = True
-    return G
+    return annotate_moves(G, [MoveRule(move, move, EDGE_TAGS, 0)], flag_taps=False)
 
 
 def find_move_by_node_tags(G, position: str):
@@ -57,51 +128,21 @@ def find_move_by_node_tags(G, position: str):
 
     and then marks that transition with a new dict item
     """
-    # to do: 3 of the mount transitions need to have their top/bottom tags switched
-    def node_is_position(node: str,position=position ,G=G) -> bool:
-        #checks if position is in any of the node's tags
-        tags = G.nodes[node].get('tags')
-        if tags:
-            return any([position in tag for tag in tags])
-        return False
-
-    for node in G.nodes():
-        # if this node does not have <position> in tags
-        if not node_is_position(node):
-            # Check all successors of the current node
-            for successor in G.successors(node):
-                # Check if the successor node has <position>
-                if node_is_position(successor):
-                    # Transition to the node with the position is found, adding flag to this edge
-                    G.edges[node, successor][position] = True
+    return annotate_moves(G, [MoveRule(position, position, ENTERS_POSITION, 0)], flag_taps=False)
 
-    return G
 
-def find_and_tag_all_moves(G):
-    # sweeps
-    G = flag_point_earning_move(G, 'sweep')
-    # mounts
-    G = find_move_by_node_tags(G, 'mount')
-    # backtakes
-    G = find_move_by_node_tags(G, 'back')
-    # takedowns: note that both of these describe the same point earning move
-    G = flag_point_earning_move(G, 'throw')
-    G = flag_point_earning_move(G, 'takedown')
-    # guard passes
-    G = flag_point_earning_move(G, 'pass')
-    # knee on belly
-    # to do
-    return G
+def find_and_tag_all_moves(G, rules: Optional[Iterable[MoveRule]] = None):
+    return annotate_moves(G, rules, flag_taps=False)
 
-def add_rewards_to_graph(G):
+def add_rewards_to_graph(G, winstate_path=None, rules: Optional[Iterable[MoveRule]] = None):
     ## Identifying terminal game states
     # Flagging positions where one player has won. This identified checkmates positions to terminate the game at
-    G = add_terminal_win_states(G)
-    # Identifying moves where one player submits and flagging it
-    G = add_tap_flag(G)
-
-    ## Identifying point-earning moves and tagging them
-    G = find_and_tag_all_moves(G)
+    G = add_terminal_win_states(G, winstate_path)
+    ## Identifying moves where one player submits, and point-earning moves, in one pass over the edges
+    rules = list(MOVE_RULES if rules is None else rules)
+    G = annotate_moves(G, rules)
+    # the rules the edges are flagged with, so that the board scores the same maneuvers
+    G.graph['move_rules'] = rules
     return G
 
 
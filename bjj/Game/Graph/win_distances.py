@@ -0,0 +1,107 @@
+"""
+Distances to a win: how many of their own moves the player on top (or bottom) needs from each node to win
+
+A player wins by moving to a winning node for their side (see reward.add_terminal_win_states), or is at a submission
+when the opponent has a tap move out of the current node. Only the player's own moves count, the opponent is assumed to
+stay put, so the distance is a lower bound on the turns to a win rather than a game-theoretic value. Moves that swap the
+players carry on from the other side of the position, and tap moves of the player itself are never taken
+"""
+from typing import Dict, List, Optional
+import networkx as nx
+import numpy as np
+from Graph.graph_cache import GraphCache
+from Graph.move_table import MoveTable
+
+UNREACHABLE = -1  # distance and next move of positions from which the player can't win on their own
+
+
+class WinDistances:
+    """
+    Multi-source reverse BFS from the winning moves and submissions, over (side, node) states
+
+    Attributes:
+        distance: (2, num_nodes) moves to a win for the player on the bottom (row 0) or on top (row 1), 0 at a
+            submission and UNREACHABLE when there is no way to win
+        next_move: (2, num_nodes) edge index of the first move of a shortest way to a win, the lowest edge index on
+            ties, UNREACHABLE at a submission or when there is no way to win
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.distance = np.asarray(arrays['distance'])
+        self.next_move = np.asarray(arrays['next_move'])
+        # python lists, for O(1) queries without numpy scalars
+        self._distance: List[List[int]] = self.distance.tolist()
+        self._next_move: List[List[int]] = self.next_move.tolist()
+
+    @staticmethod
+    def compile_arrays(G: nx.DiGraph, moves: MoveTable) -> Dict[str, np.ndarray]:
+        num_nodes = moves.num_nodes
+        winning_side = np.full(num_nodes, -1, dtype=np.int64)
+        for node, winner in G.nodes(data='winner'):
+            if winner:
+                winning_side[node] = 1 if winner == 'top' else 0
+
+        # state of side s at node n is s * num_nodes + n. The extra last state stands for a won game
+        won = 2 * num_nodes
+        distance = np.full(won + 1, UNREACHABLE, dtype=np.int64)
+        next_move = np.full(won + 1, UNREACHABLE, dtype=np.int64)
+        distance[won] = 0
+        sources, next_states, edges = [], [], []
+        for side in (0, 1):
+            row = moves.legal_offsets[side]
+            side_edges = moves.legal_edges[row[0]:row[-1]]
+            # a submission: the opponent, on the other side, can tap out here
+            opponent_row = moves.legal_offsets[1 - side]
+            opponent_edges = moves.legal_edges[opponent_row[0]:opponent_row[-1]]
+            distance[side * num_nodes + moves.sources[opponent_edges[moves.tap[opponent_edges]]]] = 0
+
+            side_edges = side_edges[~moves.tap[side_edges]]
+            target_side = winning_side[moves.targets[side_edges]]
+            # moves to the other side's winning nodes lose, moves to this side's win
+            side_edges, target_side = side_edges[target_side != 1 - side], target_side[target_side != 1 - side]
+            next_side = side ^ moves.swaps_players[side_edges].astype(np.int64)
+            next_states.append(np.where(target_side == side, won, next_side * num_nodes + moves.targets[side_edges]))
+            sources.append(side * num_nodes + moves.sources[side_edges])
+            edges.append(side_edges)
+        sources, next_states, edges = np.concatenate(sources), np.concatenate(next_states), np.concatenate(edges)
+        order = np.argsort(edges, kind='stable')
+        sources, next_states, edges = sources[order], next_states[order], edges[order]
+
+        level = 0
+        while True:
+            reaching = (distance[next_states] == level) & (distance[sources] == UNREACHABLE)
+            if not reaching.any():
+                break
+            # edges are in ascending order, so the first edge of each state is its lowest
+            states, first = np.unique(sources[reaching], return_index=True)
+            distance[states] = level + 1
+            next_move[states] = edges[reaching][first]
+            level += 1
+        return {'distance': distance[:won].reshape(2, num_nodes).astype(np.int32),
+                'next_move': next_move[:won].reshape(2, num_nodes)}
+
+    @classmethod
+    def from_graph(cls, G: nx.DiGraph, moves: MoveTable, cache: Optional[GraphCache] = None) -> 'WinDistances':
+        """
+        computes the distances of G, or loads them from the compiled graph cache. They are only computed again when
+        the graph's source files change, like the graph itself
+        """
+        if cache is None and G.graph.get('compiled_cache'):
+            cache = GraphCache.at(G.graph['compiled_cache'])
+        if cache is None:
+            return cls(cls.compile_arrays(G, moves))
+        compiled = {}
+
+        def build(name):
+            if not compiled:
+                compiled.update(cls.compile_arrays(G, moves))
+            return compiled[name]
+        return cls({name: cache.cached_array(f'win_{name}', lambda name=name: build(name))
+                    for name in ('distance', 'next_move')})
+
+    def distance_to_win(self, node: int, is_top: bool) -> int:
+        """moves the player on top (or bottom) needs to win from node, UNREACHABLE if they can't"""
+        return self._distance[1 if is_top else 0][node]
+
+    def move_towards_win(self, node: int, is_top: bool) -> int:
+        """edge index of the first move of a shortest way to a win, UNREACHABLE at a submission or without one"""
+        return self._next_move[1 if is_top else 0][node]
@@ -0,0 +1,181 @@
+"""
+Batch game engine: plays many random games in lockstep, keeping their state in NumPy arrays instead of Game objects
+
+The rules are the same as Game.play_turn's, applied to every unfinished game at once. Players choose uniformly among
+their legal moves, like Player's 'random' strategy, so the distribution of outcomes is the same as Simulation's. The
+random streams differ, so individual games don't match one to one
+"""
+from typing import Dict, List, Optional
+import numpy as np
+from play_game import Board, GameRecord, shared_board, agg_results, NO_WINNER, TOP_WINS
+
+START_NODE = 94  # 'symmetric staggered standing', see GameState.initialize
+# winner values, the same as GameRecord's
+UNDECIDED, TIE, PLAYER1, PLAYER2 = -1, 0, 1, 2
+
+
+class BatchSimulation:
+    """
+    Plays num_games random games at once
+
+    Inputs:
+        num_games (int): number of games K
+        board (Board, optional): board to play on. Defaults to the process-wide shared_board()
+        max_turns (int): turns after which games are decided on points
+        seed (int, optional): seed of the NumPy random generator
+
+    State, one entry per game:
+        node: current node
+        player1_top: whether player 1 is on top
+        current: player to move, 0 for player 1 and 1 for player 2
+        points: (K, 2) points of player 1 and player 2
+        turn_count: turns played
+        winner: UNDECIDED while the game runs, then TIE, PLAYER1 or PLAYER2
+    """
+    def __init__(self, num_games: int, board: Optional[Board] = None, max_turns: int = 100,
+                 seed: Optional[int] = None):
+        self.num_games = num_games
+        self.board = board if board is not None else shared_board()
+        self.max_turns = max_turns
+        self.rng = np.random.default_rng(seed)
+
+        moves = self.board.moves
+        self.moves = moves
+        self.out_degree = np.diff(moves.offsets)
+        self.legal_offsets = moves.legal_offsets
+        self.legal_edges = moves.legal_edges
+        self.node_winner = self.board.node_winner
+        self.nodes = np.array(self.board.nodes, dtype=np.int64)
+        self.has_start_node = START_NODE in self.board.graph
+        self.reset()
+
+    def _random_start_nodes(self, count: int) -> np.ndarray:
+        """GameState.initialize for count games: the central start node or a random node, with equal chances"""
+        random_nodes = self.nodes[self.rng.integers(len(self.nodes), size=count)]
+        if not self.has_start_node:
+            return random_nodes
+        return np.where(self.rng.random(count) < 0.5, START_NODE, random_nodes)
+
+    def reset(self, games: Optional[np.ndarray] = None):
+        """starts new games, in every slot or only in the given game indices"""
+        if games is None:
+            k = self.num_games
+            self.node = self._random_start_nodes(k)
+            self.player1_top = self.rng.random(k) < 0.5
+            self.current = (self.rng.random(k) < 0.5).astype(np.int8)
+            self.points = np.zeros((k, 2), dtype=np.int32)
+            self.turn_count = np.zeros(k, dtype=np.int32)
+            self.winner = np.full(k, UNDECIDED, dtype=np.int8)
+            return
+        k = len(games)
+        self.node[games] = self._random_start_nodes(k)
+        self.player1_top[games] = self.rng.random(k) < 0.5
+        self.current[games] = self.rng.random(k) < 0.5
+        self.points[games] = 0
+        self.turn_count[games] = 0
+        self.winner[games] = UNDECIDED
+
+    def start_from(self, node: np.ndarray, player1_top: np.ndarray, current: np.ndarray, points: np.ndarray,
+                   turn_count: np.ndarray):
+        """replaces every game with len(node) games that continue from the given states, e.g. as rollouts"""
+        self.num_games = len(node)
+        self.node = np.array(node, dtype=np.int64)
+        self.player1_top = np.array(player1_top, dtype=bool)
+        self.current = np.array(current, dtype=np.int8)
+        self.points = np.array(points, dtype=np.int32).reshape(-1, 2)
+        self.turn_count = np.array(turn_count, dtype=np.int32)
+        self.winner = np.full(self.num_games, UNDECIDED, dtype=np.int8)
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.winner != UNDECIDED
+
+    def current_is_top(self, games: np.ndarray) -> np.ndarray:
+        return self.player1_top[games] ^ (self.current[games] == 1)
+
+    def restart_terminal(self, games: np.ndarray):
+        """a node without any outgoing edges isn't a win or loss: those games restart from a random node"""
+        node = self.node[games]
+        terminal = self.out_degree[node] == 0
+        while terminal.any():
+            node[terminal] = self._random_start_nodes(int(terminal.sum()))
+            terminal = self.out_degree[node] == 0
+        self.node[games] = node
+
+    def legal_move_ranges(self, games: np.ndarray):
+        """the legal moves of the player to move in game g are legal_edges[start[g]:start[g] + num_legal[g]]"""
+        row = self.current_is_top(games).astype(np.intp)
+        node = self.node[games]
+        start = self.legal_offsets[row, node]
+        return start, self.legal_offsets[row, node + 1] - start
+
+    def play_moves(self, games: np.ndarray, edge: np.ndarray) -> np.ndarray:
+        """
+        the player to move in each of the games performs the move at the given edge index. Returns which of the games
+        ended, because the player tapped or reached a winning position. Doesn't hand the turn over
+        """
+        current = self.current[games]
+        new_node = self.moves.targets[edge]
+        self.node[games] = new_node
+        self.points[games, current] += self.moves.points[edge]
+
+        # the player who taps loses
+        tapped = self.moves.tap[edge]
+        self.winner[games[tapped]] = np.where(current[tapped] == 0, PLAYER2, PLAYER1)
+
+        # reaching a winning position wins for whoever is on top (or bottom). Players are only swapped after this check
+        node_winner = self.node_winner[new_node]
+        reached = ~tapped & (node_winner != NO_WINNER)
+        player1_wins = self.player1_top[games[reached]] == (node_winner[reached] == TOP_WINS)
+        self.winner[games[reached]] = np.where(player1_wins, PLAYER1, PLAYER2)
+
+        swaps = ~tapped & ~reached & self.moves.swaps_players[edge]
+        self.player1_top[games[swaps]] ^= True
+        return tapped | reached
+
+    def decide_on_points(self, games: np.ndarray):
+        """games that ran out of turns are won by the player with the most points"""
+        out_of_turns = games[(self.turn_count[games] >= self.max_turns) & (self.winner[games] == UNDECIDED)]
+        player1_points, player2_points = self.points[out_of_turns, 0], self.points[out_of_turns, 1]
+        self.winner[out_of_turns] = np.select([player1_points > player2_points, player2_points > player1_points],
+                                              [PLAYER1, PLAYER2], TIE)
+
+    def step(self) -> int:
+        """advances every unfinished game by one turn. Returns the number of games that played this turn"""
+        playing = np.flatnonzero(self.winner == UNDECIDED)
+        if not len(playing):
+            return 0
+        self.turn_count[playing] += 1
+        # terminal nodes restart the game on the same turn
+        self.restart_terminal(playing)
+        start, num_legal = self.legal_move_ranges(playing)
+        # players without a legal move pass their turn
+        moving = num_legal > 0
+        # uniform choice among the legal moves
+        edge = self.legal_edges[start[moving] + (self.rng.random(moving.sum()) * num_legal[moving]).astype(np.intp)]
+        self.play_moves(playing[moving], edge)
+        # players hand the turn over whether they moved or passed
+        self.current[playing] ^= 1
+        self.decide_on_points(playing)
+        return len(playing)
+
+    def run(self) -> 'BatchSimulation':
+        """steps until every game is over"""
+        while self.step():
+            pass
+        return self
+
+    def outcome_counts(self) -> Dict[str, int]:
+        """number of finished games won by each player, and tied"""
+        counts = np.bincount(self.winner[self.done], minlength=3)
+        return {'player1_wins': int(counts[PLAYER1]), 'player2_wins': int(counts[PLAYER2]), 'ties': int(counts[TIE])}
+
+    @property
+    def results(self) -> List[Dict]:
+        """results of the finished games, in the format of Simulation.results"""
+        return [GameRecord(int(i), int(self.winner[i]), int(self.points[i, 0]), int(self.points[i, 1]),
+                           int(self.turn_count[i])).to_result()
+                for i in np.flatnonzero(self.done)]
+
+    def agg_results(self) -> List[Dict]:
+        return agg_results(self.results)
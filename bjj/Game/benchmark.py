@@ -0,0 +1,194 @@
+"""
+Throughput benchmarks of the game engine, reported in games per second on a fixed seed
+
+Run from bjj/Game, e.g.
+    python benchmark.py --games 2000 --seed 0
+    python benchmark.py --games 2000 --only headless processes --processes 4
+    python benchmark.py --only action_mask
+Every benchmark plays the same games for a given seed (game i is seeded with game_seed(seed, i)), and prints a summary
+of the results next to its throughput so that modes can be checked against each other. The batch engine draws from
+its own random stream, so only its outcome distribution matches the others
+
+Microbenchmarks time a single hot function instead, in microseconds and bytes allocated per call
+"""
+import argparse
+import logging
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from play_game import Game, GameRecord, LoggingSink, Simulation, game_seed, shared_board
+from batch_sim import BatchSimulation, PLAYER1, PLAYER2
+
+
+def summarize(results: List[Dict]) -> Tuple[int, int, int]:
+    """(player 1 wins, player 2 wins, total turns) of Simulation style result dicts"""
+    player1_wins = sum(result['winner'] == result['player1_name'] for result in results)
+    player2_wins = sum(result['winner'] == result['player2_name'] for result in results)
+    return player1_wins, player2_wins, sum(result['num_turns'] for result in results)
+
+
+def play_sequential(args, **game_kwargs) -> Tuple[int, int, int]:
+    results = []
+    for i in range(args.games):
+        game = Game(f"Game_{i}", max_turns=args.max_turns, seed=game_seed(args.seed, i), **game_kwargs)
+        game.initialize_game(f"Player1_{game.name}", f"Player2_{game.name}")
+        game.play_game()
+        results.append(GameRecord.from_game(i, game).to_result())
+    return summarize(results)
+
+
+def bench_verbose(args):
+    """every event formatted and written out, like the engine's per-turn prints used to be"""
+    log = logging.getLogger('benchmark.verbose')
+    log.propagate = False
+    with open(os.devnull, 'w') as devnull:
+        handler = logging.StreamHandler(devnull)
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        try:
+            return play_sequential(args, events=LoggingSink(log))
+        finally:
+            log.removeHandler(handler)
+
+
+def bench_headless(args):
+    """default NullSink, no event is built or written"""
+    return play_sequential(args)
+
+
+def bench_threads(args):
+    """Simulation on its default thread pool"""
+    simulation = Simulation(args.games, seed=args.seed)
+    simulation.initialize_games(num_turns=args.max_turns)
+    simulation.run_games()
+    return summarize(simulation.results)
+
+
+def bench_processes(args):
+    """Simulation on a process pool, see --processes and --games-per-task"""
+    simulation = Simulation(args.games, seed=args.seed)
+    simulation.num_turns = args.max_turns
+    simulation.run_games(processes=args.processes, games_per_task=args.games_per_task)
+    return summarize(simulation.results)
+
+
+def bench_batch(args):
+    """every game stepped in lockstep by the vectorized BatchSimulation"""
+    simulation = BatchSimulation(args.games, max_turns=args.max_turns, seed=args.seed).run()
+    return (int((simulation.winner == PLAYER1).sum()), int((simulation.winner == PLAYER2).sum()),
+            int(simulation.turn_count.sum()))
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'verbose': bench_verbose,
+    'headless': bench_headless,
+    'threads': bench_threads,
+    'processes': bench_processes,
+    'batch': bench_batch,
+}
+
+
+def measure_calls(function: Callable, setups: List[Callable]) -> Tuple[float, float]:
+    """(microseconds per call, bytes allocated per call) of function, called once after each setup"""
+    start = time.perf_counter()
+    for setup in setups:
+        setup()
+        function()
+    elapsed = time.perf_counter() - start
+
+    allocated = 0
+    tracemalloc.start()
+    for setup in setups:
+        setup()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        function()
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return elapsed / len(setups) * 1e6, allocated / len(setups)
+
+
+def previous_action_mask(env) -> np.ndarray:
+    """BJJEnv._get_action_mask before the masks were precomputed, for comparison"""
+    possible_moves = env.game.game_state.get_possible_moves(env.game.current_player.is_top,
+                                                            env.game.current_player.is_bottom)
+    mask = np.zeros(len(env.edge_ids), dtype=bool)
+    for move in possible_moves:
+        mask[env.id_to_index[move[1]['id']]] = 1
+    return mask
+
+
+def micro_action_mask(args):
+    """BJJEnv._get_action_mask over random (node, is_top) states"""
+    from gym_env import BJJEnv
+    env = BJJEnv()
+    rng = np.random.default_rng(args.seed)
+    states = zip(rng.choice(env.board.nodes, size=20000), rng.random(20000) < 0.5)
+
+    def setup(node, is_top):
+        def set_state():
+            env.game.game_state.current_node = int(node)
+            env.game.current_player.is_top, env.game.current_player.is_bottom = bool(is_top), not is_top
+        return set_state
+    setups = [setup(node, is_top) for node, is_top in states]
+    env._get_action_mask()  # builds the board's masks outside of the timings
+    for name, function in [('previous', lambda: previous_action_mask(env)), ('current', env._get_action_mask)]:
+        latency, allocated = measure_calls(function, setups)
+        print(f'{"action_mask":>12}: {name:>8} {latency:8.2f} us/call  {allocated:8.0f} bytes allocated/call')
+
+
+def micro_observations(args):
+    """BJJVectorEnv._get_obs of 1024 environments, as a flattened dict and as the flat encoder's buffer"""
+    from gym_vector_env import BJJVectorEnv
+    from observations import FlatObservationEncoder
+    board = shared_board()
+    dict_env = BJJVectorEnv(1024, board=board, seed=args.seed)
+    flat_env = BJJVectorEnv(1024, board=board, seed=args.seed, observation_encoder=FlatObservationEncoder(board))
+    encoder = FlatObservationEncoder(board)
+
+    def flattened_dict():
+        obs = dict_env._get_obs()
+        # what a training loop has to do with the dict observations
+        return np.concatenate([obs['point_difference'], obs['on_top'][:, None], obs['on_bottom'][:, None],
+                               obs['turns_left'], np.eye(encoder.num_nodes)[obs['current_position']]],
+                              axis=1).astype(np.float32)
+
+    setups = [lambda: None] * 200
+    for name, function in [('dict', flattened_dict), ('flat', flat_env._get_obs)]:
+        latency, allocated = measure_calls(function, setups)
+        print(f'{"observations":>12}: {name:>8} {latency:8.2f} us/call  {allocated:8.0f} bytes allocated/call')
+
+
+MICROBENCHMARKS: Dict[str, Callable] = {
+    'action_mask': micro_action_mask,
+    'observations': micro_observations,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--max-turns', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=0, help='worker processes, 0 for one per CPU')
+    parser.add_argument('--games-per-task', type=int, default=64)
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS) + list(MICROBENCHMARKS),
+                        help='benchmarks to run, all by default')
+    args = parser.parse_args()
+
+    shared_board()  # built outside of the timings
+    for name in args.only or list(BENCHMARKS) + list(MICROBENCHMARKS):
+        if name in MICROBENCHMARKS:
+            MICROBENCHMARKS[name](args)
+            continue
+        start = time.perf_counter()
+        summary = BENCHMARKS[name](args)
+        elapsed = time.perf_counter() - start
+        print(f'{name:>12}: {args.games / elapsed:10.1f} games/s  ({elapsed:.2f}s)  '
+              f'p1 wins, p2 wins, turns = {summary}')
+
+
+if __name__ == "__main__":
+    main()
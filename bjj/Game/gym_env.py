@@ -1,22 +1,30 @@
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-from play_game import Game, Board, GameState, Player, tqdm
+from play_game import Game, Board, tqdm, shared_board
+from observations import FlatObservationEncoder, POINT_DIFFERENCE, ON_TOP
 from typing import List, Tuple, Dict, Optional, Any
 import random
 def bool_to_int(value: bool) -> int:
     return 1 if value else 0
 class BJJEnv(gym.Env):
-    def __init__(self):
-        self.game = Game("BJJ Match")
+    def __init__(self, board: Optional[Board] = None, observation_encoder: Optional[FlatObservationEncoder] = None):
+        # the board is read-only and shared with every other game in the process, only the game itself is per-env
+        self.board = board if board is not None else shared_board()
+        self.game = Game("BJJ Match", board=self.board)
         self.game.initialize_game("Player1", "Player2")
-        self.G = self.game.board.graph
+        self.G = self.board.graph
 
         # Get edge IDs and create a mapping
         self.edge_ids = [data['id'] for _, _, data in self.G.edges(data=True)]
         self.id_to_index = {id: index for index, id in enumerate(self.edge_ids)}
         self.index_to_id = {index: id for index, id in enumerate(self.edge_ids)}
         self.edge_id_to_nodes = {data['id']: (start, end) for start, end, data in self.G.edges(data=True)}
+        # action index i is the i-th edge, as in the board's move table. Edge ids aren't unique (the reverse edge of a
+        # bidirectional transition keeps its id), so actions are mapped to moves through the move table's arrays
+        self.moves = self.board.moves
+        # legal action masks per [is_top][node], built once per board. _get_action_mask returns these read-only views
+        self.action_masks = self.moves.action_mask_views
 
         # get node IDs
         self.num_nodes = max(self.G.nodes())
@@ -49,6 +57,12 @@ class BJJEnv(gym.Env):
             'on_bottom': spaces.Discrete(2),
             'turns_left': spaces.Box(low=0, high=self.game.max_turns, shape=(1,), dtype=int)
         })
+        # flat mode: observations are written into one float32 buffer, see observations.py. The same buffer is
+        # returned on every step, so copy it to keep an observation past the next step
+        self.observation_encoder = observation_encoder
+        if observation_encoder is not None:
+            self.observation_space = observation_encoder.observation_space
+            self._obs_buffer = observation_encoder.buffer()
 
     def _get_state(self):
         # Return the full state (not directly used by the agent)
@@ -65,6 +79,10 @@ class BJJEnv(gym.Env):
         current_player = self.game.current_player
         other_player = self.game.choose_other_player(current_player)
 
+        if self.observation_encoder is not None:
+            return self.observation_encoder.encode(
+                self._obs_buffer, self.game.game_state.current_node, current_player.points - other_player.points,
+                current_player.is_top, self.game.max_turns - self.game.turn_count)
         return {
             'current_position': self.game.game_state.current_node,
             'point_difference': current_player.points - other_player.points,
@@ -83,26 +101,15 @@ class BJJEnv(gym.Env):
                     Each element is either 0 (False) or 1 (True), where:
                     - 1 (True) indicates a legal move
                     - 0 (False) indicates an illegal move
+                    This is a read-only view of the precomputed masks, so nothing is allocated per step
         """
-        possible_moves = self.game.game_state.get_possible_moves(
-            self.game.current_player.is_top,
-            self.game.current_player.is_bottom
-        )
-        mask = np.zeros(len(self.edge_ids), dtype=bool)  # mask is length of all possible actions in the entire game
-        for move in possible_moves:
-            #sets only the legal moves to 1
-            edge_id = move[1]['id']
-            mask[self.id_to_index[edge_id]] = 1
-        return mask
+        return self.action_masks[self.game.current_player.is_top][self.game.game_state.current_node]
     def reset(self, seed=None, **kwargs) -> Tuple[Dict[str, Any], Dict[str, Any]]:
 
         super().reset(seed=seed)  # Reset the RNG if a seed is provided
 
-        # Fully reset the game
-        self.game = Game("BJJ Match")  # Create a new game instance
-        self.game.board = Board(self.G)  # Reset the board with the graph
-        self.game.game_state = GameState(self.game.board)  # Reset the game state
-        self.game.turn_count = 0
+        # Fully reset the game. A new game on the shared board starts with a fresh game state and turn count
+        self.game = Game("BJJ Match", board=self.board)
 
         # Reinitialize the game
         self.game.initialize_game("Player1", "Player2")
@@ -115,8 +122,7 @@ class BJJEnv(gym.Env):
             # Invalid action, end turn without making a move
             self.game.switch_players()
             return self._get_obs(), -1, False, False, {}
-        (start, end) = self.edge_id_to_nodes[edge_id]
-        move = (start, self.game.board.get_edge_data(start, end))
+        move = (int(self.moves.targets[action]), self.game.board.edge_data[action])
         game_over = self.game.play_turn(move)
 
         if game_over:
@@ -137,8 +143,12 @@ class BJJEnv(gym.Env):
         elif self.game.winner == self.game.current_player:
             reward -= 300
 
-        reward += 1*obs['point_difference']
-        reward += + 0.5*obs['on_top']
+        if self.observation_encoder is not None:
+            point_difference, on_top = float(obs[POINT_DIFFERENCE]), float(obs[ON_TOP])
+        else:
+            point_difference, on_top = obs['point_difference'], obs['on_top']
+        reward += 1*point_difference
+        reward += + 0.5*on_top
         return reward
     def render(self, mode='human'):
         print(
@@ -309,21 +319,22 @@ class QLearningAgent:
         self.exploration_rate = max(self.exploration_min, self.exploration_rate * self.exploration_decay)
 
 
-# Example usage
-env = BJJEnv()
-q_table = q_learning(env, num_episodes=100)
+if __name__ == "__main__":
+    # Example usage
+    env = BJJEnv()
+    q_table = q_learning(env, num_episodes=100)
 
-# Test the learned policy
-state, info = env.reset()
-done = False
-total_reward = 0
+    # Test the learned policy
+    state, info = env.reset()
+    done = False
+    total_reward = 0
 
-while not done:
-    state_index = state_to_index(state)
-    masked_q_values = get_masked_q_values(q_table[state_index], info['action_mask'])
-    action = np.argmax(masked_q_values)
-    state, reward, done, _, info = env.step(action)
-    total_reward += reward
+    while not done:
+        state_index = state_to_index(state)
+        masked_q_values = get_masked_q_values(q_table[state_index], info['action_mask'])
+        action = np.argmax(masked_q_values)
+        state, reward, done, _, info = env.step(action)
+        total_reward += reward
 
 
-print(f"Total reward: {total_reward}")
\ No newline at end of file
+    print(f"Total reward: {total_reward}")
\ No newline at end of file
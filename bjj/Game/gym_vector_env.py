@@ -0,0 +1,263 @@
+"""
+Vectorized version of BJJEnv: num_envs games held as arrays by a BatchSimulation, stepped together
+
+Each step is one turn of each game, played by whichever player is to move, like BJJEnv's self-play. Actions are edge
+indices, the same as BJJEnv's action indices and the move table's edge order
+"""
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import numpy as np
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+from batch_sim import BatchSimulation, PLAYER1, PLAYER2, UNDECIDED
+from observations import FlatObservationEncoder
+from play_game import Board, shared_board
+
+WIN_REWARD = 300
+ILLEGAL_MOVE_REWARD = -1
+ON_TOP_REWARD = 0.5
+
+
+class BJJVectorEnv(VectorEnv):
+    """
+    num_envs BJJEnv games, stepped with one vectorized call
+
+    Observations are BJJEnv's, batched: a dict of arrays with one row per environment, for the player to move next.
+    info['action_mask'] is a (num_envs, num_actions) boolean matrix of that player's legal moves. With an
+    observation_encoder, observations are instead a (num_envs, size) float32 matrix written in place into one buffer,
+    which is overwritten by the next step.
+
+    Rewards are for the player who acted: WIN_REWARD for a win and -WIN_REWARD for a loss by tap or winning position,
+    plus the actor's point difference and ON_TOP_REWARD if the actor is on top after the move. An illegal action makes
+    the player pass, for ILLEGAL_MOVE_REWARD. A game terminates when it is won, and is truncated after max_turns.
+
+    Environments whose game ended are reset on the next step, and their action for that step is ignored
+    (AutoresetMode.NEXT_STEP). Positions without any outgoing edges restart from a random node and players without a
+    legal move pass, like in Game.play_turn, so the player to move always has a legal move
+    """
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, num_envs: int, board: Optional[Board] = None, max_turns: int = 100,
+                 seed: Optional[int] = None, observation_encoder: Optional[FlatObservationEncoder] = None):
+        self.num_envs = num_envs
+        self.board = board if board is not None else shared_board()
+        self.max_turns = max_turns
+        self.games = BatchSimulation(num_envs, board=self.board, max_turns=max_turns, seed=seed)
+        self.num_actions = len(self.board.moves)
+        self.num_nodes = self.board.moves.num_nodes
+
+        self.single_action_space = spaces.Discrete(self.num_actions)
+        self.single_observation_space = spaces.Dict({
+            'current_position': spaces.Discrete(self.num_nodes),
+            'point_difference': spaces.Box(low=-np.inf, high=np.inf, shape=(1,), dtype=int),
+            'on_top': spaces.Discrete(2),
+            'on_bottom': spaces.Discrete(2),
+            'turns_left': spaces.Box(low=0, high=max_turns, shape=(1,), dtype=int)
+        })
+        self.observation_encoder = observation_encoder
+        if observation_encoder is not None:
+            self.single_observation_space = observation_encoder.observation_space
+            self._obs_buffer = observation_encoder.buffer(num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+
+        self._all = np.arange(num_envs)
+        self._needs_reset = np.zeros(num_envs, dtype=bool)
+        self._action_masks = self.board.moves.action_masks
+
+    def _settle(self, envs: np.ndarray):
+        """makes sure that the player to move has a legal move, see the class docstring"""
+        # at a node with outgoing edges, at least one of the players has a legal move, so two passes are enough
+        for _ in range(2):
+            self.games.restart_terminal(envs)
+            _, num_legal = self.games.legal_move_ranges(envs)
+            passing = envs[num_legal == 0]
+            if not len(passing):
+                return
+            self.games.current[passing] ^= 1
+            self.games.turn_count[passing] += 1
+
+    def _get_obs(self) -> Dict[str, np.ndarray]:
+        games, rows = self.games, self._all
+        current = games.current.astype(np.intp)
+        on_top = games.current_is_top(rows)
+        point_difference = games.points[rows, current] - games.points[rows, 1 - current]
+        if self.observation_encoder is not None:
+            return self.observation_encoder.encode(self._obs_buffer, games.node, point_difference, on_top,
+                                                   np.maximum(self.max_turns - games.turn_count, 0))
+        return {
+            'current_position': games.node.copy(),
+            'point_difference': point_difference[:, None].astype(int),
+            'on_top': on_top.astype(np.int64),
+            'on_bottom': (~on_top).astype(np.int64),
+            # passes after the last move can take a game past max_turns
+            'turns_left': np.maximum(self.max_turns - games.turn_count, 0)[:, None].astype(int),
+        }
+
+    def _get_action_mask(self) -> np.ndarray:
+        """(num_envs, num_actions) matrix of the legal moves of the player to move in each environment"""
+        is_top = self.games.current_is_top(self._all).astype(np.intp)
+        # one row gather from the board's precomputed masks
+        return self._action_masks[is_top, self.games.node]
+
+    def reset(self, *, seed: Optional[int] = None,
+              options: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        if seed is not None:
+            self.games.rng = np.random.default_rng(seed)
+        self.games.reset()
+        self._settle(self._all)
+        self._needs_reset[:] = False
+        return self._get_obs(), {"action_mask": self._get_action_mask()}
+
+    def step(self, actions: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray,
+                                                 Dict[str, Any]]:
+        games = self.games
+        actions = np.asarray(actions, dtype=np.intp)
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+
+        resetting = np.flatnonzero(self._needs_reset)
+        if len(resetting):
+            games.reset(resetting)
+            self._settle(resetting)
+        acting = np.flatnonzero(~self._needs_reset)
+        actor = games.current[acting].astype(np.intp)
+
+        # an action is legal if it leaves the current node and isn't a move for the other top/bottom position
+        action = actions[acting]
+        in_range = (action >= 0) & (action < self.num_actions)
+        action = np.where(in_range, action, 0)
+        moves = games.moves
+        legal = in_range & (moves.sources[action] == games.node[acting]) & np.where(
+            games.current_is_top(acting), ~moves.bottom[action], ~moves.top[action])
+        ended = np.zeros(len(acting), dtype=bool)
+        ended[legal] = games.play_moves(acting[legal], action[legal])
+        rewards[acting[~legal]] = ILLEGAL_MOVE_REWARD
+
+        # the actor's reward for a legal move, before the turn is handed over
+        played, actor, ended_by_move = acting[legal], actor[legal], ended[legal]
+        winner = games.winner[played]
+        actor_player = np.where(actor == 0, PLAYER1, PLAYER2)
+        won = ended_by_move & (winner == actor_player)
+        lost = ended_by_move & (winner != actor_player) & (winner != UNDECIDED)
+        point_difference = games.points[played, actor] - games.points[played, 1 - actor]
+        actor_on_top = games.player1_top[played] ^ (actor == 1)
+        rewards[played] = WIN_REWARD * (won.astype(int) - lost) + point_difference + ON_TOP_REWARD * actor_on_top
+
+        games.current[acting] ^= 1
+        games.turn_count[acting] += 1
+        running = acting[~ended]
+        self._settle(running)
+        terminated[acting] = ended
+        truncated[running] = games.turn_count[running] >= self.max_turns
+
+        self._needs_reset = terminated | truncated
+        return self._get_obs(), rewards, terminated, truncated, {"action_mask": self._get_action_mask()}
+
+
+class TrainingReport(NamedTuple):
+    """summary of a batched_q_learning run"""
+    episodes: int
+    steps: int
+    seconds: float
+    converged: bool
+
+    @property
+    def episodes_per_second(self) -> float:
+        return self.episodes / self.seconds if self.seconds else float('inf')
+
+
+def legal_action_table(moves) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    the legal actions of every Q-table state (node * 2 + on_top, see gym_env.state_to_index), padded with -1:
+    (num_states, max legal moves) actions and (num_states,) number of legal actions
+    """
+    counts = np.diff(moves.legal_offsets, axis=1)  # (2, num_nodes)
+    num_legal = counts.T.reshape(-1)
+    table = np.full((len(num_legal), max(int(num_legal.max(initial=0)), 1)), -1, dtype=np.intp)
+    states = np.repeat(np.arange(len(num_legal)), num_legal)
+    starts = moves.legal_offsets[:, :-1].T.reshape(-1)
+    column = np.arange(len(states)) - np.repeat(np.cumsum(num_legal) - num_legal, num_legal)
+    table[states, column] = moves.legal_edges[np.repeat(starts, num_legal) + column]
+    return table, num_legal
+
+
+def batched_q_learning(env: BJJVectorEnv, num_episodes: int, learning_rate: float = 0.1,
+                       discount_factor: float = 0.95, epsilon: float = 0.5, tolerance: Optional[float] = None,
+                       check_every: int = 100, seed: Optional[int] = None) -> Tuple[np.ndarray, TrainingReport]:
+    """
+    gym_env.q_learning over env.num_envs episodes at a time, on the same (node * 2 + on_top, action) Q-table
+
+    Every step chooses an epsilon-greedy action in each environment from its state's legal actions, then applies all
+    the TD updates at once: transitions that share a (state, action) are grouped with np.add.at and update it once,
+    with their mean TD error. Terminated games don't bootstrap from their final position.
+
+    Inputs:
+        env (BJJVectorEnv): dict or flat observations, only the game state is used
+        num_episodes (int): episodes to finish, training stops at the first step past it
+        tolerance (float, optional): stop early once no Q-value moved by more than tolerance over check_every steps
+        check_every (int): steps between convergence checks
+        seed (int, optional): seeds the env and the exploration
+
+    Returns:
+        the (num_nodes * 2, num_actions) Q-table, and a TrainingReport with the episodes per second
+    """
+    rng = np.random.default_rng(seed)
+    legal_actions, num_legal = legal_action_table(env.board.moves)
+    q_table = np.zeros((len(num_legal), env.num_actions))
+    games, rows = env.games, env._all
+
+    def states() -> np.ndarray:
+        return games.node.astype(np.intp) * 2 + games.current_is_top(rows)
+
+    def greedy_actions(state: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """argmax and max of the Q-values over each state's legal actions, the first legal action on ties"""
+        actions = legal_actions[state]
+        values = np.where(actions >= 0, q_table[state[:, None], actions], -np.inf)
+        best = values.argmax(axis=1)
+        return actions[rows, best], values[rows, best]
+
+    env.reset(seed=seed)
+    state = states()
+    snapshot = q_table.copy()
+    episodes = steps = 0
+    converged = False
+    start = time.perf_counter()
+    while episodes < num_episodes:
+        actions, _ = greedy_actions(state)
+        explore = rng.random(env.num_envs) < epsilon
+        random_pick = (rng.random(env.num_envs) * num_legal[state]).astype(np.intp)
+        actions = np.where(explore, legal_actions[state, random_pick], actions)
+        # environments that finished on the last step are reset by this one, their action isn't played
+        played = ~env._needs_reset
+
+        _, rewards, terminated, truncated, _ = env.step(actions)
+        next_state = states()
+        _, next_values = greedy_actions(next_state)
+        next_values = np.where(terminated | ~np.isfinite(next_values), 0, next_values)
+        td_error = rewards + discount_factor * next_values - q_table[state, actions]
+        # one update per (state, action) with the mean TD error of its transitions. Summing them would scale the
+        # learning rate by the number of environments sharing a state, e.g. the start position
+        keys, group = np.unique(state[played] * env.num_actions + actions[played], return_inverse=True)
+        td_sums, group_sizes = np.zeros(len(keys)), np.zeros(len(keys))
+        np.add.at(td_sums, group, td_error[played])
+        np.add.at(group_sizes, group, 1)
+        q_table.reshape(-1)[keys] += learning_rate * td_sums / group_sizes
+
+        state = next_state
+        episodes += int((terminated | truncated).sum())
+        steps += 1
+        if tolerance is not None and steps % check_every == 0:
+            if np.abs(q_table - snapshot).max() <= tolerance:
+                converged = True
+                break
+            snapshot[:] = q_table
+    return q_table, TrainingReport(episodes, steps, time.perf_counter() - start, converged)
+
+
+if __name__ == "__main__":
+    q_table, report = batched_q_learning(BJJVectorEnv(1024, seed=0), num_episodes=100000, seed=0)
+    print(f"{report.episodes} episodes in {report.seconds:.2f}s ({report.episodes_per_second:.0f} episodes/s), "
+          f"{report.steps} steps, converged: {report.converged}")
@@ -0,0 +1,286 @@
+"""
+Monte Carlo Tree Search player agent
+
+The tree is searched over MCTSState tuples instead of Game copies: a position seen from the player to move, stepped
+with the move table's arrays. Leaves are evaluated by random playouts, many at once on a BatchSimulation, optionally
+split over a process pool
+
+Use it as a Player agent:
+    game.player1.agent = MCTSAgent(board, simulations=2000)
+"""
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import networkx as nx
+import numpy as np
+from play_game import Board, Game, Player, shared_board, NO_WINNER, TOP_WINS
+from batch_sim import BatchSimulation, START_NODE, PLAYER1, PLAYER2
+
+PASS = -1  # the move of a player without a legal move
+
+
+class MCTSState(NamedTuple):
+    """a position from the point of view of the player to move"""
+    node: int
+    on_top: bool
+    point_difference: int  # the player to move's points minus the opponent's
+    turns_left: int
+
+
+class TreeNode:
+    """
+    Statistics of a move. value_sum is from the point of view of the player who made the move. The tree is open loop:
+    children are keyed by move only, and games that restart from a random node follow the same branch
+    """
+    __slots__ = ('visits', 'value_sum', 'children', 'terminal_value')
+
+    def __init__(self, terminal_value: Optional[float] = None):
+        self.visits = 0
+        self.value_sum = 0.0
+        self.children: Dict[int, 'TreeNode'] = {}
+        # outcome of the move for its player, when the move ends the game
+        self.terminal_value = terminal_value
+
+
+# rollout engine of an MCTSAgent worker process, set once per process by _initialize_rollout_worker
+_worker_rollouts: Optional[BatchSimulation] = None
+
+
+def _initialize_rollout_worker(graph: nx.DiGraph, max_turns: int):
+    global _worker_rollouts
+    _worker_rollouts = BatchSimulation(0, board=Board(graph), max_turns=max_turns)
+
+
+def _rollout_values(engine: BatchSimulation, states: np.ndarray, rollouts_per_leaf: int,
+                    seed: Optional[int] = None) -> np.ndarray:
+    """
+    mean outcome of rollouts_per_leaf random playouts from each (node, on_top, point_difference, turns_left) row of
+    states, for its player to move
+    """
+    if seed is not None:
+        engine.rng = np.random.default_rng(seed)
+    games = np.repeat(states, rollouts_per_leaf, axis=0)
+    # the player to move plays as player 1
+    engine.start_from(node=games[:, 0], player1_top=games[:, 1].astype(bool), current=np.zeros(len(games)),
+                      points=np.stack([games[:, 2], np.zeros(len(games))], axis=1),
+                      turn_count=engine.max_turns - games[:, 3])
+    engine.run()
+    outcomes = (engine.winner == PLAYER1).astype(np.float64) - (engine.winner == PLAYER2)
+    return outcomes.reshape(len(states), rollouts_per_leaf).mean(axis=1)
+
+
+def _worker_rollout_values(states: np.ndarray, rollouts_per_leaf: int, seed: int) -> np.ndarray:
+    return _rollout_values(_worker_rollouts, states, rollouts_per_leaf, seed)
+
+
+class MCTSAgent:
+    """
+    UCT search for the player to move, called by Player.choose_move
+
+    Inputs:
+        board (Board, optional): board to play on. Defaults to the process-wide shared_board()
+        max_turns (int): the games' max_turns
+        simulations (int): tree descents per move
+        time_budget (float, optional): seconds per move, the search stops at whichever budget runs out first
+        exploration (float): UCT exploration constant
+        leaf_batch (int): leaves selected before their rollouts are played, together
+        rollouts_per_leaf (int): random playouts per leaf
+        reuse_tree (bool): keep the subtree of the position reached when the agent is asked for its next move
+        processes (int, optional): play the rollouts of a batch on a process pool of this many workers (0 for one
+            per CPU). Call close() when done with the agent
+        seed (int, optional): seeds the search and the rollouts
+    """
+    def __init__(self, board: Optional[Board] = None, max_turns: int = 100, simulations: int = 1000,
+                 time_budget: Optional[float] = None, exploration: float = math.sqrt(2), leaf_batch: int = 16,
+                 rollouts_per_leaf: int = 8, reuse_tree: bool = True, processes: Optional[int] = None,
+                 seed: Optional[int] = None):
+        self.board = board if board is not None else shared_board()
+        self.max_turns = max_turns
+        self.simulations = simulations
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.leaf_batch = leaf_batch
+        self.rollouts_per_leaf = rollouts_per_leaf
+        self.reuse_tree = reuse_tree
+        self.rng = random.Random(seed)
+
+        moves = self.board.moves
+        # plain lists, which are faster to index one element at a time than arrays
+        self.targets: List[int] = moves.targets.tolist()
+        self.points: List[int] = moves.points.tolist()
+        self.tap: List[bool] = moves.tap.tolist()
+        self.swaps_players: List[bool] = moves.swaps_players.tolist()
+        self.legal_moves: List[List[List[int]]] = [[moves.legal_moves(node, is_top).tolist()
+                                                    for node in range(moves.num_nodes)] for is_top in (False, True)]
+        self.dead_end: List[bool] = (np.diff(moves.offsets) == 0).tolist()
+        self.node_winner: List[int] = self.board.node_winner.tolist()
+        self.nodes = self.board.nodes
+        self.has_start_node = START_NODE in self.board.graph
+
+        self.rollouts = BatchSimulation(0, board=self.board, max_turns=max_turns, seed=seed)
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.root: Optional[TreeNode] = None
+        self.root_state: Optional[MCTSState] = None
+        self.simulations_run = 0
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @staticmethod
+    def state_of(game: Game, player: Player) -> MCTSState:
+        other_player = game.choose_other_player(player)
+        # play_game counts the current turn before it is played
+        return MCTSState(game.game_state.current_node, player.is_top, player.points - other_player.points,
+                         max(game.max_turns - game.turn_count + 1, 1))
+
+    def _restart(self, state: MCTSState) -> MCTSState:
+        """GameState.initialize's random node, for a game at a node without outgoing edges"""
+        if not self.dead_end[state.node]:
+            return state
+        node = state.node
+        while self.dead_end[node]:
+            node = self.rng.choice(self.nodes)
+            if self.has_start_node and self.rng.random() < 0.5:
+                node = START_NODE
+        return state._replace(node=node)
+
+    def _moves(self, state: MCTSState) -> List[int]:
+        return self.legal_moves[state.on_top][state.node] or [PASS]
+
+    def _play(self, state: MCTSState, move: int) -> Tuple[Optional[float], MCTSState]:
+        """
+        (outcome for the player who moved if the move ends the game, else None; the next state). Like
+        Game.play_turn, the turn is handed over after every move, including a pass
+        """
+        if move == PASS:
+            if state.turns_left == 1:
+                return float((state.point_difference > 0) - (state.point_difference < 0)), state
+            return None, MCTSState(state.node, not state.on_top, -state.point_difference, state.turns_left - 1)
+        if self.tap[move]:
+            return -1.0, state
+        target = self.targets[move]
+        winner = self.node_winner[target]
+        if winner != NO_WINNER:
+            return (1.0 if (winner == TOP_WINS) == state.on_top else -1.0), state
+        point_difference = state.point_difference + self.points[move]
+        if state.turns_left == 1:
+            return float((point_difference > 0) - (point_difference < 0)), state
+        # the next player is on the other side of the position, which the move may have swapped
+        on_top = state.on_top != self.swaps_players[move]
+        return None, MCTSState(target, not on_top, -point_difference, state.turns_left - 1)
+
+    def _select(self, root: TreeNode, state: MCTSState) -> Tuple[List[TreeNode], Optional[MCTSState]]:
+        """
+        descends from root to a new leaf and counts a visit to every node on the way, so that the next descents of
+        the batch spread out. Returns the path and the state to roll out from, None if the path ended the game
+        """
+        path = [root]
+        node = root
+        while True:
+            state = self._restart(state)
+            moves = self._moves(state)
+            untried = [move for move in moves if move not in node.children]
+            if untried:
+                move = self.rng.choice(untried)
+                outcome, state = self._play(state, move)
+                child = node.children[move] = TreeNode(outcome)
+            else:
+                log_visits = math.log(node.visits + 1)
+                move = max(moves, key=lambda move: self._uct(node.children[move], log_visits))
+                child = node.children[move]
+                outcome, state = self._play(state, move)
+            path.append(child)
+            child.visits += 1
+            if outcome is not None:
+                return path, None
+            if not untried:
+                node = child
+                continue
+            return path, state
+
+    def _uct(self, child: TreeNode, log_visits: float) -> float:
+        if not child.visits:
+            return math.inf
+        return child.value_sum / child.visits + self.exploration * math.sqrt(log_visits / child.visits)
+
+    @staticmethod
+    def _backpropagate(path: List[TreeNode], value: float):
+        """value is for the player who made the last move of the path. The players alternate up the path"""
+        for node in reversed(path[1:]):
+            node.value_sum += value
+            value = -value
+
+    def _evaluate(self, states: List[MCTSState]) -> np.ndarray:
+        rows = np.array(states, dtype=np.int64)
+        if self.processes is None or len(rows) < 2:
+            return _rollout_values(self.rollouts, rows, self.rollouts_per_leaf)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes or None,
+                                                 initializer=_initialize_rollout_worker,
+                                                 initargs=(self.board.graph, self.max_turns))
+        chunks = np.array_split(rows, min(self.processes or os.cpu_count(), len(rows)))
+        futures = [self._executor.submit(_worker_rollout_values, chunk, self.rollouts_per_leaf,
+                                         self.rng.randrange(2 ** 32)) for chunk in chunks]
+        return np.concatenate([future.result() for future in futures])
+
+    def search(self, state: MCTSState) -> TreeNode:
+        """runs the search from state and returns its root"""
+        if not (self.reuse_tree and self.root is not None and self.root_state == state):
+            self.root = TreeNode()
+        root = self.root
+        deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else math.inf
+        simulations = 0
+        while simulations < self.simulations and time.perf_counter() < deadline:
+            paths, leaves = [], []
+            for _ in range(min(self.leaf_batch, self.simulations - simulations)):
+                root.visits += 1
+                path, leaf = self._select(root, state)
+                if leaf is None:
+                    self._backpropagate(path, path[-1].terminal_value)
+                else:
+                    paths.append(path)
+                    leaves.append(leaf)
+                simulations += 1
+            if leaves:
+                # rollout values are for the player to move at the leaf, the opponent of the leaf's move
+                for path, value in zip(paths, self._evaluate(leaves)):
+                    self._backpropagate(path, -float(value))
+        self.simulations_run = simulations
+        return root
+
+    def best_move(self, state: MCTSState) -> int:
+        """most visited legal move of state after a search"""
+        root = self.search(state)
+        return max(self._moves(state), key=lambda move: root.children[move].visits if move in root.children else -1)
+
+    def _advance_root(self, state: MCTSState, move: int):
+        """keeps the subtree of move for the next search, keyed by the state it leads to unless the game ends"""
+        child = self.root.children.get(move)
+        outcome, next_state = self._play(state, move)
+        self.root, self.root_state = (child, next_state) if child is not None and outcome is None else (None, None)
+
+    def choose_move(self, game: Game, player: Player, possible_moves: List[Tuple[int, Dict]]) -> Tuple[int, Dict]:
+        state = self.state_of(game, player)
+        if self.reuse_tree and self.root_state is not None and self.root_state != state:
+            # the opponent moved since our last move: its subtree is the child reached by the opponent's move
+            self._descend_to(state)
+        move = self.best_move(state)
+        if move == PASS:
+            return player.rng.choice(possible_moves)
+        self._advance_root(state, move)
+        return self.targets[move], self.board.edge_data[move]
+
+    def _descend_to(self, state: MCTSState):
+        """finds the subtree of the opponent's move that leads from root_state to state, or drops the tree"""
+        for move, child in self.root.children.items():
+            outcome, next_state = self._play(self.root_state, move)
+            if outcome is None and next_state == state:
+                self.root, self.root_state = child, state
+                return
+        self.root, self.root_state = None, None
@@ -0,0 +1,91 @@
+"""
+Flat observations for BJJEnv and BJJVectorEnv: one float32 vector per environment instead of a dict, written into a
+preallocated buffer so that training loops don't build or flatten dicts on every step
+"""
+from typing import List, Optional
+import numpy as np
+from gymnasium import spaces
+from play_game import Board
+
+# columns of the scalar features, which come first in every flat observation
+POINT_DIFFERENCE, ON_TOP, ON_BOTTOM, TURNS_LEFT = range(4)
+SCALAR_FEATURES = ('point_difference', 'on_top', 'on_bottom', 'turns_left')
+
+
+class FlatObservationEncoder:
+    """
+    Lays out BJJEnv's observation as a float32 vector:
+        point_difference, on_top, on_bottom, turns_left, then the current node, then optionally the node's tags
+
+    Inputs:
+        board (Board): board the observations are on
+        max_turns (int): upper bound of turns_left
+        one_hot_nodes (bool): encode the node as a one-hot block of num_nodes columns. Otherwise it is a single column
+            holding the node id, e.g. for an embedding layer
+        node_tags (bool): add a multi-hot block of the current node's tags, in the order of self.tags
+    """
+    def __init__(self, board: Board, max_turns: int = 100, one_hot_nodes: bool = True, node_tags: bool = False):
+        self.num_nodes = board.moves.num_nodes
+        self.one_hot_nodes = one_hot_nodes
+        self.node_column = len(SCALAR_FEATURES)
+        node_width = self.num_nodes if one_hot_nodes else 1
+        self.tag_column = self.node_column + node_width
+
+        self.tags: List[str] = []
+        if node_tags:
+            self.tags = sorted({tag for _, tags in board.graph.nodes(data='tags') if tags for tag in tags})
+        tag_index = {tag: i for i, tag in enumerate(self.tags)}
+        # tags of node n are tag_indices[tag_offsets[n]:tag_offsets[n + 1]]
+        node_tag_lists = [[] for _ in range(self.num_nodes)]
+        if node_tags:
+            for node, tags in board.graph.nodes(data='tags'):
+                node_tag_lists[node] = sorted({tag_index[tag] for tag in tags or ()})
+        self.tag_counts = np.array([len(tags) for tags in node_tag_lists], dtype=np.intp)
+        self.tag_offsets = np.concatenate([[0], np.cumsum(self.tag_counts)]).astype(np.intp)
+        self.tag_indices = np.array([tag for tags in node_tag_lists for tag in tags], dtype=np.intp)
+        self.size = self.tag_column + len(self.tags)
+
+        self.feature_names = list(SCALAR_FEATURES)
+        self.feature_names += [f'node_{node}' for node in range(self.num_nodes)] if one_hot_nodes else ['node']
+        self.feature_names += [f'tag_{tag}' for tag in self.tags]
+
+        low = np.zeros(self.size, dtype=np.float32)
+        high = np.ones(self.size, dtype=np.float32)
+        low[POINT_DIFFERENCE], high[POINT_DIFFERENCE] = -np.inf, np.inf
+        high[TURNS_LEFT] = max_turns
+        if not one_hot_nodes:
+            high[self.node_column] = self.num_nodes - 1
+        self.observation_space = spaces.Box(low=low, high=high, dtype=np.float32)
+        self._rows = np.zeros(0, dtype=np.intp)
+
+    def buffer(self, num_envs: Optional[int] = None) -> np.ndarray:
+        """a zeroed observation buffer, (size,) for one environment or (num_envs, size)"""
+        return np.zeros(self.size if num_envs is None else (num_envs, self.size), dtype=np.float32)
+
+    def encode(self, out: np.ndarray, node, point_difference, on_top, turns_left) -> np.ndarray:
+        """
+        writes the observations of one environment (scalar inputs, out of shape (size,)) or of a batch (arrays, out of
+        shape (N, size)) into out, and returns it
+        """
+        observations = out.reshape(-1, self.size)
+        node = np.atleast_1d(node)
+        if len(self._rows) != len(node):
+            self._rows = np.arange(len(node))
+        rows = self._rows
+        observations[:, POINT_DIFFERENCE] = point_difference
+        observations[:, ON_TOP] = on_top
+        observations[:, ON_BOTTOM] = np.logical_not(on_top)
+        observations[:, TURNS_LEFT] = turns_left
+        if self.one_hot_nodes:
+            observations[:, self.node_column:self.tag_column] = 0
+            observations[rows, self.node_column + node] = 1
+        else:
+            observations[:, self.node_column] = node
+        if self.tags:
+            observations[:, self.tag_column:] = 0
+            counts = self.tag_counts[node]
+            # flat positions of every tag of every row's node
+            ends = np.cumsum(counts)
+            positions = np.arange(ends[-1]) - np.repeat(ends - counts, counts) + np.repeat(self.tag_offsets[node], counts)
+            observations[np.repeat(rows, counts), self.tag_column + self.tag_indices[positions]] = 1
+        return out
@@ -1,18 +1,109 @@
+import abc
 import random
+import logging
 import networkx as nx
 from tqdm import tqdm
 import numpy as np
-from typing import List, Tuple, Dict, Optional
+from typing import Iterable, List, Tuple, Dict, NamedTuple, Optional
 from Graph.graph_constructor import construct_graph
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from Graph.reward import MoveRule, rule_points
+from Graph.move_table import MoveTable
+from Graph.win_distances import WinDistances
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from threading import Lock
+
+
+logger = logging.getLogger(__name__)
+
+class EventSink(abc.ABC):
+    """
+    Receives structured game events (e.g. 'move_performed' with the player, move and points) instead of the game
+    printing them. Subclass it and implement emit to log, record or count events
+    """
+    @abc.abstractmethod
+    def emit(self, event: str, **fields):
+        """handles one event, named by event, with its fields as keyword arguments"""
+
+class NullSink(EventSink):
+    """
+    Default sink, drops every event. It is falsy, so that emitters can skip building an event's fields entirely:
+        if self.events:
+            self.events.emit(...)
+    """
+    def emit(self, event: str, **fields):
+        pass
+
+    def __bool__(self) -> bool:
+        return False
+
+NULL_SINK = NullSink()
+
+class LoggingSink(EventSink):
+    """Verbose sink, logs a human readable message per event at INFO level"""
+    MESSAGES = {
+        'game_initialized': 'Initializing game: {game}',
+        'positions_assigned': '{player1} is on {player1_position}\n{player2} is on {player2_position}',
+        'turn_started': '\nTurn {turn}:',
+        'position_changed': 'moving to position {description}',
+        'maneuver_executed': '{maneuver} executed, player wins {points} points',
+        'terminal_position': 'Terminal position encountered. switching to random position ',
+        'no_moves': 'No moves available for {player}. Switching players.',
+        'move_performed': "{player} performed '{description}'",
+        'points_earned': 'Player earned {points} points for that move',
+        'player_tapped': '{player} tapped - {winner} has won! ',
+        'winning_position': '{winner} won by reaching a winning position!',
+        'points_win': '{winner} wins!',
+        'tie': "It's a tie!",
+        'game_over': '\nGame over! Final scores:\n{player1}: {player1_points}\n{player2}: {player2_points}',
+        'simulation_initializing': 'Initializing games',
+        'simulation_running': 'running games',
+    }
+
+    def __init__(self, log: logging.Logger = logger, level: int = logging.INFO):
+        self.log = log
+        self.level = level
+
+    def emit(self, event: str, **fields):
+        if self.log.isEnabledFor(self.level):
+            self.log.log(self.level, self.MESSAGES.get(event, event).format(**fields))
+
+# Board.node_winner values
+NO_WINNER, TOP_WINS, BOTTOM_WINS = 0, 1, 2
 
 
 class Board:
-    def __init__(self, graph: nx.Graph):
+    def __init__(self, graph: nx.Graph, rules: Optional[Iterable[MoveRule]] = None):
         self.graph = graph
-        self.rewards = {
-            'sweep': 2, 'mount': 4, 'back': 4,
-            'throw': 2, 'takedown': 2, 'pass': 3}
+        self.nodes: List[int] = list(graph.nodes())
+        # points per maneuver, from the rules that flag the maneuvers on the graph's edges: the ones construct_graph
+        # recorded on the graph unless others are given
+        recorded = graph.graph.get('move_rules')
+        if rules is None:
+            rules = recorded
+        elif recorded is not None:
+            rules = list(rules)
+            if not {rule.name for rule in rules} <= {rule.name for rule in recorded}:
+                raise ValueError("the graph's edges aren't flagged for every rule, build it with "
+                                 "construct_graph(rules=...)")
+        # kept so that a Simulation's worker processes build their boards with the same rules
+        self.rules: Optional[List[MoveRule]] = None if rules is None else list(rules)
+        self.rewards = rule_points(self.rules)
+        # array form of the edges, for move generation without dict lookups. Edge i is the i-th edge in graph.edges
+        self.moves = MoveTable.from_graph(graph, self.rewards)
+        # moves to a win from every node, for the player on top or bottom. Cached with the compiled graph
+        self.win_distances = WinDistances.from_graph(graph, self.moves)
+        self.edge_data: List[Dict] = [data for _, _, data in graph.edges(data=True)]
+        # (to, edge data) tuples of the legal moves per [is_top][node], built once from the move table
+        self.legal_move_tuples: List[List[List[Tuple[int, Dict]]]] = [
+            [[(int(self.moves.targets[edge]), self.edge_data[edge]) for edge in self.moves.legal_moves(node, is_top)]
+             for node in range(self.moves.num_nodes)]
+            for is_top in (False, True)]
+        # (num_nodes,) read-only int8 array: which player, if any, wins by reaching each node
+        self.node_winner = np.zeros(self.moves.num_nodes, dtype=np.int8)
+        for node, winner in graph.nodes(data='winner'):
+            if winner:
+                self.node_winner[node] = TOP_WINS if winner == 'top' else BOTTOM_WINS
+        self.node_winner.setflags(write=False)
 
     def get_node_data(self, node: int) -> Dict:
         return self.graph.nodes[node]
@@ -23,22 +114,51 @@ class Board:
     def get_outgoing_edges(self, node: int) -> List[Dict]:
         return self.graph.nodes[node]['outgoing']
 
+_shared_board: Optional[Board] = None
+_shared_board_lock = Lock()
+
+def shared_board() -> Board:
+    """
+    Returns the process-wide board, building it on first use. Its graph is frozen with nx.freeze, so it can be shared
+    by every Game, Simulation and BJJEnv in the process instead of each one building its own copy. All per-game state
+    (current node, players, scores) lives on GameState and Game, never on the board
+    """
+    global _shared_board
+    with _shared_board_lock:
+        if _shared_board is None:
+            _shared_board = Board(nx.freeze(construct_graph()))
+    return _shared_board
+
+def game_seed(seed: int, game_index: int) -> int:
+    """
+    seed of one game in a seeded simulation. It only depends on the simulation's seed and the game's index, so the
+    results don't depend on how the games are split across threads, processes or tasks
+    """
+    return int(np.random.SeedSequence([seed, game_index]).generate_state(1)[0])
+
 class GameState:
-    def __init__(self, board: Board):
+    def __init__(self, board: Board, events: EventSink = NULL_SINK, rng=random):
         self.board = board
+        self.events = events
+        self.rng = rng  # the random module, or a random.Random for seeded games
         self.current_node = None
 
     def initialize(self):
         # position 94 is 'symmetric staggered standing'. A central node with many possible outgoing edges
-        self.current_node = random.choice([94, random.choice(list(self.board.graph.nodes()))])
+        nodes = self.board.nodes
+        start = self.rng.choice([94, self.rng.choice(nodes)])
+        # graphs without position 94 (e.g. small test graphs) start on a random node
+        self.current_node = start if start in self.board.graph else self.rng.choice(nodes)
 
     def update(self, new_node: int):
-        print(f'moving to position {self.board.get_node_data(new_node)["description"]}')
+        if self.events:
+            self.events.emit('position_changed', node=new_node,
+                             description=self.board.get_node_data(new_node)["description"])
         self.current_node = new_node
 
     def get_possible_moves(self, is_top: bool, is_bottom: bool) -> List[Tuple[int, Dict]]:
-        #note: May not need to pass in both top and bottom position? need to explicitly test that they are always opposites
-        #before any third state ([True,True] or [False,False]) will create issues if both attributes aren't passed in
+        #note: is_bottom is always the opposite of is_top, and the legal moves are precomputed per is_top value.
+        #is_bottom is only kept so that existing callers don't break
         """
         Passes in Player's top/bottom position and calculates which moves are valid for the relative position of the player
 
@@ -46,20 +166,14 @@ class GameState:
         that position (i.e. top moves from bottom position and vice versa). This is an important distinction because it means
         that any player can perform a move that doesn't have a top or bottom tag on it regardless of their position
         """
-        possible_moves = []
-        for outgoing_edge in self.board.get_node_data(self.current_node)['outgoing']:
-            # player is on top position but the move is for bottom position
-            if is_top and outgoing_edge['bottom']:
-                pass
-            # player is on bottom position but the move is for top position
-            elif is_bottom and outgoing_edge['top']:
-                pass
-            # no conflicts found, the move is valid
-            else:
-                move = (outgoing_edge['to'], self.board.get_edge_data(outgoing_edge['from'], outgoing_edge['to']))
-                possible_moves.append(move)
+        return list(self.board.legal_move_tuples[is_top][self.current_node])
 
-        return possible_moves
+    def get_legal_moves(self, is_top: bool) -> np.ndarray:
+        """
+        Edge indices of the moves the player on top (or bottom) can perform from the current node. This is a read-only
+        slice of the board's precomputed move table, so no edge data is looked up
+        """
+        return self.board.moves.legal_moves(self.current_node, is_top)
 
     def process_move(self, move: Tuple[int, Dict]) -> tuple[int, bool, bool]:
         new_node, edge_data = move
@@ -73,7 +187,8 @@ class GameState:
         earned_points = 0  # iteratively add to this because a player may execute multiple maneuvers in the same move
         for maneuver, points in self.board.rewards.items():
             if edge_data.get(maneuver, False):
-                print(f'{maneuver} executed, player wins {points} points')
+                if self.events:
+                    self.events.emit('maneuver_executed', maneuver=maneuver, points=points)
                 earned_points += points
         return earned_points
     def check_winner(self) -> Optional[str]:
@@ -82,25 +197,46 @@ class GameState:
 
 class Player:
     # do I need the strategy property? revisit this
-    def __init__(self, name: str, strategy: str = 'random'):
+    def __init__(self, name: str, strategy: str = 'random', rng=random, agent=None):
         self.name = name
         self.is_top = False
         self.is_bottom = False
         self.points = 0
         self.strategy = strategy
+        self.rng = rng
+        # optional object with a choose_move(game, player, possible_moves) method, e.g. a solver.GameSolver. It chooses
+        # the player's moves instead of the strategy
+        self.agent = agent
 
-    def choose_move(self, possible_moves: List[Tuple[int, Dict]]) -> Tuple[int, Dict]:
+    def choose_move(self, possible_moves: List[Tuple[int, Dict]], game: Optional['Game'] = None) -> Tuple[int, Dict]:
         assert possible_moves, "empty list of possible_moves passed to choose_move"
+        if self.agent is not None and game is not None:
+            return self.agent.choose_move(game, self, possible_moves)
         if self.strategy == 'random':
-            return random.choice(possible_moves)
+            return self.rng.choice(possible_moves)
         # Implement other strategies here
-        return random.choice(possible_moves)
+        return self.rng.choice(possible_moves)
 
 class Game:
-    def __init__(self, name: str, max_turns=100):
+    """
+    Inputs:
+        name (str): name of the game
+        max_turns (int): turns after which the game is decided on points
+        board (Board, optional): board to play on. Defaults to the process-wide shared_board()
+        events (EventSink, optional): receives the game's events. By default they are dropped, so the game runs
+            headless
+        verbose (bool): log every event through a LoggingSink, unless events is passed
+        seed (int, optional): seeds the game's own random.Random. By default the game uses the random module
+    """
+    def __init__(self, name: str, max_turns=100, board: Optional[Board] = None, events: Optional[EventSink] = None,
+                 verbose: bool = False, seed: Optional[int] = None):
         self.name = name
-        self.board = Board(construct_graph())
-        self.game_state = GameState(self.board)
+        self.board = board if board is not None else shared_board()
+        if events is None:
+            events = LoggingSink() if verbose else NULL_SINK
+        self.events = events
+        self.rng = random.Random(seed) if seed is not None else random
+        self.game_state = GameState(self.board, events, self.rng)
         self.max_turns = max_turns
         self.turn_count = 0
         self.player1: Optional[Player] = None
@@ -115,34 +251,37 @@ class Game:
             return self.player1
 
     def initialize_game(self, p1_name: str, p2_name: str):
-        print(f'Initializing game: {self.name}')
+        if self.events:
+            self.events.emit('game_initialized', game=self.name)
         self.game_state.initialize()
-        self.player1 = Player(p1_name)
-        self.player2 = Player(p2_name)
+        self.player1 = Player(p1_name, rng=self.rng)
+        self.player2 = Player(p2_name, rng=self.rng)
         self._randomly_assign_positions()
-        self.current_player = random.choice([self.player1, self.player2])
+        self.current_player = self.rng.choice([self.player1, self.player2])
 
     def _randomly_assign_positions(self):
         """
         Randomly chooses whether a player is in the top or bottom position, and give the other player the opposite
         position.
         """
-        self.player1.is_top = random.choice([True, False])
+        self.player1.is_top = self.rng.choice([True, False])
         self.player1.is_bottom = not self.player1.is_top
 
         self.player2.is_top = not self.player1.is_top
         self.player2.is_bottom = not self.player1.is_bottom
 
-        print(f'{self.player1.name} is on {"top" if self.player1.is_top else "bottom"}')
-        print(f'{self.player2.name} is on {"top" if self.player2.is_top else "bottom"}')
+        if self.events:
+            self.events.emit('positions_assigned',
+                             player1=self.player1.name, player1_position="top" if self.player1.is_top else "bottom",
+                             player2=self.player2.name, player2_position="top" if self.player2.is_top else "bottom")
 
     def _swap_players_positions(self):
         """
         gives each player the other players' top and bottom position attributes
         """
-        cache = (self.player1.is_top, self.player1.is_top)
-        self.player1.is_top, self.player1.is_top = self.player2.is_top, self.player2.is_top
-        self.player2.is_top, self.player2.is_top = cache
+        cache = (self.player1.is_top, self.player1.is_bottom)
+        self.player1.is_top, self.player1.is_bottom = self.player2.is_top, self.player2.is_bottom
+        self.player2.is_top, self.player2.is_bottom = cache
 
     def play_turn(self, chosen_move: Tuple[int, Dict]=None) -> bool:
         if chosen_move:
@@ -153,24 +292,29 @@ class Game:
                 # if current state is a terminal node, but not associated with a win or loss
                 if not self.game_state.board.get_outgoing_edges(self.game_state.current_node):
                     # change to random node, then allow player to play their turn
-                    print('Terminal position encountered. switching to random position ')
+                    if self.events:
+                        self.events.emit('terminal_position', node=self.game_state.current_node)
                     self.game_state.initialize()
                     return self.play_turn()
                 else:
-                    print(f"No moves available for {self.current_player.name}. Switching players.")
+                    if self.events:
+                        self.events.emit('no_moves', player=self.current_player.name)
                     # note: maybe this shouldn't conclude the turn, and instead should switch players then call play_turn again
                     return self.switch_players()
             else:
-                move = self.current_player.choose_move(possible_moves)
+                move = self.current_player.choose_move(possible_moves, self)
         points, player_tapped, swap_players_positions = self.game_state.process_move(move)
         self.current_player.points += points
-        print(f"{self.current_player.name} performed '{move[1]['description']}'")
-        if points>0:
-            print(f'Player earned {points} points for that move')
+        if self.events:
+            self.events.emit('move_performed', player=self.current_player.name, description=move[1]['description'],
+                             node=move[0], points=points)
+            if points>0:
+                self.events.emit('points_earned', player=self.current_player.name, points=points)
 
         if player_tapped:
             winning_player = self.choose_other_player(self.current_player)
-            print(f"{self.current_player.name} tapped - {winning_player.name} has won! ")
+            if self.events:
+                self.events.emit('player_tapped', player=self.current_player.name, winner=winning_player.name)
             self.winner = winning_player
             return True
 
@@ -180,7 +324,8 @@ class Game:
             winning_player = self.player1 if ((self.player1.is_top and winner == 'top') or
                                               (self.player1.is_bottom and winner == 'bottom')) else self.player2
             self.winner = winning_player
-            print(f"{winning_player.name} won by reaching a winning position!")
+            if self.events:
+                self.events.emit('winning_position', winner=winning_player.name)
             return True
 
         if swap_players_positions:
@@ -195,18 +340,20 @@ class Game:
     def check_for_points_win(self):
         if self.player1.points > self.player2.points:
             self.winner = self.player1
-            print(f"{self.player1.name} wins!")
         elif self.player2.points > self.player1.points:
             self.winner = self.player2
-            print(f"{self.player2.name} wins!")
-        else:
-            print("It's a tie!")
+        if self.events:
+            if self.winner:
+                self.events.emit('points_win', winner=self.winner.name)
+            else:
+                self.events.emit('tie')
 
     def play_game(self):
         max_turns = self.max_turns
         for turn in range(1, max_turns + 1):
             self.turn_count += 1
-            print(f"\nTurn {turn}:")
+            if self.events:
+                self.events.emit('turn_started', turn=turn)
             if self.play_turn():
                 break
         if not self.winner:
@@ -214,29 +361,146 @@ class Game:
         self._print_game_result()
 
     def _print_game_result(self):
-        print("\nGame over! Final scores:")
-        print(f"{self.player1.name}: {self.player1.points}")
-        print(f"{self.player2.name}: {self.player2.points}")
+        if self.events:
+            self.events.emit('game_over', player1=self.player1.name, player1_points=self.player1.points,
+                             player2=self.player2.name, player2_points=self.player2.points)
+
+def agg_results(results: List[Dict]) -> List[Dict]:
+    """prints the win rates and game lengths of Simulation style result dicts"""
+    print("SIMULATION RESULTS:")
+    player1_wins = 0
+    player2_wins = 0
+    num_ties = 0
+    for result in results:
+        if result['winner'] == result['player1_name']:
+            player1_wins += 1
+        elif result['winner'] == result['player2_name']:
+            player2_wins += 1
+        else:
+            num_ties += 1
+    print(f'Player 1 won {player1_wins} games out of {len(results)} ({round(player1_wins/len(results),2)})')
+    print(f'Player 2 won {player2_wins} games out of {len(results)} ({round(player2_wins / len(results),2)})')
+    if num_ties > 0:
+        print(f'there were {num_ties} ties')
+    num_turns = [i['num_turns'] for i in results]
+    print(f'On average, games lasted {np.mean(num_turns)} with a min of {np.min(num_turns)} and a max of {np.max(num_turns)}')
+
+    return results
+
+class GameRecord(NamedTuple):
+    """compact result of one game, as sent back by the worker processes"""
+    game_index: int
+    winner: int  # 1 or 2 for the winning player, 0 for a tie
+    player1_points: int
+    player2_points: int
+    num_turns: int
+
+    @classmethod
+    def from_game(cls, game_index: int, game: 'Game') -> 'GameRecord':
+        winner = 1 if game.winner is game.player1 else 2 if game.winner is game.player2 else 0
+        return cls(game_index, winner, game.player1.points, game.player2.points, game.turn_count)
+
+    def to_result(self) -> Dict:
+        """the result dict Simulation.play_single_game returns for the same game"""
+        name = f"Game_{self.game_index}"
+        player1_name, player2_name = f"Player1_{name}", f"Player2_{name}"
+        return {
+            'game_name': name,
+            'player1_name': player1_name,
+            'player2_name': player2_name,
+            'winner': {1: player1_name, 2: player2_name}.get(self.winner, 'Tie'),
+            'player1_points': self.player1_points,
+            'player2_points': self.player2_points,
+            'num_turns': self.num_turns
+        }
+
+# board of a Simulation worker process, set once per process by _initialize_worker
+_worker_board: Optional[Board] = None
+
+def _initialize_worker(graph: nx.DiGraph, rules: Optional[List[MoveRule]]):
+    """
+    Process pool initializer. The graph is sent once per worker rather than once per task, and its move table is
+    memory-mapped from the compiled graph cache when the graph came from there. rules are the Simulation's
+    Board.rules, so the games are scored the same way as on threads
+    """
+    global _worker_board
+    _worker_board = Board(graph, rules)
+
+def _play_games(game_indices: range, max_turns: int, seed: int) -> List[GameRecord]:
+    """plays a batch of games in a worker process, headless, and returns their compact records"""
+    records = []
+    for i in game_indices:
+        game = Game(f"Game_{i}", max_turns=max_turns, board=_worker_board, seed=game_seed(seed, i))
+        game.initialize_game(f"Player1_{game.name}", f"Player2_{game.name}")
+        game.play_game()
+        records.append(GameRecord.from_game(i, game))
+    return records
 
 class Simulation:
-    def __init__(self, num_games: int):
+    """
+    Inputs:
+        num_games (int): number of games to play
+        board (Board, optional): board to play on. Defaults to the process-wide shared_board()
+        events (EventSink): receives the events of every game played in this process
+        seed (int, optional): when given, game i is seeded with game_seed(seed, i), so that results are reproducible
+            and the same whether the games run on threads or processes, with any number of workers
+    """
+    def __init__(self, num_games: int, board: Optional[Board] = None, events: EventSink = NULL_SINK,
+                 seed: Optional[int] = None):
         self.num_games = num_games
+        self.board = board if board is not None else shared_board()
+        self.events = events  # shared by every game, so it must be thread-safe (LoggingSink is)
+        self.seed = seed
+        self.num_turns = 100
         self.games = []
         self.results = []
 
+    def _game_seed(self, game_index: int) -> Optional[int]:
+        return game_seed(self.seed, game_index) if self.seed is not None else None
+
     def initialize_games(self, num_turns: int = 100):
-        print('Initializing games')
-        self.games = [Game(f"Game_{i}", max_turns= num_turns) for i in range(self.num_games)]
+        if self.events:
+            self.events.emit('simulation_initializing')
+        self.num_turns = num_turns
+        self.games = [Game(f"Game_{i}", max_turns= num_turns, board=self.board, events=self.events,
+                           seed=self._game_seed(i))
+                      for i in range(self.num_games)]
         for game in tqdm(self.games):
             game.initialize_game(f"Player1_{game.name}", f"Player2_{game.name}")
 
-    def run_games(self):
-        print('running games')
+    def run_games(self, processes: Optional[int] = None, games_per_task: int = 64):
+        """
+        Plays the games on a thread pool by default. Threads share the GIL, so pass processes (0 for one per CPU) to
+        play them on a process pool instead
+
+        In process mode, the games are created and played by the workers, so initialize_games isn't needed (its
+        num_turns is still used if it was called). The games are played in batches of games_per_task to amortize the
+        inter-process communication, and the workers don't send any events back
+        """
+        if self.events:
+            self.events.emit('simulation_running')
+        if processes is not None:
+            self._run_games_in_processes(processes or None, games_per_task)
+            return
         with ThreadPoolExecutor() as executor:
             futures = [executor.submit(self.play_single_game, game) for game in self.games]
             for future in tqdm(as_completed(futures)):
                 self.results.append(future.result())
 
+    def _run_games_in_processes(self, processes: Optional[int], games_per_task: int):
+        # without a seed, draw one so that the games still differ between runs, like unseeded games on threads do
+        seed = self.seed if self.seed is not None else random.randrange(2 ** 32)
+        batches = [range(start, min(start + games_per_task, self.num_games))
+                   for start in range(0, self.num_games, games_per_task)]
+        records = []
+        with ProcessPoolExecutor(max_workers=processes, initializer=_initialize_worker,
+                                 initargs=(self.board.graph, self.board.rules)) as executor:
+            futures = [executor.submit(_play_games, batch, self.num_turns, seed) for batch in batches]
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                records.extend(future.result())
+        records.sort(key=lambda record: record.game_index)
+        self.results.extend(record.to_result() for record in records)
+
     def play_single_game(self, game: Game) -> Dict:
         game.play_game()
         return {
@@ -250,38 +514,21 @@ class Simulation:
         }
 
     def agg_results(self) -> List[Dict]:
-        print("SIMULATION RESULTS:")
-        results = self.results
-        player1_wins = 0
-        player2_wins = 0
-        num_ties = 0
-        for result in results:
-            if result['winner'] == result['player1_name']:
-                player1_wins += 1
-            elif result['winner'] == result['player2_name']:
-                player2_wins += 1
-            else:
-                num_ties += 1
-        print(f'Player 1 won {player1_wins} games out of {len(results)} ({round(player1_wins/len(results),2)})')
-        print(f'Player 2 won {player2_wins} games out of {len(results)} ({round(player2_wins / len(results),2)})')
-        if num_ties > 0:
-            print(f'there were {num_ties} ties')
-        num_turns = [i['num_turns'] for i in results]
-        print(f'On average, games lasted {np.mean(num_turns)} with a min of {np.minimum(num_turns)} and a max of {np.maximum(num_turns)}')
-
-        return self.results
+        return agg_results(self.results)
 
     def reset(self):
         self.games = []
         self.results = []
 
-# Single game example
-game = Game("BJJ Simulation")
-game.initialize_game("Player 1", "Player 2")
-game.play_game()
-
-# Parallel multi-threaded example
-# simulation = Simulation(num_games=100)
-# simulation.initialize_games()
-# simulation.run_games(max_turns=200)
-# simulation.agg_results()
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # Single game example
+    game = Game("BJJ Simulation", verbose=True)
+    game.initialize_game("Player 1", "Player 2")
+    game.play_game()
+
+    # Parallel multi-threaded example
+    # simulation = Simulation(num_games=100)
+    # simulation.initialize_games()
+    # simulation.run_games(max_turns=200)
+    # simulation.agg_results()
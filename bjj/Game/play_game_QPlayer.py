@@ -1,4 +1,4 @@
-from play_game import Board, GameState, construct_graph
+from play_game import Board, GameState, shared_board
 import random
 import copy
 import numpy as np
@@ -149,7 +149,7 @@ class QLearningSim:
 class Game:
     def __init__(self, name: str):
         self.name = name
-        self.board = Board(construct_graph())
+        self.board = shared_board()
         self.game_state = GameState(self.board)
         self.turn_count = 0
         self.player1: Optional[Player] = None
@@ -277,7 +277,7 @@ class Game:
         print(f"{self.player2.name}: {self.player2.points}")
 
 # Usage
-board = Board(construct_graph())
+board = shared_board()
 state_size = len(board.graph)
 action_size = sum(len(board.get_outgoing_edges(node)) for node in board.graph.nodes())
 q_agent = QLearningAgent(state_size, action_size)
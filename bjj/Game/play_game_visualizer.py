@@ -1,9 +1,8 @@
-from play_game import Board, GameState, Player
+from play_game import GameState, Player, shared_board
 import random
 import networkx as nx
 import numpy as np
 from typing import List, Optional
-from Graph.graph_constructor import construct_graph
 import matplotlib.pyplot as plt
 from matplotlib.collections import LineCollection
 
@@ -79,14 +78,14 @@ class DynamicGraphVisualizer:
 class Game:
     def __init__(self, name: str):
         self.name = name
-        self.board = Board(construct_graph())
+        self.board = shared_board()
         self.game_state = GameState(self.board)
         self.turn_count = 0
         self.player1: Optional[Player] = None
         self.player2: Optional[Player] = None
         self.current_player: Optional[Player] = None
         self.winner = None
-        self.visualizer = DynamicGraphVisualizer(self, construct_graph())
+        self.visualizer = DynamicGraphVisualizer(self, self.board.graph)
 
 
     def choose_other_player(self, player: Player) -> Player:
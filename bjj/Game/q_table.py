@@ -0,0 +1,131 @@
+"""
+Sparse Q-table: values for legal (state, action) pairs only, instead of a dense num_states x num_actions matrix
+
+States are gym_env.state_to_index's node * 2 + on_top, actions are edge indices (BJJEnv's action indices). Only a few of
+the ~1500 edges leave any node, and only the top or the bottom player may take most of them, so the dense table is
+almost all zeros
+"""
+from typing import Optional, Union
+import numpy as np
+from Graph.move_table import MoveTable
+
+ArrayLike = Union[int, np.ndarray]
+
+
+class SparseQTable:
+    """
+    CSR layout of the Q-values: the legal actions of state s are actions[offsets[s]:offsets[s + 1]], and their values
+    are values[context, offsets[s]:offsets[s + 1]]
+
+    Contexts extend the state with anything that isn't part of the position, e.g. a bucketed point difference or turns
+    left: every context is a contiguous row of values over the same legal actions, so they cost no extra index memory
+
+    Inputs:
+        moves (MoveTable): move table of the board
+        num_contexts (int): number of rows of values
+        dtype: dtype of the values
+    """
+    def __init__(self, moves: MoveTable, num_contexts: int = 1, dtype=np.float64):
+        self.num_actions = len(moves)
+        self.num_states = moves.num_nodes * 2
+        self.num_contexts = num_contexts
+        # legal_offsets rows are [bottom, top], states interleave them per node
+        counts = np.diff(moves.legal_offsets, axis=1).T.reshape(-1)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.intp)
+        starts = moves.legal_offsets[:, :-1].T.reshape(-1)
+        within = np.arange(self.offsets[-1]) - np.repeat(self.offsets[:-1], counts)
+        self.actions = moves.legal_edges[np.repeat(starts, counts) + within].astype(np.intp)
+        self.states = np.repeat(np.arange(self.num_states), counts)
+        # an edge only leaves its source node, so for a given on_top it has at most one slot
+        self.sources = moves.sources
+        self.edge_slot = np.full((2, self.num_actions), -1, dtype=np.intp)
+        self.edge_slot[self.states & 1, self.actions] = np.arange(len(self.actions))
+        self.values = np.zeros((num_contexts, len(self.actions)), dtype=dtype)
+        self._offsets = self.offsets.tolist()
+
+    def __len__(self) -> int:
+        """number of legal (state, action) pairs"""
+        return len(self.actions)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.values, self.offsets, self.actions, self.states, self.edge_slot))
+
+    def slot(self, state: ArrayLike, action: ArrayLike) -> ArrayLike:
+        """column of (state, action) in values, -1 if the action isn't legal in the state"""
+        slot = self.edge_slot[np.bitwise_and(state, 1), action]
+        leaves_node = self.sources[action] == np.right_shift(state, 1)
+        if np.ndim(slot):
+            return np.where(leaves_node, slot, -1)
+        return int(slot) if leaves_node else -1
+
+    def legal_actions(self, state: int) -> np.ndarray:
+        return self.actions[self._offsets[state]:self._offsets[state + 1]]
+
+    def state_values(self, state: int, context: int = 0) -> np.ndarray:
+        """writable view of the values of the legal actions of state, in the order of legal_actions(state)"""
+        return self.values[context, self._offsets[state]:self._offsets[state + 1]]
+
+    def get(self, state: ArrayLike, action: ArrayLike, context: ArrayLike = 0) -> ArrayLike:
+        """Q-values, 0 for actions that aren't legal in the state"""
+        slot = self.slot(state, action)
+        if np.ndim(slot):
+            return np.where(slot >= 0, self.values[context, slot], 0)
+        return self.values[context, slot] if slot >= 0 else 0.0
+
+    def add(self, state: ArrayLike, action: ArrayLike, delta, context: ArrayLike = 0):
+        """adds delta to the Q-values of legal (state, action) pairs. Repeated pairs are all accumulated"""
+        slot = self.slot(state, action)
+        if np.ndim(slot):
+            legal = slot >= 0
+            np.add.at(self.values, (np.broadcast_to(context, slot.shape)[legal], slot[legal]),
+                      np.broadcast_to(delta, slot.shape)[legal])
+        elif slot >= 0:
+            self.values[context, slot] += delta
+
+    def max(self, state: int, context: int = 0) -> float:
+        """max Q-value over the legal actions of state, 0 if it has none"""
+        start, end = self._offsets[state], self._offsets[state + 1]
+        return float(self.values[context, start:end].max()) if end > start else 0.0
+
+    def argmax(self, state: int, context: int = 0) -> int:
+        """legal action of state with the highest Q-value, the first one on ties. -1 if it has none"""
+        start, end = self._offsets[state], self._offsets[state + 1]
+        return int(self.actions[start + self.values[context, start:end].argmax()]) if end > start else -1
+
+    def max_all(self, context: int = 0, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """max Q-value of every state at once, 0 for states without legal actions"""
+        out = np.zeros(self.num_states, dtype=self.values.dtype) if out is None else out
+        non_empty = self.offsets[:-1] < self.offsets[1:]
+        out[:] = 0
+        if len(self):
+            out[non_empty] = np.maximum.reduceat(self.values[context], self.offsets[:-1][non_empty])
+        return out
+
+    def argmax_all(self, context: int = 0) -> np.ndarray:
+        """greedy action of every state at once, the first one on ties and -1 for states without legal actions"""
+        best = np.full(self.num_states, -1, dtype=np.intp)
+        if not len(self):
+            return best
+        values = self.values[context]
+        is_max = values == self.max_all(context)[self.states]
+        slots = np.flatnonzero(is_max)
+        # the first maximal slot of each state
+        first = slots[np.concatenate([[True], self.states[slots[1:]] != self.states[slots[:-1]]])]
+        best[self.states[first]] = self.actions[first]
+        return best
+
+    def to_dense(self, context: int = 0) -> np.ndarray:
+        """(num_states, num_actions) Q-table in the layout of gym_env.q_learning's"""
+        dense = np.zeros((self.num_states, self.num_actions), dtype=self.values.dtype)
+        dense[self.states, self.actions] = self.values[context]
+        return dense
+
+    @classmethod
+    def from_dense(cls, moves: MoveTable, q_table: np.ndarray) -> 'SparseQTable':
+        """the legal entries of a dense Q-table, e.g. one trained by gym_env.q_learning"""
+        table = cls(moves, dtype=q_table.dtype)
+        # q_learning's table can leave out the last node's states
+        inside = table.states < len(q_table)
+        table.values[0, inside] = q_table[table.states[inside], table.actions[inside]]
+        return table
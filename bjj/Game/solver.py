@@ -0,0 +1,177 @@
+"""
+Exact solution of the game by backward induction over the position graph
+
+A state is (turns left, point difference, node, whether the player to move is on top), always seen from the player to
+move: its value is that player's expected outcome under optimal play by both players, 1 for a win, -1 for a loss and 0
+for a tie. The game is zero-sum, so the value of a move is minus the opponent's value of the state it leads to
+(negamax), and the player to move needs no index of its own.
+
+The rules are Game.play_turn's, with BatchSimulation's array form:
+    - a tap loses, reaching a winning node wins for the player on top (or bottom) before players are swapped
+    - players without a legal move pass, which still takes a turn
+    - a node without outgoing edges restarts the game from a random node on the same turn, the only chance event, so
+      values are expectations over GameState.initialize's choice of node
+    - after the last turn the game is decided on points
+
+Points only matter through their sign at the end, and a turn changes the difference by at most the highest points of a
+move, so layer t only holds differences up to t * max points + 1 in absolute value: beyond that the result on points
+is settled and the value is the same as at the bound.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from play_game import Board, Game, Player, shared_board, NO_WINNER, TOP_WINS
+from batch_sim import START_NODE
+
+PASS = -1  # best move of states where the player to move has no legal move, or the game restarts
+
+
+class GameSolver:
+    """
+    Solves the game on a board for up to max_turns turns
+
+    Inputs:
+        board (Board, optional): board to solve. Defaults to the process-wide shared_board()
+        max_turns (int): longest horizon to solve, Game's max_turns for a full game
+        dtype: dtype of the stored values
+
+    After solve():
+        values[t]: (2 * bounds[t] + 1, num_nodes, 2) values with t turns left, indexed by
+            [point difference + bounds[t], node, on_top]
+        best_moves[t]: the same shape, edge index of an optimal move, the first one on ties, or PASS
+        solve_seconds: time taken by solve()
+    """
+    def __init__(self, board: Optional[Board] = None, max_turns: int = 100, dtype=np.float32):
+        self.board = board if board is not None else shared_board()
+        self.max_turns = max_turns
+        self.dtype = dtype
+        moves = self.board.moves
+        self.moves = moves
+        self.num_nodes = moves.num_nodes
+        self.max_points = int(moves.points.max(initial=0))
+        self.bounds = [t * self.max_points + 1 for t in range(max_turns + 1)]
+        self.move_dtype = np.int16 if len(moves) < np.iinfo(np.int16).max else np.int32
+
+        self.node_winner = self.board.node_winner
+        self.dead_ends = np.flatnonzero(np.diff(moves.offsets) == 0)
+        # GameState.initialize's choice of node, redrawn until it has outgoing edges
+        weights = np.zeros(self.num_nodes)
+        nodes = np.array(self.board.nodes, dtype=np.intp)
+        if START_NODE in self.board.graph:
+            weights[nodes] = 0.5 / len(nodes)
+            weights[START_NODE] += 0.5
+        else:
+            weights[nodes] = 1 / len(nodes)
+        weights[self.dead_ends] = 0
+        self.restart_nodes = np.flatnonzero(weights)
+        self.restart_weights = weights[self.restart_nodes] / weights.sum() if weights.sum() else weights[:0]
+
+        self.values: List[np.ndarray] = []
+        self.best_moves: List[np.ndarray] = []
+        self.solve_seconds = 0.0
+
+    def _index(self, turns_left: int, point_difference):
+        """row of a point difference in layer turns_left, clipped to the layer's bound"""
+        bound = self.bounds[turns_left]
+        return np.clip(point_difference, -bound, bound) + bound
+
+    def _edge_values(self, turns_left: int, on_top: int, edges: np.ndarray, differences: np.ndarray) -> np.ndarray:
+        """(len(edges), len(differences)) values of playing each edge, for the player to move"""
+        moves = self.moves
+        targets = moves.targets[edges]
+        # the opponent moves next, from the other side of the (possibly swapped) position
+        opponent_on_top = 1 - (on_top ^ moves.swaps_players[edges].astype(np.intp))
+        opponent_difference = -(differences[None, :] + moves.points[edges][:, None])
+        previous = self.values[turns_left - 1]
+        values = -previous[self._index(turns_left - 1, opponent_difference), targets[:, None],
+                           opponent_on_top[:, None]].astype(np.float64)
+
+        node_winner = self.node_winner[targets]
+        reached = node_winner != NO_WINNER
+        values[reached] = np.where((node_winner[reached] == TOP_WINS) == bool(on_top), 1, -1)[:, None]
+        values[moves.tap[edges]] = -1
+        return values
+
+    def _solve_layer(self, turns_left: int) -> Tuple[np.ndarray, np.ndarray]:
+        bound = self.bounds[turns_left]
+        differences = np.arange(-bound, bound + 1)
+        values = np.zeros((len(differences), self.num_nodes, 2))
+        best_moves = np.full(values.shape, PASS, dtype=self.move_dtype)
+        if turns_left == 0:
+            values[:] = np.sign(differences)[:, None, None]
+            return values, best_moves
+
+        previous = self.values[turns_left - 1]
+        out_degree = np.diff(self.moves.offsets)
+        for on_top in (0, 1):
+            row = self.moves.legal_offsets[on_top]
+            edges = self.moves.legal_edges[row[0]:row[-1]]
+            counts = np.diff(row)
+            moving = np.flatnonzero(counts)
+            if len(edges):
+                edge_values = self._edge_values(turns_left, on_top, edges, differences)
+                starts = row[:-1][moving] - row[0]
+                best = np.maximum.reduceat(edge_values, starts, axis=0)
+                # first edge of each node that reaches the node's best value
+                is_best = edge_values == np.repeat(best, counts[moving], axis=0)
+                positions = np.where(is_best, np.arange(len(edges))[:, None], len(edges))
+                first = np.minimum.reduceat(positions, starts, axis=0)
+                values[:, moving, on_top] = best.T
+                best_moves[:, moving, on_top] = edges[first].T
+            # a player without a legal move passes, the opponent moves from the same node
+            passing = np.flatnonzero((counts == 0) & (out_degree > 0))
+            values[:, passing, on_top] = -previous[self._index(turns_left - 1, -differences)[:, None], passing[None, :],
+                                                   1 - on_top]
+        # dead ends restart on the same turn, after the other nodes of the layer are known
+        values[:, self.dead_ends, :] = np.einsum('dnb,n->db', values[:, self.restart_nodes, :],
+                                                 self.restart_weights)[:, None, :]
+        return values, best_moves
+
+    def solve(self) -> 'GameSolver':
+        start = time.perf_counter()
+        self.values, self.best_moves = [], []
+        for turns_left in range(self.max_turns + 1):
+            values, best_moves = self._solve_layer(turns_left)
+            self.values.append(values.astype(self.dtype))
+            self.best_moves.append(best_moves)
+        self.solve_seconds = time.perf_counter() - start
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        """memory held by the value and best move tables"""
+        return sum(array.nbytes for array in self.values + self.best_moves)
+
+    def value(self, node: int, on_top: bool, point_difference: int, turns_left: int) -> float:
+        """value for the player to move, see the module docstring"""
+        turns_left = min(turns_left, self.max_turns)
+        return float(self.values[turns_left][self._index(turns_left, point_difference), node, int(on_top)])
+
+    def best_move(self, node: int, on_top: bool, point_difference: int, turns_left: int) -> int:
+        """edge index of an optimal move for the player to move, PASS if there is none"""
+        turns_left = min(turns_left, self.max_turns)
+        return int(self.best_moves[turns_left][self._index(turns_left, point_difference), node, int(on_top)])
+
+    def choose_move(self, game: Game, player: Player, possible_moves: List[Tuple[int, Dict]]) -> Tuple[int, Dict]:
+        """
+        Player agent interface: the optimal move of player in game. Games longer than max_turns are played as if only
+        max_turns were left until they get there
+        """
+        other_player = game.choose_other_player(player)
+        # play_game counts the current turn before it is played
+        turns_left = game.max_turns - game.turn_count + 1
+        edge = self.best_move(game.game_state.current_node, player.is_top, player.points - other_player.points,
+                              max(turns_left, 1))
+        if edge == PASS:
+            return player.rng.choice(possible_moves)
+        return int(self.moves.targets[edge]), self.board.edge_data[edge]
+
+    def report(self) -> Dict[str, float]:
+        return {'max_turns': self.max_turns, 'solve_seconds': self.solve_seconds, 'megabytes': self.nbytes / 2 ** 20,
+                'states': sum(values.size for values in self.values)}
+
+
+if __name__ == "__main__":
+    solver = GameSolver(max_turns=100).solve()
+    print(solver.report())
+    print(f"value from the start position on top, 100 turns left: {solver.value(START_NODE, True, 0, 100):.4f}")
@@ -0,0 +1,59 @@
+import json
+import networkx as nx
+import pytest
+from play_game import Board
+from Graph.graph_constructor import construct_graph
+
+
+def _node(id, description, tags):
+    return {'id': id, 'description': description, 'tags': tags, 'incoming': [], 'outgoing': [], 'line_nr': id}
+
+
+def _transition(id, start, end, description, tags=(), properties=(), swap_players=False):
+    return {'id': id, 'from': {'node': start, 'reo': {'swap_players': False, 'mirror': False}},
+            'to': {'node': end, 'reo': {'swap_players': swap_players, 'mirror': False}},
+            'frames': [], 'description': [description], 'tags': list(tags), 'properties': list(properties),
+            'line_nr': id}
+
+
+@pytest.fixture
+def graph_files(tmp_path):
+    """paths to a small nodes.json, transitions.json and terminal_node_winstate.json in the GrappleMap format"""
+    nodes = [_node(0, 'standing', ['standing']),
+             _node(1, 'closed\nguard', ['closed_guard', 'top_kneeling']),
+             _node(2, 'mount', ['mount', 'bottom_supine']),
+             _node(3, 'armbar', ['armbar']),
+             _node(4, 'tapped', ['tapped'])]
+    transitions = [_transition(0, 0, 1, 'pull guard', properties=['bottom']),
+                   _transition(1, 1, 2, 'scissor sweep', tags=['sweep'], properties=['bottom'], swap_players=True),
+                   _transition(2, 0, 2, 'takedown to mount', tags=['takedown'], properties=['top', 'bidirectional']),
+                   _transition(3, 2, 3, 'armbar from mount', properties=['top']),
+                   _transition(4, 3, 4, 'tap')]
+    paths = {}
+    for name, data in [('nodes', nodes), ('transitions', transitions),
+                       ('terminal_node_winstate', [{'node': 4, 'winner': 'top'}])]:
+        paths[name] = str(tmp_path / f'{name}.json')
+        with open(paths[name], 'w') as file:
+            json.dump(data, file)
+    return paths
+
+
+@pytest.fixture
+def make_board(graph_files):
+    """builds a Board on the graph_files graph, passing its keyword arguments (e.g. cache_dir) to construct_graph"""
+    def make(**kwargs) -> Board:
+        return Board(nx.freeze(construct_graph(graph_files['nodes'], graph_files['transitions'],
+                                               graph_files['terminal_node_winstate'], **kwargs)))
+    return make
+
+
+@pytest.fixture
+def board(make_board):
+    """a Board on the graph_files graph, built without the compiled cache"""
+    return make_board(use_cache=False)
+
+
+@pytest.fixture
+def cached_board(make_board, tmp_path):
+    """a Board on the graph_files graph, loaded through the compiled cache in tmp_path / 'compiled'"""
+    return make_board(cache_dir=str(tmp_path / 'compiled'))
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from play_game import Simulation
+from batch_sim import BatchSimulation, PLAYER1, PLAYER2, TIE, UNDECIDED
+
+
+def test_player_who_taps_loses(board):
+    batch = BatchSimulation(2, board=board, seed=0)
+    # node 3 only has the 'tap' move out of it, which any player can perform
+    batch.node[:] = 3
+    batch.current[:] = [0, 1]
+    assert batch.step() == 2
+    assert list(batch.winner) == [PLAYER2, PLAYER1]
+    assert list(batch.turn_count) == [1, 1]
+    assert batch.step() == 0
+
+
+def test_games_are_decided_on_points_after_max_turns(board):
+    batch = BatchSimulation(3, board=board, max_turns=1, seed=0)
+    # node 1 only has a bottom move: the player on top has to pass
+    batch.node[:] = 1
+    batch.player1_top[:] = [True, True, False]
+    batch.current[:] = 0
+    batch.points[:] = [[2, 0], [0, 0], [0, 0]]
+    batch.step()
+    assert list(batch.node[:2]) == [1, 1] and batch.node[2] == 2
+    assert list(batch.winner) == [PLAYER1, TIE, PLAYER1]
+
+
+def test_outcomes_match_simulation(board):
+    simulation = Simulation(num_games=1000, board=board, seed=0)
+    simulation.initialize_games(num_turns=10)
+    simulation.run_games()
+    expected = {outcome: 0 for outcome in (PLAYER1, PLAYER2, TIE)}
+    for result in simulation.results:
+        winner = {result['player1_name']: PLAYER1, result['player2_name']: PLAYER2}.get(result['winner'], TIE)
+        expected[winner] += 1
+    mean_turns = np.mean([result['num_turns'] for result in simulation.results])
+
+    batch = BatchSimulation(20000, board=board, max_turns=10, seed=0).run()
+    assert not (batch.winner == UNDECIDED).any()
+    counts = batch.outcome_counts()
+    for name, outcome in [('player1_wins', PLAYER1), ('player2_wins', PLAYER2), ('ties', TIE)]:
+        assert counts[name] / 20000 == pytest.approx(expected[outcome] / 1000, abs=0.05)
+    assert batch.turn_count.mean() == pytest.approx(mean_turns, rel=0.1)
+    assert len(batch.results) == 20000
@@ -0,0 +1,46 @@
+import logging
+import random
+from play_game import EventSink, Game
+
+
+class RecordingSink(EventSink):
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, **fields):
+        self.events.append((event, fields))
+
+
+def play(board, seed, **kwargs):
+    random.seed(seed)
+    game = Game('Game', max_turns=20, board=board, **kwargs)
+    game.initialize_game('Player 1', 'Player 2')
+    game.play_game()
+    return game
+
+
+def test_headless_game_prints_nothing(board, capsys):
+    play(board, seed=0)
+    assert capsys.readouterr().out == ''
+
+
+def test_events_describe_the_game(board):
+    sink = RecordingSink()
+    game = play(board, seed=0, events=sink)
+    names = [event for event, _ in sink.events]
+    assert names[:2] == ['game_initialized', 'positions_assigned']
+    assert names[-1] == 'game_over'
+    assert names.count('turn_started') == game.turn_count
+    moves = [fields for event, fields in sink.events if event == 'move_performed']
+    assert sum(move['points'] for move in moves if move['player'] == 'Player 1') == game.player1.points
+    # events don't consume randomness, so the same seed plays the same game headless
+    headless = play(board, seed=0)
+    assert (headless.turn_count, headless.player1.points, headless.player2.points) == \
+           (game.turn_count, game.player1.points, game.player2.points)
+
+
+def test_verbose_game_logs_messages(board, caplog):
+    with caplog.at_level(logging.INFO, logger='play_game'):
+        play(board, seed=0, verbose=True)
+    assert caplog.messages[0] == 'Initializing game: Game'
+    assert caplog.messages[-1].startswith('\nGame over! Final scores:')
@@ -0,0 +1,29 @@
+import json
+import os
+from Graph.graph_constructor import construct_graph
+
+
+def construct(graph_files, cache_dir, **kwargs):
+    return construct_graph(graph_files['nodes'], graph_files['transitions'], graph_files['terminal_node_winstate'],
+                           cache_dir=str(cache_dir), **kwargs)
+
+
+def test_cached_graph_matches_built_graph(graph_files, tmp_path):
+    built = construct(graph_files, tmp_path, use_cache=False)
+    first = construct(graph_files, tmp_path / 'compiled')
+    cached = construct(graph_files, tmp_path / 'compiled')
+    assert len(os.listdir(tmp_path / 'compiled')) == 1
+    for G in (first, cached):
+        assert dict(G.nodes(data=True)) == dict(built.nodes(data=True))
+        assert list(G.edges(data=True)) == list(built.edges(data=True))
+    assert cached.edges[1, 2]['sweep'] and cached.nodes[4]['winner'] == 'top'
+
+
+def test_cache_is_invalidated_when_a_source_changes(graph_files, tmp_path):
+    cache_dir = tmp_path / 'compiled'
+    construct(graph_files, cache_dir)
+    with open(graph_files['terminal_node_winstate'], 'w') as file:
+        json.dump([{'node': 4, 'winner': 'bottom'}], file)
+    G = construct(graph_files, cache_dir)
+    assert G.nodes[4]['winner'] == 'bottom'
+    assert len(os.listdir(cache_dir)) == 2
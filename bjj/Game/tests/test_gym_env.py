@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from gym_env import BJJEnv
+
+
+@pytest.fixture
+def env(board):
+    return BJJEnv(board=board)
+
+
+def test_action_mask_is_a_precomputed_view(env):
+    game = env.game
+    for node in env.board.nodes:
+        for is_top in (True, False):
+            game.game_state.current_node = node
+            game.current_player.is_top, game.current_player.is_bottom = is_top, not is_top
+            mask = env._get_action_mask()
+            assert mask.shape == (len(env.edge_ids),) and not mask.flags.writeable
+            expected = {end for end, _ in game.game_state.get_possible_moves(is_top, not is_top)}
+            assert set(env.moves.targets[np.flatnonzero(mask)]) == expected
+            assert mask is env._get_action_mask()
+
+
+def test_step_moves_to_the_end_of_the_edge(env):
+    env.game.game_state.current_node = 0
+    env.game.current_player.is_top, env.game.current_player.is_bottom = True, False
+    action = int(np.flatnonzero(env._get_action_mask())[0])
+    obs, _, _, _, _ = env.step(action)
+    assert obs['current_position'] == env.moves.targets[action] == 2
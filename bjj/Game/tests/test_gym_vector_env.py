@@ -0,0 +1,68 @@
+import numpy as np
+from gym_env import state_to_index
+from gym_vector_env import BJJVectorEnv, ILLEGAL_MOVE_REWARD, WIN_REWARD, batched_q_learning, legal_action_table
+
+
+def test_random_legal_play(board):
+    env = BJJVectorEnv(16, board=board, max_turns=8, seed=0)
+    obs, info = env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    done = np.zeros(16, dtype=bool)
+    episodes = 0
+    for _ in range(50):
+        mask = info['action_mask']
+        assert mask.shape == (16, len(board.moves))
+        assert mask[~done].any(axis=1).all()
+        for env_index in np.flatnonzero(~done):
+            node, on_top = obs['current_position'][env_index], obs['on_top'][env_index]
+            assert set(np.flatnonzero(mask[env_index])) == set(board.moves.legal_moves(node, on_top))
+        actions = (mask * rng.random(mask.shape)).argmax(axis=1)
+        obs, rewards, terminated, truncated, info = env.step(actions)
+        assert env.observation_space.contains(obs)
+        # environments that ended last step are reset, whatever their action was. The first player may have to pass
+        assert (obs['turns_left'][done, 0] >= 7).all() and (rewards[done] == 0).all()
+        done = terminated | truncated
+        episodes += done.sum()
+    assert episodes > 16
+
+
+def test_tap_and_illegal_moves(board):
+    env = BJJVectorEnv(2, board=board, seed=0)
+    env.reset(seed=0)
+    games = env.games
+    # node 3 only has the 'tap' move out of it
+    games.node[:] = 3
+    games.current[:] = 0
+    tap = list(board.graph.edges).index((3, 4))
+    obs, rewards, terminated, truncated, info = env.step(np.array([tap, (tap + 1) % len(board.moves)]))
+    assert list(terminated) == [True, False] and not truncated.any()
+    assert rewards[0] < -WIN_REWARD / 2 and rewards[1] == ILLEGAL_MOVE_REWARD
+    # the illegal move was a pass: player 2 is to move and still at the armbar
+    assert games.current[1] == 1 and obs['current_position'][1] == 3
+
+
+def test_legal_action_table(board):
+    table, num_legal = legal_action_table(board.moves)
+    for node in board.nodes:
+        for on_top in (0, 1):
+            state = state_to_index({"current_position": node, "on_top": on_top})
+            actions = table[state, :num_legal[state]]
+            assert list(actions) == list(board.moves.legal_moves(node, on_top))
+            assert (table[state, num_legal[state]:] == -1).all()
+
+
+def test_batched_q_learning(board):
+    env = BJJVectorEnv(32, board=board, max_turns=8, seed=0)
+    q_table, report = batched_q_learning(env, num_episodes=200, seed=0)
+    assert q_table.shape == (board.moves.num_nodes * 2, len(board.moves))
+    assert report.episodes >= 200 and not report.converged and np.isfinite(q_table).all()
+    # only legal (state, action) pairs are ever updated
+    table, num_legal = legal_action_table(board.moves)
+    legal = np.zeros_like(q_table, dtype=bool)
+    for state in range(len(num_legal)):
+        legal[state, table[state, :num_legal[state]]] = True
+    assert (q_table[~legal] == 0).all() and (q_table[legal] != 0).any()
+
+    _, report = batched_q_learning(BJJVectorEnv(32, board=board, max_turns=8, seed=0), num_episodes=10 ** 9,
+                                   tolerance=np.inf, check_every=5, seed=0)
+    assert report.converged and report.steps == 5
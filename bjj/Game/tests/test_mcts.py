@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from play_game import Game
+from mcts import MCTSAgent, MCTSState
+from solver import GameSolver
+
+
+def player1_wins(board, agent, games=100, max_turns=10):
+    wins = 0
+    for seed in range(games):
+        game = Game('mcts', max_turns=max_turns, board=board, seed=seed)
+        game.initialize_game('player1', 'player2')
+        game.player1.agent = agent
+        game.play_game()
+        wins += game.winner is game.player1
+    return wins
+
+
+def test_beats_random_play(board):
+    agent = MCTSAgent(board, max_turns=10, simulations=200, seed=0)
+    assert player1_wins(board, agent) > player1_wins(board, None) + 15
+
+
+def test_finds_the_solved_best_moves(board):
+    solver = GameSolver(board, max_turns=4, dtype=np.float64).solve()
+    agent = MCTSAgent(board, max_turns=4, simulations=2000, rollouts_per_leaf=16, seed=0, reuse_tree=False)
+    for node in board.nodes:
+        for on_top in (False, True):
+            for difference in (-2, 0, 2):
+                state = MCTSState(node, on_top, difference, 4)
+                legal = list(board.moves.legal_moves(node, on_top))
+                if len(legal) < 2:
+                    continue
+                move = agent.best_move(state)
+                outcome, next_state = agent._play(state, move)
+                value = outcome if outcome is not None else -solver.value(*next_state)
+                assert value == pytest.approx(solver.value(node, on_top, difference, 4))
+
+
+def test_budgets_and_tree_reuse(board):
+    agent = MCTSAgent(board, max_turns=50, simulations=10 ** 9, time_budget=0.05, seed=0)
+    game = Game('mcts', max_turns=50, board=board, seed=1)
+    game.initialize_game('player1', 'player2')
+    game.current_player = game.player1
+    game.game_state.current_node, game.player1.is_top, game.player2.is_top = 0, True, False
+    game.player1.is_bottom, game.player2.is_bottom = False, True
+    game.turn_count = 1
+    target, _ = agent.choose_move(game, game.player1, game.game_state.get_possible_moves(True, False))
+    assert 0 < agent.simulations_run < 10 ** 9
+    assert agent.root is not None and agent.root.visits > 0
+    assert agent.root_state.node == target and agent.root_state.turns_left == 49
+
+    # the opponent's move leads to a state whose subtree is kept
+    subtree = agent.root
+    opponent_move, child = max(subtree.children.items(), key=lambda item: item[1].visits)
+    outcome, state = agent._play(agent.root_state, opponent_move)
+    assert outcome is None
+    agent._descend_to(state)
+    assert agent.root is child and agent.root_state == state
+
+
+def test_process_pool_rollouts(board):
+    agent = MCTSAgent(board, max_turns=10, simulations=64, processes=1, seed=0)
+    try:
+        root = agent.search(MCTSState(0, True, 0, 10))
+        assert root.visits == 64 and sum(child.visits for child in root.children.values()) == 64
+    finally:
+        agent.close()
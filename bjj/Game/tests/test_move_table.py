@@ -0,0 +1,38 @@
+import numpy as np
+from play_game import GameState
+from Graph.move_table import MoveTable
+
+
+def test_move_table_matches_graph(board):
+    moves = board.moves
+    assert list(zip(moves.sources, moves.targets)) == list(board.graph.edges)
+    for node in board.graph.nodes:
+        assert sorted(moves.targets[moves.outgoing(node)]) == sorted(board.graph.successors(node))
+        for is_top in (True, False):
+            expected = [end for _, end, data in board.graph.out_edges(node, data=True)
+                        if not (data['bottom'] if is_top else data['top'])]
+            assert list(moves.targets[moves.legal_moves(node, is_top)]) == expected
+    sweep = list(board.graph.edges).index((1, 2))
+    # the sweep ends up in mount, which earns points too
+    assert moves.points[sweep] == board.rewards['sweep'] + board.rewards['mount'] and moves.swaps_players[sweep]
+    assert moves.tap[list(board.graph.edges).index((3, 4))]
+
+
+def test_possible_moves_come_from_the_move_table(board):
+    game_state = GameState(board)
+    game_state.current_node = 0
+    assert [move[0] for move in game_state.get_possible_moves(is_top=False, is_bottom=True)] == [1]
+    assert [move[0] for move in game_state.get_possible_moves(is_top=True, is_bottom=False)] == [2]
+    assert game_state.get_possible_moves(True, False)[0][1] is board.graph.edges[0, 2]
+    legal = game_state.get_legal_moves(True)
+    assert not legal.flags.writeable
+
+
+def test_move_table_is_cached_next_to_the_graph(cached_board, make_board, tmp_path):
+    cache_dir = tmp_path / 'compiled'
+    first, second = cached_board, make_board(cache_dir=str(cache_dir))
+    cached_files = sorted(path.name for path in next(cache_dir.iterdir()).iterdir())
+    assert 'moves_legal_edges.npy' in cached_files
+    for name in ('legal_offsets', 'legal_edges', 'points', 'targets'):
+        np.testing.assert_array_equal(getattr(first.moves, name), getattr(second.moves, name))
+    assert isinstance(MoveTable.from_graph(second.graph, second.rewards), MoveTable)
@@ -0,0 +1,55 @@
+import numpy as np
+from gym_env import BJJEnv
+from gym_vector_env import BJJVectorEnv
+from observations import FlatObservationEncoder, POINT_DIFFERENCE, ON_TOP, ON_BOTTOM, TURNS_LEFT
+
+
+def test_layout(board):
+    encoder = FlatObservationEncoder(board, max_turns=10, node_tags=True)
+    assert encoder.size == 4 + 5 + len(encoder.tags) == len(encoder.feature_names)
+    out = encoder.buffer()
+    encoder.encode(out, 1, -3, False, 7)
+    assert out.dtype == np.float32
+    assert (out[POINT_DIFFERENCE], out[ON_TOP], out[ON_BOTTOM], out[TURNS_LEFT]) == (-3, 0, 1, 7)
+    assert list(np.flatnonzero(out[encoder.node_column:encoder.tag_column])) == [1]
+    assert {encoder.tags[i] for i in np.flatnonzero(out[encoder.tag_column:])} == {'closed_guard', 'top_kneeling'}
+    assert encoder.observation_space.contains(out)
+
+    # the node block is cleared before the next observation is written
+    encoder.encode(out, 3, 0, True, 6)
+    assert list(np.flatnonzero(out[encoder.node_column:encoder.tag_column])) == [3]
+    assert [encoder.tags[i] for i in np.flatnonzero(out[encoder.tag_column:])] == ['armbar']
+
+
+def test_batched_encoding_matches_single(board):
+    encoder = FlatObservationEncoder(board, node_tags=True)
+    nodes, differences, on_top, turns_left = np.array([0, 4, 2, 2]), np.array([1, -2, 0, 6]), \
+        np.array([True, False, True, False]), np.array([100, 3, 0, 9])
+    batch = encoder.encode(encoder.buffer(4), nodes, differences, on_top, turns_left)
+    for i in range(4):
+        single = encoder.encode(encoder.buffer(), nodes[i], differences[i], on_top[i], turns_left[i])
+        assert np.array_equal(batch[i], single)
+
+
+def test_embedded_node_column(board):
+    encoder = FlatObservationEncoder(board, one_hot_nodes=False)
+    assert encoder.size == 5 and encoder.feature_names[-1] == 'node'
+    out = encoder.encode(encoder.buffer(), 4, 0, True, 0)
+    assert out[encoder.node_column] == 4 and encoder.observation_space.contains(out)
+
+
+def test_envs_write_into_their_buffer(board):
+    env = BJJEnv(board=board, observation_encoder=FlatObservationEncoder(board))
+    obs, info = env.reset(seed=0)
+    assert obs.shape == env.observation_space.shape
+    obs_after, _, _, _, _ = env.step(int(np.flatnonzero(info['action_mask'])[0]))
+    assert obs_after is obs
+
+    vector_env = BJJVectorEnv(8, board=board, max_turns=8, seed=0, observation_encoder=FlatObservationEncoder(board))
+    obs, info = vector_env.reset(seed=0)
+    assert obs.shape == (8, vector_env.observation_encoder.size) and vector_env.observation_space.contains(obs)
+    for _ in range(10):
+        actions = (info['action_mask'] * np.random.default_rng(0).random(info['action_mask'].shape)).argmax(axis=1)
+        next_obs, _, _, _, info = vector_env.step(actions)
+        assert next_obs is obs and vector_env.observation_space.contains(obs)
+        assert (obs[:, 4:].sum(axis=1) == 1).all()
@@ -0,0 +1,49 @@
+import numpy as np
+from q_table import SparseQTable
+
+
+def test_layout_holds_the_legal_moves(board):
+    table = SparseQTable(board.moves, num_contexts=3)
+    assert table.values.shape == (3, len(table))
+    for node in board.nodes:
+        for on_top in (0, 1):
+            state = node * 2 + on_top
+            assert list(table.legal_actions(state)) == list(board.moves.legal_moves(node, on_top))
+            for action in range(len(board.moves)):
+                slot = table.slot(state, action)
+                legal = action in table.legal_actions(state)
+                assert (slot >= 0) == legal
+                if legal:
+                    assert table.actions[slot] == action and table.states[slot] == state
+
+
+def test_matches_a_dense_table(board):
+    rng = np.random.default_rng(0)
+    table = SparseQTable(board.moves)
+    dense = np.zeros((table.num_states, table.num_actions))
+    states, actions = table.states[rng.integers(len(table), size=50)], table.actions[rng.integers(len(table), size=50)]
+    deltas = rng.normal(size=50)
+    table.add(states, actions, deltas)
+    legal = table.slot(states, actions) >= 0
+    np.add.at(dense, (states[legal], actions[legal]), deltas[legal])
+    assert np.array_equal(table.to_dense(), dense)
+    assert np.array_equal(SparseQTable.from_dense(board.moves, dense).values, table.values)
+    assert np.array_equal(table.get(states, actions), dense[states, actions])
+
+    max_all, argmax_all = table.max_all(), table.argmax_all()
+    for state in range(table.num_states):
+        legal_actions = table.legal_actions(state)
+        if not len(legal_actions):
+            assert table.max(state) == max_all[state] == 0 and table.argmax(state) == argmax_all[state] == -1
+            continue
+        values = dense[state, legal_actions]
+        assert table.max(state) == max_all[state] == values.max()
+        assert table.argmax(state) == argmax_all[state] == legal_actions[values.argmax()]
+
+
+def test_contexts_are_independent(board):
+    table = SparseQTable(board.moves, num_contexts=2)
+    state, action = 2 * 2 + 1, int(board.moves.legal_moves(2, True)[0])
+    table.add(state, action, 1.5, context=1)
+    assert table.get(state, action, context=1) == 1.5 and table.get(state, action) == 0
+    assert table.get(state, int(board.moves.legal_moves(0, False)[0])) == 0.0
@@ -0,0 +1,49 @@
+import networkx as nx
+import pytest
+from Graph.graph_constructor import build_graph, construct_graph
+from Graph.reward import MOVE_RULES, ENTERS_POSITION, EDGE_TAGS, MoveRule, annotate_moves, rule_points
+from play_game import Board
+
+
+def flagged(G, name):
+    return {(start, end) for start, end, data in G.edges(data=True) if data.get(name)}
+
+
+def test_rules_flag_moves_in_one_pass(graph_files):
+    G = build_graph(graph_files['nodes'], graph_files['transitions'], graph_files['terminal_node_winstate'])
+    assert flagged(G, 'sweep') == {(1, 2)}
+    # the reverse edge of the bidirectional takedown keeps its tags
+    assert flagged(G, 'takedown') == {(0, 2), (2, 0)}
+    # entering mount from a node without it, but not leaving it
+    assert flagged(G, 'mount') == {(1, 2), (0, 2)}
+    assert flagged(G, 'tap') == {(3, 4)}
+    assert flagged(G, 'back') == flagged(G, 'pass') == set()
+
+
+def test_custom_rules_match_substrings(graph_files):
+    G = build_graph(graph_files['nodes'], graph_files['transitions'], graph_files['terminal_node_winstate'])
+    annotate_moves(G, [MoveRule('guard', 'guard', ENTERS_POSITION, 1), MoveRule('down', 'down', EDGE_TAGS, 1)],
+                   flag_taps=False)
+    assert flagged(G, 'guard') == {(0, 1)}
+    assert flagged(G, 'down') == {(0, 2), (2, 0)}
+
+
+def test_rule_points():
+    assert rule_points() == {rule.name: rule.points for rule in MOVE_RULES}
+    assert rule_points()['pass'] == 3 and rule_points()['mount'] == 4
+
+
+def test_rules_reach_the_board(graph_files, tmp_path):
+    paths = (graph_files['nodes'], graph_files['transitions'], graph_files['terminal_node_winstate'])
+    rules = MOVE_RULES + [MoveRule('guard', 'guard', ENTERS_POSITION, 1)]
+    default = construct_graph(*paths, cache_dir=str(tmp_path))
+    # the rules are part of the cache key, so the cached default graph isn't reused
+    G = construct_graph(*paths, cache_dir=str(tmp_path), rules=rules)
+    assert G.graph['compiled_cache'] != default.graph['compiled_cache']
+    board = Board(nx.freeze(G))
+    assert board.rewards['guard'] == 1
+    edge = list(G.edges).index((0, 1))
+    assert board.moves.points[edge] == 1
+    # the default graph has no 'guard' flags
+    with pytest.raises(ValueError):
+        Board(nx.freeze(default), rules=rules)
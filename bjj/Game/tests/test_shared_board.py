@@ -0,0 +1,27 @@
+import networkx as nx
+import pytest
+import play_game
+from play_game import Game, Simulation
+
+
+def test_shared_board_is_built_once(cached_board, monkeypatch):
+    builds = []
+    monkeypatch.setattr(play_game, '_shared_board', None)
+    monkeypatch.setattr(play_game, 'construct_graph', lambda: builds.append(1) or nx.DiGraph(cached_board.graph))
+    games = [Game(f'Game_{i}') for i in range(3)]
+    assert len(builds) == 1
+    assert all(game.board is games[0].board for game in games)
+    assert nx.is_frozen(games[0].board.graph)
+
+
+def test_games_share_the_board_but_not_their_state(cached_board):
+    board = cached_board
+    simulation = Simulation(num_games=2, board=board)
+    simulation.initialize_games(num_turns=5)
+    first, second = simulation.games
+    assert first.board is second.board is board
+    first.game_state.current_node, second.game_state.current_node = 0, 2
+    first.player1.points = 3
+    assert second.game_state.current_node == 2 and second.player1.points == 0
+    with pytest.raises(nx.NetworkXError):
+        board.graph.add_edge(0, 4)
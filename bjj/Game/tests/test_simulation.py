@@ -0,0 +1,30 @@
+from play_game import Board, Game, GameRecord, Simulation, game_seed
+
+
+def simulate(board, processes=None, **kwargs):
+    simulation = Simulation(num_games=40, board=board, seed=3)
+    simulation.initialize_games(num_turns=15)
+    simulation.run_games(processes=processes, **kwargs)
+    return sorted(simulation.results, key=lambda result: result['game_name'])
+
+
+def test_seeded_results_do_not_depend_on_workers(board):
+    on_threads = simulate(board)
+    assert on_threads == simulate(board, processes=1, games_per_task=40)
+    assert on_threads == simulate(board, processes=2, games_per_task=3)
+    assert len({result['num_turns'] for result in on_threads}) > 1
+
+
+def test_custom_rules_reach_the_workers(board):
+    rules = [rule._replace(points=rule.points * 10) for rule in board.graph.graph['move_rules']]
+    custom = Board(board.graph, rules)
+    on_threads = simulate(custom)
+    assert on_threads == simulate(custom, processes=2, games_per_task=8)
+    assert on_threads != simulate(board)
+
+
+def test_game_record_round_trip(board):
+    game = Game('Game_5', max_turns=15, board=board, seed=game_seed(3, 5))
+    game.initialize_game('Player1_Game_5', 'Player2_Game_5')
+    result = Simulation(1, board=board).play_single_game(game)
+    assert GameRecord.from_game(5, game).to_result() == result
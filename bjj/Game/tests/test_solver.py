@@ -0,0 +1,75 @@
+from functools import lru_cache
+import numpy as np
+import pytest
+from play_game import Board, Game, GameState, NULL_SINK
+from solver import GameSolver, PASS
+
+
+def brute_force(board: Board):
+    """expectiminimax by plain recursion over Game's move tuples, for the player to move"""
+    points_of = GameState(board, NULL_SINK, None)._calculate_points
+    dead_ends = [node for node in board.nodes if not board.graph.out_degree(node)]
+    restart_nodes = [node for node in board.nodes if node not in dead_ends]
+
+    @lru_cache(maxsize=None)
+    def value(node, on_top, difference, turns_left):
+        if turns_left == 0:
+            return float(np.sign(difference))
+        if node in dead_ends:
+            return sum(value(start, on_top, difference, turns_left) for start in restart_nodes) / len(restart_nodes)
+        moves = board.legal_move_tuples[on_top][node]
+        if not moves:
+            return -value(node, not on_top, -difference, turns_left - 1)
+        results = []
+        for target, data in moves:
+            winner = board.graph.nodes[target].get('winner')
+            if data.get('tap'):
+                results.append(-1)
+            elif winner:
+                results.append(1 if (winner == 'top') == on_top else -1)
+            else:
+                next_on_top = on_top != bool(data.get('swaps_players'))
+                results.append(-value(target, not next_on_top, -(difference + points_of(data)), turns_left - 1))
+        return max(results)
+    return value
+
+
+def test_matches_brute_force(board):
+    solver = GameSolver(board, max_turns=6, dtype=np.float64).solve()
+    value = brute_force(board)
+    for turns_left in range(7):
+        for difference in range(-15, 16):
+            for node in board.nodes:
+                for on_top in (False, True):
+                    expected = value(node, on_top, difference, turns_left)
+                    assert solver.value(node, on_top, difference, turns_left) == pytest.approx(expected)
+                    edge = solver.best_move(node, on_top, difference, turns_left)
+                    legal = list(board.moves.legal_moves(node, on_top))
+                    assert (edge == PASS) == (not legal or turns_left == 0 or node not in board.graph or
+                                              not board.graph.out_degree(node))
+    assert solver.report()['megabytes'] > 0 and solver.solve_seconds > 0
+
+
+class RecordingSolver(GameSolver):
+    def choose_move(self, game, player, possible_moves):
+        move = super().choose_move(game, player, possible_moves)
+        assert any(move[1] is data for _, data in possible_moves)
+        self.moves_chosen += 1
+        return move
+
+
+def test_solver_as_player_agent(board):
+    solver = RecordingSolver(board, max_turns=10).solve()
+    solver.moves_chosen = 0
+
+    def player1_wins(agent):
+        wins = 0
+        for seed in range(200):
+            game = Game('solved', max_turns=10, board=board, seed=seed)
+            game.initialize_game('player1', 'player2')
+            game.player1.agent = agent
+            game.play_game()
+            wins += game.winner is game.player1
+        return wins
+    random_wins = player1_wins(None)
+    assert player1_wins(solver) > random_wins + 20 and solver.moves_chosen > 0
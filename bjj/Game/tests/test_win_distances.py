@@ -0,0 +1,38 @@
+import numpy as np
+from Graph.graph_cache import GraphCache
+from Graph.win_distances import UNREACHABLE, WinDistances
+
+
+def test_distances_on_the_small_graph(board):
+    distances = board.win_distances
+    # the tap out of the armbar is untagged, so either side is at a submission there
+    expected = {(3, True): 0, (3, False): 0,
+                (2, True): 1,  # armbar from mount
+                (0, True): 2,  # takedown to mount
+                (1, False): 2,  # the sweep swaps players, into mount on top
+                (0, False): 3,  # pull guard first
+                (1, True): UNREACHABLE, (2, False): UNREACHABLE}
+    for (node, is_top), distance in expected.items():
+        assert distances.distance_to_win(node, is_top) == distance
+
+    # following the next moves reaches a submission in exactly distance moves
+    for (node, is_top), distance in expected.items():
+        steps = 0
+        while distances.distance_to_win(node, is_top) > 0:
+            edge = distances.move_towards_win(node, is_top)
+            assert edge in board.moves.legal_moves(node, is_top)
+            is_top = is_top != bool(board.moves.swaps_players[edge])
+            node = int(board.moves.targets[edge])
+            steps += 1
+        assert steps == max(distance, 0)
+
+
+def test_cached_with_the_compiled_graph(cached_board, tmp_path):
+    board, G = cached_board, cached_board.graph
+    cache = GraphCache.at(G.graph['compiled_cache'])
+    assert (tmp_path / 'compiled' / cache.key / 'win_distance.npy').exists()
+
+    reloaded = WinDistances.from_graph(G, board.moves)
+    assert np.array_equal(reloaded.distance, board.win_distances.distance)
+    assert np.array_equal(reloaded.next_move, board.win_distances.next_move)
+    assert not reloaded.distance.flags.writeable
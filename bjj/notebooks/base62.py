@@ -0,0 +1,58 @@
+"""
+Vectorised decoding of GrappleMap position codes. Only needs numpy, so it can be imported from the package
+(Graph.depracated.base62) as well as from a notebook or script next to it (base62)
+
+A code is 276 base 62 digits: two digits per coordinate, for the (x, y, z) of the 23 joints of both players
+"""
+import string
+import numpy as np
+
+BASE62_DIGITS = string.ascii_lowercase + string.ascii_uppercase + string.digits
+# lookup table from a character's byte value to its base 62 value. Anything that isn't a base 62 digit maps to -1
+BASE62_LOOKUP = np.full(256, -1, dtype=np.int16)
+BASE62_LOOKUP[np.frombuffer(BASE62_DIGITS.encode('ascii'), dtype=np.uint8)] = np.arange(62)
+
+ENCODED_POS_SIZE = 2 * 23 * 3 * 2
+
+
+def base62_coordinates(codes) -> np.ndarray:
+    """
+    The stored values of a batch of GrappleMap position codes, before any scaling: float64 array of shape
+    (N, 2, JOINT_COUNT, 3), with every coordinate read from two base 62 digits and divided by 1000. Whitespace inside a
+    code (e.g. the indented 4-line blocks in GrappleMap.txt) is ignored
+    """
+    if isinstance(codes, str):
+        codes = [codes]
+    encoded = []
+    for code in codes:
+        if len(code) != ENCODED_POS_SIZE:
+            code = ''.join(code.split())
+        if len(code) != ENCODED_POS_SIZE:
+            raise ValueError(f"Expected string of length {ENCODED_POS_SIZE}, got {len(code)}")
+        # non-ascii characters are replaced with '?', which fails the base 62 check below
+        encoded.append(code.encode('ascii', errors='replace'))
+
+    chars = np.frombuffer(b''.join(encoded), dtype=np.uint8).reshape(len(encoded), ENCODED_POS_SIZE)
+    digits = BASE62_LOOKUP[chars]
+    if (digits < 0).any():
+        row, col = np.argwhere(digits < 0)[0]
+        raise ValueError(f"Not a base 62 digit: {encoded[row][col:col + 1].decode('ascii')}")
+
+    # every coordinate is stored as two base 62 digits
+    return ((digits[:, 0::2] * 62 + digits[:, 1::2]) / 1000).reshape(len(encoded), 2, -1, 3)
+
+
+def decode_positions(codes) -> np.ndarray:
+    """
+    Decodes a batch of GrappleMap position codes in one go, instead of one character at a time. This is the
+    coordinate space of Position, PositionTree, CanonicalIndex, GrappleMap.txt's reader and the frame store
+
+    Inputs:
+        codes (str or iterable of str): N encoded positions, see base62_coordinates
+    Returns:
+        np.ndarray: float32 array of shape (N, 2, JOINT_COUNT, 3) holding the (x, y, z) coordinates of every joint of
+                    both players, each scaled to the range -2 to 2. Position(decoded[i]) wraps a row without copying it
+    """
+    d = base62_coordinates(codes)
+    d = d * 4 - 2  # Scale to range -2 to 2
+    return d.astype(np.float32)
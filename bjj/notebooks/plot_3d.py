@@ -140,16 +140,16 @@ def visualize_distances(pos1,pos2):
     pos2_p1, pos2_p2 = add_distances_to_pos(pos2, calc_limb_distances(pos2))
 
     # Add traces for both positions
-    fig.add_trace(create_3d_scatter(list(pos1.player0.values()), 'pos 1 - player 1'), row=1, col=1)
+    fig.add_trace(create_3d_scatter(list(pos1.player0), 'pos 1 - player 1'), row=1, col=1)
     fig.add_trace(create_3d_scatter(pos1_p1, 'from distances'), row=1, col=2)
 
-    fig.add_trace(create_3d_scatter(list(pos1.player1.values()), 'pos 1 - player 2'), row=2, col=1)
+    fig.add_trace(create_3d_scatter(list(pos1.player1), 'pos 1 - player 2'), row=2, col=1)
     fig.add_trace(create_3d_scatter(pos1_p2, 'from distances'), row=2, col=2)
 
-    fig.add_trace(create_3d_scatter(list(pos2.player0.values()), 'pos 2 - player 1'), row=3, col=1)
+    fig.add_trace(create_3d_scatter(list(pos2.player0), 'pos 2 - player 1'), row=3, col=1)
     fig.add_trace(create_3d_scatter(pos2_p1, 'from distances'), row=3, col=2)
 
-    fig.add_trace(create_3d_scatter(list(pos2.player1.values()), 'pos 2 - player 2'), row=4, col=1)
+    fig.add_trace(create_3d_scatter(list(pos2.player1), 'pos 2 - player 2'), row=4, col=1)
     fig.add_trace(create_3d_scatter(pos2_p2, 'from distances'), row=4, col=2)
 
 
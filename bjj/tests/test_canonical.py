@@ -0,0 +1,38 @@
+from Graph.depracated.position import *
+from Graph.depracated.canonical import *
+
+
+def rotate_and_translate(pos, angle, offset):
+    cos, sin = np.cos(angle), np.sin(angle)
+    rotation = np.array([[cos, 0, -sin], [0, 1, 0], [sin, 0, cos]])
+    return Position(pos.array.astype(np.float64) @ rotation.T + offset)
+
+
+def test_canonical_form_is_orientation_invariant():
+    pos = Position(positions['code'].iloc[3])
+    form, key = canonical_form(pos)
+    for moved in (rotate_and_translate(pos, 1.3, [0.5, 0, -2]), swap_players(pos), mirror(swap_players(pos))):
+        moved_form, moved_key = canonical_form(moved)
+        assert np.allclose(form, moved_form, atol=1e-5)
+        assert key == moved_key
+
+
+def test_canonical_index_find():
+    codes = list(dict.fromkeys(positions['code'].iloc[:50]))
+    index = CanonicalIndex()
+    for code in codes:
+        index.add(code, Position(code))
+    reoriented = mirror(rotate_and_translate(Position(codes[7]), -0.4, [1, 0, 1]))
+    assert index.find(reoriented) == codes[7]
+    assert index.find(Position(codes[7])) == codes[7]
+
+
+def test_canonical_index_finds_earliest_added():
+    codes = list(dict.fromkeys(list(transitions['start_position']) + list(transitions['end_position'])))[:150]
+    index = CanonicalIndex()
+    for code in codes:
+        index.add(code, Position(code))
+    for code in codes:
+        pos = Position(code)
+        first = next(key for key in codes if positions_are_equivalent(pos, index.positions[key]) is True)
+        assert index.find(pos) == first
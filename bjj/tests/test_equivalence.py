@@ -0,0 +1,25 @@
+from scipy.spatial import procrustes
+from Graph.depracated.position import *
+from Graph.depracated.equivalence import equivalent_pairs, deduplicate
+
+
+def test_procrustes_disparities_match_scipy():
+    arrays = decode_positions(list(positions['code'].iloc[:20]))
+    standardized = standardize_positions(arrays)
+    disparities = procrustes_disparities(standardized[0], standardized)
+    for array, disparity in zip(arrays, disparities):
+        assert np.isclose(disparity, procrustes(pos_to_list(arrays[0]), pos_to_list(array))[2])
+
+
+def test_equivalent_pairs_match_is_reoriented():
+    codes = list(dict.fromkeys(list(transitions['start_position']) + list(transitions['end_position'])))[:150]
+    arrays = decode_positions(codes)
+    expected = {(i, j) for i in range(len(codes)) for j in range(i + 1, len(codes))
+                if is_reoriented(Position(arrays[i]), Position(arrays[j])) is True}
+    assert {tuple(pair) for pair in equivalent_pairs(arrays, block_size=64).tolist()} == expected
+
+    # a mirrored and swapped copy is folded into the original
+    stacked = np.concatenate([arrays[:5], mirror_batch(swap_players_batch(arrays[:5]))])
+    representative = deduplicate(stacked)
+    assert np.array_equal(representative[5:], representative[:5])
+    assert all(representative[i] <= i for i in range(len(stacked)))
@@ -0,0 +1,32 @@
+import os
+from itertools import islice
+import numpy as np
+from Graph.frame_store import FrameStore
+from Graph.grapplemap_reader import read_transitions
+
+GRAPPLEMAP_TXT = os.path.join(os.path.dirname(__file__), '..', 'notebooks', 'GrappleMap.txt')
+
+
+def test_frames_match_the_decoded_transitions(tmp_path):
+    store = FrameStore.open(GRAPPLEMAP_TXT, cache_dir=str(tmp_path))
+    transitions = list(read_transitions(GRAPPLEMAP_TXT, keep_frames=False))
+    assert len(store) == len(transitions)
+    assert store.frames.shape == (sum(t.num_frames for t in transitions), 2, 23, 3)
+    assert store.frames.dtype == np.float32
+
+    for transition in islice(read_transitions(GRAPPLEMAP_TXT), 0, None, 100):
+        frames = store.transition_frames(transition.id)
+        assert np.array_equal(frames, transition.positions())
+        assert np.shares_memory(frames, store.frames) and not frames.flags.writeable
+
+
+def test_reverse_edges_play_backwards(tmp_path):
+    store = FrameStore.open(GRAPPLEMAP_TXT, cache_dir=str(tmp_path))
+    data = {'id': 3, 'from': {'node': 10}, 'to': {'node': 20}}
+    forward, backward = store.edge_frames(10, 20, data), store.edge_frames(20, 10, data)
+    assert np.array_equal(backward, forward[::-1]) and np.shares_memory(backward, store.frames)
+
+    # opened again from the cache without being rebuilt
+    built = os.path.getmtime(os.path.join(store.path, 'frames.npy'))
+    assert FrameStore.open(GRAPPLEMAP_TXT, cache_dir=str(tmp_path)).path == store.path
+    assert os.path.getmtime(os.path.join(store.path, 'frames.npy')) == built
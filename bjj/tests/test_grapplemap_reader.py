@@ -0,0 +1,35 @@
+import os
+from itertools import islice
+import numpy as np
+from Graph.grapplemap_reader import *
+from Graph.depracated.position import Position
+
+GRAPPLEMAP_TXT = os.path.join(os.path.dirname(__file__), '..', 'notebooks', 'GrappleMap.txt')
+
+
+def test_read_grapplemap():
+    records = list(read_grapplemap(GRAPPLEMAP_TXT, keep_frames=False))
+    positions = [r for r in records if isinstance(r, PositionRecord)]
+    transitions = [r for r in records if isinstance(r, TransitionRecord)]
+    assert (len(positions), len(transitions)) == (601, 1485)
+    assert [r.id for r in transitions] == list(range(len(transitions)))
+
+    first = positions[0]
+    assert first.description == 'side ctrl w/ near open elbow and crossface'
+    assert 'side_control' in first.tags
+    assert first.position().shape == (2, 23, 3)
+    # only the endpoints are kept
+    assert all(len(t.frames) == min(t.num_frames, 2) for t in transitions)
+
+
+def test_transition_frames_are_decoded_lazily():
+    transition = next(islice(read_transitions(GRAPPLEMAP_TXT), 3, None))
+    assert all(isinstance(frame, str) and len(frame) == 276 for frame in transition.frames)
+    decoded = transition.positions()
+    assert decoded.shape == (transition.num_frames, 2, 23, 3)
+    assert transition.properties and transition.start_code == transition.frames[0]
+
+
+def test_positions_are_in_the_coordinates_of_position():
+    record = next(r for r in read_grapplemap(GRAPPLEMAP_TXT) if isinstance(r, PositionRecord))
+    assert np.array_equal(Position(record.position()).array, Position(record.code).array)
@@ -0,0 +1,32 @@
+from Graph.depracated.position import *
+from Graph.depracated.equivalence import equivalent_pairs
+
+
+def test_signatures_never_reject_procrustes_matches():
+    arrays = decode_positions(list(dict.fromkeys(positions['code']))[:120])
+    # perturbed, moved and reoriented copies of the first positions, which procrustes still matches to them
+    rng = np.random.default_rng(0)
+    copies = orientation_variants(arrays[:30] * 1.3 + 0.5 + rng.normal(0, 0.01, arrays[:30].shape))[3]
+    stacked = np.concatenate([arrays, copies])
+    signatures = position_signatures(stacked)
+    first, second = np.triu_indices(len(stacked), k=1)
+    rejections = signature_rejections(signatures, first, second, levels=LEVELS)
+    standardized = np.moveaxis(standardize_positions(orientation_variants(stacked)), 0, 1)
+    disparities = procrustes_disparities(standardized[first, :1], standardized[second]).min(axis=1)
+    assert np.all(rejections[disparities < 0.05] == -1)
+    assert np.mean(rejections[disparities >= 0.05] >= 0) > 0.5
+    assert signature_rejection(Position(arrays[0]).signature, Position(copies[0]).signature, levels=LEVELS) is None
+
+
+def test_cascade_counts():
+    codes = list(dict.fromkeys(positions['code']))[:60]
+    CASCADE_COUNTS.clear()
+    for i in range(len(codes)):
+        for j in range(i + 1, len(codes)):
+            is_reoriented(Position(codes[i]), Position(codes[j]))
+    assert sum(CASCADE_COUNTS.values()) == len(codes) * (len(codes) - 1) // 2
+    assert CASCADE_COUNTS['head2head_reject'] > 0
+
+    arrays = decode_positions(codes)
+    assert np.array_equal(equivalent_pairs(arrays), equivalent_pairs(arrays, levels=LEVELS))
+    assert np.array_equal(equivalent_pairs(arrays), equivalent_pairs(arrays, levels=()))
@@ -0,0 +1,24 @@
+from Graph.depracated.position import *
+from Graph.depracated.nearest import PositionTree
+
+
+def test_position_tree_query():
+    codes = list(dict.fromkeys(positions['code']))
+    tree = PositionTree.from_codes(codes[:200], rebuild_threshold=50)
+    distances, keys = tree.query(mirror(swap_players(Position(codes[42]))), k=3)
+    assert keys[0, 0] == codes[42] and np.isclose(distances[0, 0], 0, atol=1e-5)
+    assert np.all(np.diff(distances[0]) >= 0)
+
+    # appended positions are searched before the tree is rebuilt
+    tree.append(codes[200:210], codes[200:210])
+    assert tree.query(codes[205])[1][0, 0] == codes[205]
+    assert codes[205] in [key for key, _ in tree.query_radius(codes[205], 0.01)[0]]
+
+
+def test_position_tree_save_and_load(tmp_path):
+    codes = list(dict.fromkeys(positions['code']))[:30]
+    tree = PositionTree.from_codes(codes)
+    tree.save(tmp_path / 'tree.npz')
+    loaded = PositionTree.load(tmp_path / 'tree.npz')
+    assert loaded.keys == tree.keys
+    assert np.array_equal(loaded.query(codes[:5], k=2)[0], tree.query(codes[:5], k=2)[0])
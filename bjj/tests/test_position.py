@@ -1,4 +1,5 @@
 # from position_v3 import *
+from scipy.spatial import procrustes
 from Graph.depracated.position import *
 from Graph.depracated.plot_3d import *
 
@@ -87,3 +88,42 @@ def test_backstep_topfree():
         # if positions_are_equivalent(orient_canonically_with_mirror(Position(backstep)), orient_canonically_with_mirror(Position(top_free))) is not True:
         raise ValueError("Positions should be equivalent")
 
+
+def test_decode_positions():
+    codes = list(positions['code'].iloc[:10])
+    decoded = decode_positions(codes)
+    assert decoded.shape == (10, 2, JOINT_COUNT, 3)
+    assert decoded.dtype == np.float32
+    for code, row in zip(codes, decoded):
+        pos, wrapped = Position(code), Position(row)
+        for key, value in pos.items():
+            assert np.allclose(value, wrapped[key])
+    # wrapping a row shouldn't copy it
+    assert np.shares_memory(Position(decoded[0])[(1, Joint.Head.value)], decoded)
+
+def test_mirror_and_swap_are_permutations():
+    pos = Position(positions['code'].iloc[0])
+    mirrored, swapped = mirror(pos), swap_players(pos)
+    left, right = pos[(0, Joint.LeftToe.value)], mirrored[(0, Joint.RightToe.value)]
+    assert np.allclose(right, [-left[0], left[1], left[2]])
+    assert np.array_equal(swapped.player0, pos.player1)
+    assert np.array_equal(mirror(mirrored).array, pos.array)
+    assert np.array_equal(swap_players(swapped).array, pos.array)
+
+def test_batch_transforms_match_single_positions():
+    decoded = decode_positions(list(positions['code'].iloc[:5]))
+    mirrored, swapped = mirror_batch(decoded), swap_players_batch(decoded)
+    distances, head_distances = distance_from_head_batch(decoded), head2head_batch(decoded)
+    variants = orientation_variants(decoded)
+    assert variants.shape == (4, 5, 2, JOINT_COUNT, 3)
+    for i, row in enumerate(decoded):
+        pos = Position(row)
+        assert np.array_equal(mirrored[i], mirror(pos).array)
+        assert np.array_equal(swapped[i], swap_players(pos).array)
+        assert np.allclose(distances[i, 1], distance_from_head(pos, 1))
+        assert np.isclose(head_distances[i], head2head(pos))
+        assert np.array_equal(variants[3, i], mirror(swap_players(pos)).array)
+    # the variants of a position are computed once and reused by every comparison against it
+    pos = Position(decoded[0])
+    assert pos.variants is pos.variants
+    assert is_reoriented(Position(variants[3, 0]), pos) is True